@@ -5,36 +5,46 @@ Módulo para análise de imagens (versão SEM DB, salva tabelas individuais por
 Este script:
 1. Varre o diretório de imagens OU processa imagem única via arg.
 2. Processa imagens em paralelo:
-    a. Opcional: Redimensiona/Corta.
-    b. Tenta extrair a primeira tabela com `img2table`/`EasyOCR`.
+    a. Pré-processa: recorta a tabela principal, reduz e (opcional) binariza.
+    b. Tenta extrair a primeira tabela com `img2table`/`EasyOCR` (resultado bruto reaproveitado de 'data/cache_ocr/').
     c. Extrai a data (DD-MM-YYYY) do nome do arquivo original.
-    d. **Pré-processa cabeçalhos mesclados** no DataFrame da tabela extraída.
-    e. Salva a tabela tratada como CSV individual em 'data/tabelas_por_mes/MM-YYYY/'.
-3. Reporta o número de tabelas salvas com sucesso/falha.
+    d. Separa células mescladas (uma vez, como span + valor) e o rodapé fora da grade em '<nome>_notas.json'.
+    e. **Pré-processa cabeçalhos mesclados** no DataFrame da tabela extraída.
+    f. Salva a tabela tratada como CSV individual em 'data/tabelas_por_mes/MM-YYYY/'.
+    g. Normaliza os valores (float64 + flag de reparo por célula) e salva '<nome>_valores.csv'.
+3. Atualiza o dataset Parquet consolidado ('data/ppi_dataset/mes=MM-YYYY/') dos meses alterados.
+4. Reporta o número de tabelas salvas com sucesso/falha.
 """
 
 # --- Imports ---
 import os
+import io
 import re
+import json
+import hashlib
 import pandas as pd
 import logging
 from datetime import datetime
 from PIL import Image, UnidentifiedImageError
-import easyocr
 import numpy as np
 import concurrent.futures
+import concurrent.futures.process
+import multiprocessing
+import importlib.util
+import atexit
+import queue
+import threading
 import time
 import sys
 import math
 import argparse # Para teste standalone
-from img2table.document import Image as Img2TableDoc
-from img2table.ocr import EasyOCR as Img2TableEasyOCR
+# img2table/EasyOCR (torch) são importados sob demanda, só quando o OCR é usado
 from typing import List, Optional, Dict, Tuple
 # from io import StringIO # Não necessário
 
 # --- Imports do Projeto ---
 try:
-    from .config import OUTPUT_DIR, ORGANIZE_BY_MONTH, IMAGE_EXTENSIONS, DATA_DIR
+    from .config import OUTPUT_DIR, ORGANIZE_BY_MONTH, IMAGE_EXTENSIONS, DATA_DIR, OCR_MODOS, OCR_MODO_PADRAO, OCR_LOTE_IMAGENS
     os.makedirs(DATA_DIR, exist_ok=True); os.makedirs(OUTPUT_DIR, exist_ok=True)
     logger = logging.getLogger(__name__)
     logger.debug(f"Config carregada via .config.")
@@ -44,6 +54,7 @@ except Exception as e:
     # Define fallbacks...
     _default_data_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
     DATA_DIR = _default_data_path; OUTPUT_DIR = os.path.join(DATA_DIR, "images"); ORGANIZE_BY_MONTH = True; IMAGE_EXTENSIONS = ['.jpg', '.jpeg']
+    OCR_MODOS = ("template", "img2table"); OCR_MODO_PADRAO = "template"; OCR_LOTE_IMAGENS = 1
     os.makedirs(DATA_DIR, exist_ok=True); os.makedirs(OUTPUT_DIR, exist_ok=True)
 # --- Fim Imports ---
 
@@ -52,27 +63,401 @@ logger = logging.getLogger(__name__)
 
 # --- Constantes e Configs ---
 MAX_IMAGE_DIM_FOR_OCR = 2000
+# Versão do extrator: incremente ao mudar a extração/tratamento para que a análise incremental reprocesse as imagens
+EXTRACTOR_VERSION = "5"
+OCR_MAX_TASKS_PER_CHILD = 200 # Recicla cada processo OCR após N imagens (limita vazamento de memória); None = nunca
 CROP_BOX_MAIN_TABLE = (0.01, 0.12, 0.83, 0.53) # AJUSTE!
 # CROP_BOX_MAIN_TABLE = None # Desabilita corte
+# Etapas do pré-processamento (cada uma pode ser desligada via argumento/CLI)
+PREPROCESSAMENTO_PADRAO = {"recortar": True, "reduzir": True, "binarizar": False}
+OCR_MIN_CONFIDENCE = 50
+OCR_IDIOMAS = ['pt', 'en']
+OCR_BATCH_SIZE = 32 # Recortes por lote no reconhecedor do EasyOCR (modo template)
+OCR_CACHE_ATIVO = True # Reaproveita o resultado bruto do OCR (data/cache_ocr) quando imagem e parâmetros não mudaram
+# OCR_MODOS, OCR_MODO_PADRAO e OCR_LOTE_IMAGENS vêm de config.py (padrões também da CLI do main)
 OUTPUT_DIR_BASE_TABELAS = os.path.join(DATA_DIR, "tabelas_por_mes")
+PIPELINE_ESPERA_FILA_S = 1.0 # Intervalo em que enviar/encerrar reconferem se o despachante do pipeline segue vivo
+TEXTO_MESCLADO_MIN = 25 # Texto (não numérico) a partir deste tamanho repetido em células vizinhas = célula mesclada
 
 # --- Regex ---
 filename_date_pattern = re.compile(r"ppi-(\d{2})-(\d{2})-(\d{4})\.(jpg|jpeg)", re.IGNORECASE)
 
-# --- Verificação EasyOCR ---
-_easyocr_checker_instance = None; easyocr_available = False; use_gpu = False
-try: logger.info(f"Verificando EasyOCR..."); _easyocr_checker_instance = easyocr.Reader(['pt', 'en']); easyocr_available = True; logger.info(f"EasyOCR disponível."); del _easyocr_checker_instance
-except Exception as e: logger.error(f"Falha init EasyOCR: {e}. OCR desativado."); easyocr_available = False
-_worker_ocr_wrappers = {}
+# --- Verificação EasyOCR (barata: pacotes instalados + pesos em disco, sem carregar o modelo) ---
+EASYOCR_MODEL_DIR = os.path.join(os.environ.get("EASYOCR_MODULE_PATH") or os.environ.get("MODULE_PATH") or os.path.expanduser("~/.EasyOCR"), "model")
+EASYOCR_MODEL_FILES = ("craft_mlt_25k.pth", "latin_g2.pth") # Detector CRAFT + reconhecimento latino (pt/en)
+_easyocr_available = None
+_ocr_wrapper = None # Wrapper OCR do processo: None = não iniciado, False = falha na inicialização
 
+def easyocr_disponivel() -> bool:
+    """ Verifica (uma vez por processo) se o OCR pode ser usado, sem instanciar o easyocr.Reader. """
+    global _easyocr_available
+    if _easyocr_available is None:
+        pacotes_ausentes = [pacote for pacote in ("easyocr", "img2table") if importlib.util.find_spec(pacote) is None]
+        if pacotes_ausentes:
+            logger.error(f"Pacotes ausentes: {', '.join(pacotes_ausentes)}. OCR desativado."); _easyocr_available = False
+        else:
+            pesos_ausentes = [f for f in EASYOCR_MODEL_FILES if not os.path.isfile(os.path.join(EASYOCR_MODEL_DIR, f))]
+            if pesos_ausentes: logger.warning(f"Pesos EasyOCR ausentes em {EASYOCR_MODEL_DIR} ({', '.join(pesos_ausentes)}). Serão baixados no primeiro uso.")
+            else: logger.debug(f"EasyOCR disponível (pesos em {EASYOCR_MODEL_DIR}).")
+            _easyocr_available = True
+    return _easyocr_available
+
+def obter_ocr_wrapper():
+    """ Wrapper Img2TableEasyOCR do processo, criado uma única vez (no initializer do pool ou no 1º uso). Retorna None se indisponível. """
+    global _ocr_wrapper
+    if _ocr_wrapper is None:
+        if not easyocr_disponivel(): _ocr_wrapper = False; return None
+        try:
+            from img2table.ocr import EasyOCR as Img2TableEasyOCR # Carrega torch/modelo só aqui
+            inicio = time.time(); _ocr_wrapper = Img2TableEasyOCR(lang=OCR_IDIOMAS)
+            logger.info(f"W {os.getpid()}: Wrapper OCR init OK ({time.time() - inicio:.1f}s).")
+        except Exception as e: logger.error(f"W {os.getpid()}: Falha init OCR: {e}"); _ocr_wrapper = False
+    return _ocr_wrapper or None
+
+def _inicializar_worker_ocr(nivel_log: int = logging.INFO):
+    """ Initializer dos processos do pool: aquece o modelo OCR antes da primeira tarefa. """
+    if not logging.getLogger().hasHandlers(): logging.basicConfig(level=nivel_log, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    obter_ocr_wrapper()
+
+# --- Pool Persistente de Workers OCR ---
+class OcrWorkerPool:
+    """
+    Pool de processos de longa duração para o OCR. Cada processo carrega o modelo uma única vez
+    (initializer) e o pool é reutilizado entre ciclos de análise. max_tasks_per_child recicla os
+    processos após N imagens para limitar o uso de memória (Python >= 3.11, contexto 'spawn').
+    """
+    def __init__(self, max_workers: Optional[int] = None, max_tasks_per_child: Optional[int] = OCR_MAX_TASKS_PER_CHILD):
+        self.max_workers = max_workers if isinstance(max_workers, int) and max_workers > 0 else os.cpu_count()
+        self.max_tasks_per_child = max_tasks_per_child if max_tasks_per_child and max_tasks_per_child > 0 else None
+        self._executor: Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    def _criar_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        kwargs = {"max_workers": self.max_workers, "initializer": _inicializar_worker_ocr, "initargs": (logging.getLogger().level,)}
+        if self.max_tasks_per_child:
+            if sys.version_info >= (3, 11): kwargs.update(max_tasks_per_child=self.max_tasks_per_child, mp_context=multiprocessing.get_context("spawn"))
+            else: logger.warning("max_tasks_per_child requer Python 3.11+. Workers OCR não serão reciclados.")
+        logger.info(f"Iniciando pool OCR: {self.max_workers} processos, reciclagem a cada {self.max_tasks_per_child or '∞'} tarefas.")
+        return concurrent.futures.ProcessPoolExecutor(**kwargs)
+
+    def submit(self, fn, *args, **kwargs) -> concurrent.futures.Future:
+        """ Envia uma tarefa ao pool (recria o executor se ainda não existe ou se quebrou). """
+        if self._executor is None: self._executor = self._criar_executor()
+        try: return self._executor.submit(fn, *args, **kwargs)
+        except concurrent.futures.process.BrokenProcessPool:
+            logger.warning("Pool OCR quebrado. Recriando..."); self._executor = self._criar_executor()
+            return self._executor.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """ Encerra os processos do pool. """
+        if self._executor is not None: self._executor.shutdown(wait=wait); self._executor = None
+
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc_val, exc_tb): self.shutdown()
+
+_pool_ocr_compartilhado: Optional[OcrWorkerPool] = None
+
+def obter_pool_ocr(max_workers: Optional[int] = None, max_tasks_per_child: Optional[int] = OCR_MAX_TASKS_PER_CHILD) -> OcrWorkerPool:
+    """ Pool OCR compartilhado pelo processo (reutilizado entre ciclos; recriado se a configuração mudar). """
+    global _pool_ocr_compartilhado
+    novo = OcrWorkerPool(max_workers, max_tasks_per_child)
+    atual = _pool_ocr_compartilhado
+    if atual is None or (atual.max_workers, atual.max_tasks_per_child) != (novo.max_workers, novo.max_tasks_per_child):
+        if atual is not None: atual.shutdown()
+        _pool_ocr_compartilhado = novo
+    return _pool_ocr_compartilhado
+
+def encerrar_pool_ocr():
+    """ Encerra o pool OCR compartilhado (chamado também na saída do interpretador). """
+    global _pool_ocr_compartilhado
+    if _pool_ocr_compartilhado is not None: _pool_ocr_compartilhado.shutdown(); _pool_ocr_compartilhado = None
+
+atexit.register(encerrar_pool_ocr)
+
+
+# --- Pré-processamento ---
+def preprocessar_imagem(img: Image.Image, recortar: bool = True, reduzir: bool = True, binarizar: bool = False) -> Image.Image:
+    """
+    Pré-processa a imagem para o OCR; cada etapa pode ser desligada (sem nenhuma, devolve a própria imagem):
+    recorte para CROP_BOX_MAIN_TABLE (frações esquerda, topo, direita, base; elimina logo e rodapé),
+    redução para MAX_IMAGE_DIM_FOR_OCR no maior lado e binarização (limiar de Otsu).
+    """
+    resultado = img
+    if recortar and CROP_BOX_MAIN_TABLE: resultado = resultado.crop(_caixa_recorte(resultado.size))
+    if reduzir and _tamanho_reduzido(resultado.size) != resultado.size: resultado = resultado.resize(_tamanho_reduzido(resultado.size), Image.LANCZOS)
+    if binarizar:
+        cinza = np.asarray(resultado.convert("L"))
+        resultado = Image.fromarray(np.where(cinza > limiar_otsu(cinza), 255, 0).astype(np.uint8), mode="L")
+    return resultado
+
+def _caixa_recorte(tamanho: Tuple[int, int]) -> Tuple[int, int, int, int]:
+    largura, altura = tamanho; esq, topo, dir_, base = CROP_BOX_MAIN_TABLE
+    return round(esq * largura), round(topo * altura), round(dir_ * largura), round(base * altura)
+
+def _tamanho_reduzido(tamanho: Tuple[int, int]) -> Tuple[int, int]:
+    if not MAX_IMAGE_DIM_FOR_OCR or max(tamanho) <= MAX_IMAGE_DIM_FOR_OCR: return tamanho
+    escala = MAX_IMAGE_DIM_FOR_OCR / max(tamanho)
+    return max(1, round(tamanho[0] * escala)), max(1, round(tamanho[1] * escala))
+
+def tamanho_preprocessado(filepath: str, preprocessamento: Optional[Dict[str, bool]] = None) -> Tuple[int, int]:
+    """ Dimensões da imagem após o pré-processamento, lidas só do cabeçalho do arquivo (sem decodificar os pixels). """
+    opcoes = opcoes_preprocessamento(preprocessamento)
+    with Image.open(filepath) as img: tamanho = img.size
+    if opcoes.get("recortar") and CROP_BOX_MAIN_TABLE:
+        x1, y1, x2, y2 = _caixa_recorte(tamanho); tamanho = (x2 - x1, y2 - y1)
+    return _tamanho_reduzido(tamanho) if opcoes.get("reduzir") else tamanho
+
+def limiar_otsu(cinza: np.ndarray) -> int:
+    """ Limiar de Otsu (maximiza a variância entre fundo e texto) de uma imagem em tons de cinza. """
+    histograma = np.bincount(cinza.ravel(), minlength=256).astype(np.float64); niveis = np.arange(256)
+    peso_fundo = np.cumsum(histograma); peso_frente = cinza.size - peso_fundo
+    soma_fundo = np.cumsum(niveis * histograma); soma_total = soma_fundo[-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        variancia = peso_fundo * peso_frente * (soma_fundo / peso_fundo - (soma_total - soma_fundo) / peso_frente) ** 2
+    return int(np.nanargmax(variancia))
+
+def opcoes_preprocessamento(preprocessamento: Optional[Dict[str, bool]] = None) -> Dict[str, bool]:
+    """ Opções de pré-processamento completas (PREPROCESSAMENTO_PADRAO + ajustes informados). """
+    return {**PREPROCESSAMENTO_PADRAO, **(preprocessamento or {})}
+
+def assinatura_extrator(preprocessamento: Optional[Dict[str, bool]] = None, modo_ocr: str = OCR_MODO_PADRAO) -> str:
+    """ Versão do extrator + etapas de pré-processamento ativas + modo OCR (mudar qualquer um invalida a análise incremental). """
+    etapas = [etapa for etapa, ativa in sorted(opcoes_preprocessamento(preprocessamento).items()) if ativa]
+    return f"{EXTRACTOR_VERSION}|{','.join(etapas) or 'sem-preproc'}|{modo_ocr}"
+
+# --- Entrega da Imagem ao img2table ---
+def imagem_para_bytes(img: Image.Image, filepath: str, modificada: bool) -> bytes:
+    """
+    Bytes da imagem para o img2table (Img2TableDoc aceita bytes, sem arquivo temporário).
+    Sem pré-processamento, usa o JPG original (nenhuma recodificação); caso contrário, codifica
+    em BMP (sem compressão, decodificação trivial pelo OpenCV).
+    """
+    if not modificada:
+        with open(filepath, 'rb') as f: return f.read()
+    buffer = io.BytesIO()
+    (img if img.mode in ("RGB", "L") else img.convert("RGB")).save(buffer, format='BMP')
+    return buffer.getvalue()
+
+# --- Extração da Tabela ---
+def _modulo_local(nome: str):
+    """ Módulo irmão (ocr_template/ocr_cache): import relativo no pacote, direto na execução standalone. """
+    return importlib.import_module(f".{nome}", __package__) if __package__ else importlib.import_module(nome)
+
+def parametros_ocr(preprocessamento: Optional[Dict[str, bool]] = None, modo_ocr: str = OCR_MODO_PADRAO) -> Dict:
+    """ Parâmetros que alteram a leitura bruta do OCR (compõem a chave do cache OCR). """
+    return {"min_confidence": OCR_MIN_CONFIDENCE, "idiomas": OCR_IDIOMAS, "modo": modo_ocr,
+            "preprocessamento": opcoes_preprocessamento(preprocessamento), "crop_box": CROP_BOX_MAIN_TABLE,
+            "max_dim": MAX_IMAGE_DIM_FOR_OCR, "img2table": {"implicit_rows": True, "borderless_tables": True}}
+
+def chave_cache_ocr(ocr_cache, filepath: str, preprocessamento: Optional[Dict[str, bool]] = None, modo_ocr: str = OCR_MODO_PADRAO) -> str:
+    """
+    Chave do cache OCR de uma imagem: hash do conteúdo + parâmetros do OCR. No modo template inclui
+    o hash da grade do layout da imagem, de modo que um template novo ou reaprendido invalida as
+    leituras feitas com a grade anterior.
+    """
+    parametros = parametros_ocr(preprocessamento, modo_ocr)
+    if modo_ocr == "template":
+        ocr_template = _modulo_local("ocr_template")
+        grade = ocr_template.carregar_templates().get(ocr_template.chave_layout(*tamanho_preprocessado(filepath, preprocessamento)))
+        parametros["template"] = ocr_template.hash_grade(grade)
+    return ocr_cache.chave_cache(_hash_arquivo(filepath), parametros)
+
+def extrair_tabela(filepath: str, preprocessamento: Optional[Dict[str, bool]] = None,
+                   modo_ocr: str = OCR_MODO_PADRAO, usar_cache: bool = OCR_CACHE_ATIVO) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+    """
+    Extrai a primeira tabela de uma imagem (sem tratamento de cabeçalho), consultando antes o cache
+    do OCR (hash da imagem + parâmetros). Resultados novos são gravados no cache.
+    Retorna (DataFrame ou None, mensagem de erro ou None). Erros de abertura da imagem são propagados.
+    """
+    chave_ocr = None
+    if usar_cache:
+        ocr_cache = _modulo_local("ocr_cache")
+        chave_ocr = chave_cache_ocr(ocr_cache, filepath, preprocessamento, modo_ocr)
+        em_cache = ocr_cache.ler_resultado(chave_ocr)
+        if em_cache is not None: logger.info(f"W {os.getpid()}: Tabela do cache OCR: {os.path.basename(filepath)}."); return em_cache[0], None
+
+    df_tabela, confiancas, erro = _executar_ocr(filepath, preprocessamento, modo_ocr)
+    if chave_ocr is not None: _gravar_cache_ocr(ocr_cache, chave_ocr, filepath, df_tabela, confiancas, modo_ocr)
+    return df_tabela, erro
+
+def _gravar_cache_ocr(ocr_cache, chave_ocr: str, filepath: str, df_tabela: Optional[pd.DataFrame], confiancas: Optional[pd.DataFrame], modo_ocr: str):
+    """ Grava no cache OCR um resultado não vazio (falhas de gravação só geram aviso). """
+    if df_tabela is None or df_tabela.empty: return
+    try: ocr_cache.gravar_resultado(chave_ocr, df_tabela, confiancas, {"arquivo": os.path.basename(filepath), "modo": modo_ocr})
+    except Exception as cache_err: logger.warning(f"W {os.getpid()}: Falha ao gravar cache OCR de {os.path.basename(filepath)}: {cache_err}")
+
+def _abrir_preprocessada(filepath: str, preprocessamento: Optional[Dict[str, bool]], modo_ocr: str) -> Tuple[Tuple[int, int], Optional[np.ndarray], bytes]:
+    """ Abre e pré-processa uma imagem. Retorna (tamanho, imagem em tons de cinza para o template ou None, bytes para o img2table). """
+    with Image.open(filepath) as img_object_pil:
+        # 1-2. Abrir e Pré-processar (Recortar/Reduzir/Binarizar)
+        img_to_process = preprocessar_imagem(img_object_pil, **opcoes_preprocessamento(preprocessamento))
+        imagem_cinza = np.asarray(img_to_process.convert("L")) if modo_ocr == "template" else None
+        # 3. Entregar a imagem em memória (sem arquivo temporário)
+        imagem_bytes = imagem_para_bytes(img_to_process, filepath, modificada=img_to_process is not img_object_pil)
+        logger.debug(f"W {os.getpid()}: Imagem entregue em memória ({img_to_process.size}, {len(imagem_bytes)} bytes).")
+        return img_to_process.size, imagem_cinza, imagem_bytes
+
+def _executar_ocr(filepath: str, preprocessamento: Optional[Dict[str, bool]], modo_ocr: str,
+                  tentar_template: bool = True) -> Tuple[Optional[pd.DataFrame], Optional[pd.DataFrame], Optional[str]]:
+    """
+    Abre, pré-processa e roda o OCR sobre uma imagem.
+    No modo "template", lê apenas as células da grade conhecida para o layout da imagem; se não há
+    template ou o resultado não confere, usa o img2table e aprende o template do layout.
+    tentar_template=False pula a leitura pelo template (já tentada no lote) mas mantém o aprendizado.
+    Retorna (DataFrame ou None, confianças por célula quando disponíveis, mensagem de erro ou None).
+    """
+    worker_pid = os.getpid(); filename = os.path.basename(filepath)
+    tamanho, imagem_cinza, imagem_bytes = _abrir_preprocessada(filepath, preprocessamento, modo_ocr)
+
+    if not easyocr_disponivel(): return None, None, "ERRO_EASYOCR_NAO_DISPONIVEL_GLOBAL"
+    current_ocr_wrapper = obter_ocr_wrapper() # Já aquecido pelo initializer do pool
+    if current_ocr_wrapper is None: return None, None, "ERRO_OCR_INIT"
+
+    chave = None
+    if modo_ocr == "template": # Fast path: só reconhecimento nas células do template
+        ocr_template = _modulo_local("ocr_template"); chave = ocr_template.chave_layout(*tamanho)
+        grade = ocr_template.carregar_templates().get(chave) if tentar_template else None
+        if grade:
+            try:
+                df_template, confiancas = ocr_template.extrair_com_template(imagem_cinza, current_ocr_wrapper.reader, grade, OCR_MIN_CONFIDENCE, OCR_BATCH_SIZE) or (None, None)
+                if ocr_template.template_confere(df_template): logger.info(f"W {worker_pid}: Tabela extraída via template {chave}: {filename}."); return df_template, confiancas, None
+                logger.info(f"W {worker_pid}: Template {chave} não conferiu para {filename}. Usando img2table.")
+            except Exception as template_err: logger.warning(f"W {worker_pid}: Erro no template {chave} ({filename}): {template_err}. Usando img2table.")
+
+    from img2table.document import Image as Img2TableDoc
+    try: # Try img2table
+        img_doc = Img2TableDoc(src=imagem_bytes)
+        extracted_tables = img_doc.extract_tables(ocr=current_ocr_wrapper, implicit_rows=True, borderless_tables=True, min_confidence=OCR_MIN_CONFIDENCE)
+    except Exception as table_err: logger.warning(f"W {worker_pid}: Erro extração {filename}: {table_err}", exc_info=False); return None, None, f"ERRO_TABELA: {str(table_err)[:150]}"
+    if not extracted_tables: logger.warning(f"W {worker_pid}: Nenhuma tabela {filename}."); return None, None, "Nenhuma tabela encontrada"
+    logger.info(f"W {worker_pid}: Tabela extraída {filename}.")
+    if chave is not None and ocr_template.template_confere(extracted_tables[0].df): # Aprende (ou atualiza) o template deste layout
+        try: ocr_template.salvar_template(chave, ocr_template.aprender_template(extracted_tables[0]))
+        except Exception as learn_err: logger.warning(f"W {worker_pid}: Falha ao registrar template {chave}: {learn_err}")
+    return extracted_tables[0].df, None, None # img2table não expõe a confiança por célula
+
+# --- Extração em Lote ---
+def extrair_tabelas_lote(filepaths: List[str], preprocessamento: Optional[Dict[str, bool]] = None, modo_ocr: str = OCR_MODO_PADRAO,
+                         usar_cache: bool = OCR_CACHE_ATIVO) -> Dict[str, Tuple[Optional[pd.DataFrame], Optional[str]]]:
+    """
+    Extrai as tabelas de um lote de imagens. No modo template, as células de todas as imagens com
+    template conhecido são reconhecidas em UMA chamada ao EasyOCR (lotes de OCR_BATCH_SIZE recortes);
+    imagens sem template, cujo resultado não confere, ou no modo img2table seguem o caminho por imagem.
+    Retorna {caminho: (DataFrame ou None, mensagem de erro ou None)}.
+    """
+    worker_pid = os.getpid(); resultados = {}; pendentes = []
+    ocr_cache = _modulo_local("ocr_cache") if usar_cache else None
+    for fp in filepaths: # 1. Cache OCR
+        try:
+            chave_ocr = chave_cache_ocr(ocr_cache, fp, preprocessamento, modo_ocr) if ocr_cache else None
+            em_cache = ocr_cache.ler_resultado(chave_ocr) if chave_ocr else None
+        except (OSError, UnidentifiedImageError) as e: resultados[fp] = (None, f"ERRO_ARQUIVO: {e}"); continue
+        if em_cache is not None: resultados[fp] = (em_cache[0], None)
+        else: pendentes.append((fp, chave_ocr))
+
+    lote = []; wrapper = obter_ocr_wrapper() if pendentes and modo_ocr == "template" else None
+    if wrapper is not None: # 2. Template: recortes de todas as imagens do lote
+        ocr_template = _modulo_local("ocr_template"); templates = ocr_template.carregar_templates()
+        for fp, chave_ocr in pendentes:
+            try: tamanho, imagem_cinza, _ = _abrir_preprocessada(fp, preprocessamento, modo_ocr)
+            except Exception as e: logger.debug(f"W {worker_pid}: {os.path.basename(fp)} fora do lote ({e})."); continue
+            grade = templates.get(ocr_template.chave_layout(*tamanho))
+            celulas = ocr_template.recortes_template(imagem_cinza, grade) if grade else None
+            if celulas: lote.append((fp, chave_ocr, grade) + celulas)
+    if lote: # 3. Reconhecimento em lote
+        recortes = [r for *_, recortes_imagem in lote for r in recortes_imagem]
+        try:
+            inicio = time.time(); lidas = ocr_template.reconhecer_celulas(wrapper.reader, recortes, OCR_MIN_CONFIDENCE, OCR_BATCH_SIZE)
+            logger.info(f"W {worker_pid}: Lote de {len(lote)} imagens ({len(recortes)} células) reconhecido em {time.time() - inicio:.1f}s.")
+        except Exception as lote_err: logger.warning(f"W {worker_pid}: Erro no reconhecimento em lote: {lote_err}. Seguindo por imagem."); lidas = None
+        posicao = 0
+        for fp, chave_ocr, grade, caixas, recortes_imagem in (lote if lidas is not None else []):
+            df_tabela, confiancas = ocr_template.montar_tabela(grade, dict(zip(caixas, lidas[posicao:posicao + len(recortes_imagem)]))); posicao += len(recortes_imagem)
+            if ocr_template.template_confere(df_tabela):
+                resultados[fp] = (df_tabela, None)
+                if chave_ocr is not None: _gravar_cache_ocr(ocr_cache, chave_ocr, fp, df_tabela, confiancas, modo_ocr)
+    tentados = {item[0] for item in lote} if lote and lidas is not None else set()
+    for fp, chave_ocr in pendentes: # 4. Restantes: caminho por imagem (img2table)
+        if fp in resultados: continue
+        try: df_tabela, confiancas, erro = _executar_ocr(fp, preprocessamento, modo_ocr, tentar_template=fp not in tentados)
+        except Exception as e: resultados[fp] = (None, f"ERRO_IMAGEM: {e}"); continue
+        if chave_ocr is not None: _gravar_cache_ocr(ocr_cache, chave_ocr, fp, df_tabela, confiancas, modo_ocr)
+        resultados[fp] = (df_tabela, erro)
+    return resultados
+
+def _texto_mesclavel(valor) -> bool:
+    """ Célula de texto longo (não numérico): candidata a célula mesclada repetida pelo img2table. """
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)): return False
+    texto = str(valor).strip()
+    return len(texto) >= TEXTO_MESCLADO_MIN and not re.fullmatch(r"[\d\s.,%R$-]+", texto)
+
+def separar_celulas_mescladas(df_tabela: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+    """
+    Separa do DataFrame o que o img2table repete em células mescladas:
+    - Linhas de rodapé (um único texto ocupando a linha inteira, ex.: notas de fonte) saem da grade.
+    - Demais textos longos repetidos em colunas/linhas vizinhas ficam só na 1ª célula, com o span registrado.
+    - Colunas e linhas que ficam vazias (fora da grade combustível x refinaria) são removidas.
+    Retorna (grade, notas) com notas = {"rodape": [textos], "mesclas": [{linha, coluna, linhas, colunas, valor}]}.
+    """
+    notas: Dict = {"rodape": [], "mesclas": []}
+    if df_tabela is None or df_tabela.empty: return df_tabela, notas
+    df = df_tabela.astype(object).where(df_tabela.notna(), None).reset_index(drop=True)
+    df.columns = range(df.shape[1])
+
+    # 1. Rodapé: linhas com um único valor textual repetido em (quase) todas as colunas
+    linhas_rodape = []
+    for i, linha in df.iterrows():
+        preenchidas = [v for v in linha if v is not None]
+        if preenchidas and len(set(map(str, preenchidas))) == 1 and _texto_mesclavel(preenchidas[0]) and len(preenchidas) >= max(1, df.shape[1] - 1):
+            linhas_rodape.append(i)
+            if str(preenchidas[0]) not in notas["rodape"]: notas["rodape"].append(str(preenchidas[0]))
+    df = df.drop(index=linhas_rodape).reset_index(drop=True)
+
+    # 2. Spans: textos longos repetidos à direita/abaixo ficam só na célula de origem
+    valores = df.to_numpy(dtype=object); visitadas = np.zeros(valores.shape, dtype=bool)
+    for i in range(valores.shape[0]):
+        for j in range(valores.shape[1]):
+            valor = valores[i, j]
+            if visitadas[i, j] or not _texto_mesclavel(valor): continue
+            colunas = 1
+            while j + colunas < valores.shape[1] and valores[i, j + colunas] == valor: colunas += 1
+            linhas = 1
+            while i + linhas < valores.shape[0] and all(valores[i + linhas, j + k] == valor for k in range(colunas)): linhas += 1
+            if colunas > 1 or linhas > 1:
+                visitadas[i:i + linhas, j:j + colunas] = True; valores[i:i + linhas, j:j + colunas] = None; valores[i, j] = valor
+                notas["mesclas"].append({"linha": i, "coluna": j, "linhas": linhas, "colunas": colunas, "valor": str(valor)})
+
+    # 3. Remove linhas/colunas vazias (fora da grade) e ajusta as posições dos spans à grade final
+    df = pd.DataFrame(valores).dropna(how="all").dropna(axis=1, how="all")
+    nova_linha = {original: nova for nova, original in enumerate(df.index)}; nova_coluna = {original: nova for nova, original in enumerate(df.columns)}
+    for mescla in notas["mesclas"]: mescla["linha"] = nova_linha[mescla["linha"]]; mescla["coluna"] = nova_coluna[mescla["coluna"]]
+    df = df.reset_index(drop=True); df.columns = range(df.shape[1])
+    return df, notas
+
+def preencher_cabecalhos(df_tabela: pd.DataFrame, mesclas: Optional[List[Dict]] = None) -> pd.DataFrame:
+    """
+    Preenche valores vazios (NaN/None) nas linhas de cabeçalho (índice 0 e 1) usando o último
+    valor válido encontrado à esquerda (cabeçalhos mesclados). Células de um span já registrado por
+    separar_celulas_mescladas (notas["mesclas"]) ficam como estão e o valor do span não é propagado.
+    Em caso de erro, mantém a tabela original.
+    """
+    try:
+        for i in range(min(2, len(df_tabela))): # Garante que as linhas 0 e 1 existem
+            linha = df_tabela.iloc[i].copy(); no_span = pd.Series(False, index=linha.index)
+            for m in mesclas or []:
+                if m["linha"] <= i < m["linha"] + m["linhas"]: no_span.iloc[m["coluna"]:m["coluna"] + m["colunas"]] = True
+            df_tabela.iloc[i] = linha.where(no_span, linha.mask(no_span).ffill())
+    except Exception as header_err:
+        logger.warning(f"Erro ao preencher cabeçalhos: {header_err}. Salvando tabela original.")
+    return df_tabela
 
 # --- Função Worker (com Header Fill) ---
-def processar_e_salvar_tabela_individual(filepath: str, base_dir: str, organizar_por_mes: bool) -> bool:
+def processar_e_salvar_tabela_individual(filepath: str, base_dir: str, organizar_por_mes: bool,
+                                         preprocessamento: Optional[Dict[str, bool]] = None, modo_ocr: str = OCR_MODO_PADRAO,
+                                         tabela_extraida: Optional[Tuple[Optional[pd.DataFrame], Optional[str]]] = None) -> bool:
     """
-    Worker: Processa UMA imagem. Extrai data, pré-processa, extrai tabela,
-    PREENCHE CABEÇALHOS, salva CSV individual em MM-YYYY. Retorna True/False.
+    Worker: Processa UMA imagem. Extrai data, pré-processa, extrai tabela (ou usa tabela_extraida,
+    vinda do lote), PREENCHE CABEÇALHOS, salva CSV individual em MM-YYYY. Retorna True/False.
     """
-    global _worker_ocr_wrappers
     worker_pid = os.getpid(); worker_logger = logging.getLogger(f"{__name__}.worker{worker_pid}")
     filename = os.path.basename(filepath)
     worker_logger.debug(f"W {worker_pid}: Iniciando: {filename}")
@@ -88,132 +473,298 @@ def processar_e_salvar_tabela_individual(filepath: str, base_dir: str, organizar
     if not data_extraida_ok: worker_logger.error(f"W {worker_pid}: Data inválida {filename}. Abortando."); return False
     # --- Fim Extração Data ---
 
-    img_object_pil = None; temp_filepath = None; df_tabela_principal = None; success = False
+    df_tabela_principal = None; success = False
     try: # Bloco Principal
-        # 1. Abrir Imagem
-        img_object_pil = Image.open(filepath)
-        img_to_process = img_object_pil
-        # 2. Pré-processamento (Opcional: Redimensionar/Cortar)
-        # ...
-
-        # 3. Salvar Temp e Extrair Tabela
-        try: # Try interno para limpar temp file
-            temp_filename = f"{os.path.splitext(filename)[0]}_pid{worker_pid}_proc.png"
-            temp_filepath = os.path.join(DATA_DIR, temp_filename)
-            img_to_process.save(temp_filepath, format='PNG')
-            worker_logger.debug(f"W {worker_pid}: Img proc salva temp: {temp_filepath}")
-
-            ocr_error_msg = None; extracted_tables = None; df_tabela_principal = None
-            if easyocr_available:
-                # ... (Lógica OCR wrapper como antes) ...
-                 current_ocr_wrapper = _worker_ocr_wrappers.get(worker_pid)
-                 if current_ocr_wrapper is None:
-                    try: current_ocr_wrapper = Img2TableEasyOCR(lang=['pt', 'en']); _worker_ocr_wrappers[worker_pid] = current_ocr_wrapper; worker_logger.info(f"W {worker_pid}: Wrapper OCR init OK.")
-                    except Exception as e: ocr_error_msg = f"ERRO_OCR_INIT: {e}"; _worker_ocr_wrappers[worker_pid] = False; worker_logger.error(f"W {worker_pid}: Falha init OCR: {e}")
-                 if isinstance(current_ocr_wrapper, Img2TableEasyOCR):
-                     try: # Try img2table
-                         img_doc = Img2TableDoc(src=temp_filepath)
-                         extracted_tables = img_doc.extract_tables(ocr=current_ocr_wrapper, implicit_rows=True, borderless_tables=True, min_confidence=50)
-                         if extracted_tables: df_tabela_principal = extracted_tables[0].df; worker_logger.info(f"W {worker_pid}: Tabela extraída {filename}.")
-                         else: ocr_error_msg = "Nenhuma tabela encontrada"; worker_logger.warning(f"W {worker_pid}: Nenhuma tabela {filename}.")
-                     except Exception as table_err: ocr_error_msg = f"ERRO_TABELA: {str(table_err)[:150]}"; worker_logger.warning(f"W {worker_pid}: Erro extração {filename}: {table_err}", exc_info=False)
-                 elif current_ocr_wrapper is False: ocr_error_msg = "ERRO_OCR_INIT_ANTERIOR"
-            else: ocr_error_msg = "ERRO_EASYOCR_NAO_DISPONIVEL_GLOBAL"
-
-            # 4. Salvar Tabela Individual (SE FOI EXTRAÍDA)
-            if isinstance(df_tabela_principal, pd.DataFrame) and not df_tabela_principal.empty:
-                worker_logger.debug(f"W {worker_pid}: Tabela válida ({df_tabela_principal.shape}). Pré-processando cabeçalho...")
-
-                # --- *** ADICIONADO: Pré-processamento do Cabeçalho (ffill) *** ---
-                try:
-                    # Preenche valores vazios (NaN/None) nas linhas de cabeçalho (índice 0 e 1)
-                    # usando o último valor válido encontrado à esquerda (axis=1).
-                    if len(df_tabela_principal) > 0: # Garante que linha 0 existe
-                        df_tabela_principal.iloc[0] = df_tabela_principal.iloc[0].ffill()
-                        worker_logger.debug(f"W {worker_pid}: Cabeçalho linha 0 preenchido (ffill).")
-                    if len(df_tabela_principal) > 1: # Garante que linha 1 existe
-                        df_tabela_principal.iloc[1] = df_tabela_principal.iloc[1].ffill()
-                        worker_logger.debug(f"W {worker_pid}: Cabeçalho linha 1 preenchido (ffill).")
-                except Exception as header_err:
-                     # Se der erro ao preencher, loga e continua para salvar a tabela original
-                     worker_logger.warning(f"W {worker_pid}: Erro ao preencher cabeçalhos: {header_err}. Salvando tabela original.")
-                # --- Fim do Pré-processamento do Cabeçalho ---
-
-                # Define caminho da subpasta MM-YYYY
-                caminho_subpasta = os.path.join(OUTPUT_DIR_BASE_TABELAS, pasta_mes_ano)
-                os.makedirs(caminho_subpasta, exist_ok=True)
-
-                # Define nome do arquivo CSV
-                nome_base_sem_ext = os.path.splitext(filename)[0]
-                nome_arquivo_saida = f"{nome_base_sem_ext}_tabela.csv"
-                caminho_saida_individual = os.path.join(caminho_subpasta, nome_arquivo_saida)
-
-                try: # Tenta salvar o CSV (agora com cabeçalhos preenchidos)
-                    worker_logger.info(f"W {worker_pid}: Salvando tabela em: {caminho_saida_individual}")
-                    df_tabela_principal.to_csv(caminho_saida_individual, index=False, encoding='utf-8-sig')
-                    if os.path.isfile(caminho_saida_individual):
-                         worker_logger.info(f"W {worker_pid}: Tabela salva SUCESSO: {nome_arquivo_saida}")
-                         success = True # Marca sucesso FINAL
-                    else: ocr_error_msg = (ocr_error_msg + "; " if ocr_error_msg else "") + "Falha conf salvamento CSV"; worker_logger.error(f"W {worker_pid}: ERRO PÓS-SALVAR CSV: {caminho_saida_individual}")
-                except Exception as save_err: ocr_error_msg = (ocr_error_msg + "; " if ocr_error_msg else "") + f"Erro salvamento CSV: {save_err}"; worker_logger.error(f"W {worker_pid}: Erro salvar CSV {filename}: {save_err}", exc_info=True)
-            else: worker_logger.warning(f"W {worker_pid}: Nenhuma tabela válida de {filename} para salvar. Erro OCR/Tabela: {ocr_error_msg}")
-
-        # Captura erro no try interno
-        except Exception as inner_e: logger.error(f"Erro INTERNO W {worker_pid} {filename}: {inner_e}", exc_info=True)
-        finally: # Limpa temp file
-            if temp_filepath and os.path.exists(temp_filepath):
-                try: os.remove(temp_filepath); logger.debug(f"W {worker_pid}: Temp file interno removido.")
-                except OSError as e: worker_logger.error(f"W {worker_pid}: Falha remover temp file: {e}")
-
-    # Captura erros no try externo
+        # 1-3. Abrir, Pré-processar e Extrair Tabela
+        df_tabela_principal, ocr_error_msg = tabela_extraida if tabela_extraida is not None else extrair_tabela(filepath, preprocessamento, modo_ocr)
+
+        # 4. Salvar Tabela Individual (SE FOI EXTRAÍDA)
+        if isinstance(df_tabela_principal, pd.DataFrame) and not df_tabela_principal.empty:
+            worker_logger.debug(f"W {worker_pid}: Tabela válida ({df_tabela_principal.shape}). Pré-processando cabeçalho...")
+            df_tabela_principal, notas = separar_celulas_mescladas(df_tabela_principal)
+            df_tabela_principal = preencher_cabecalhos(df_tabela_principal, notas["mesclas"])
+
+            # Define caminho do CSV na subpasta MM-YYYY
+            caminho_saida_individual = caminho_csv_saida(filepath)
+            nome_arquivo_saida = os.path.basename(caminho_saida_individual)
+            os.makedirs(os.path.dirname(caminho_saida_individual), exist_ok=True)
+
+            try: # Tenta salvar o CSV (agora com cabeçalhos preenchidos)
+                worker_logger.info(f"W {worker_pid}: Salvando tabela em: {caminho_saida_individual}")
+                df_tabela_principal.to_csv(caminho_saida_individual, index=False, encoding='utf-8-sig')
+                salvar_notas(caminho_notas_saida(filepath), notas, filename)
+                salvar_valores(caminho_valores_saida(filepath), df_tabela_principal, f"{year}-{month}-{day}", filename)
+                if os.path.isfile(caminho_saida_individual):
+                     worker_logger.info(f"W {worker_pid}: Tabela salva SUCESSO: {nome_arquivo_saida}")
+                     success = True # Marca sucesso FINAL
+                else: ocr_error_msg = (ocr_error_msg + "; " if ocr_error_msg else "") + "Falha conf salvamento CSV"; worker_logger.error(f"W {worker_pid}: ERRO PÓS-SALVAR CSV: {caminho_saida_individual}")
+            except Exception as save_err: ocr_error_msg = (ocr_error_msg + "; " if ocr_error_msg else "") + f"Erro salvamento CSV: {save_err}"; worker_logger.error(f"W {worker_pid}: Erro salvar CSV {filename}: {save_err}", exc_info=True)
+        else: worker_logger.warning(f"W {worker_pid}: Nenhuma tabela válida de {filename} para salvar. Erro OCR/Tabela: {ocr_error_msg}")
+
+    # Captura erros
     except FileNotFoundError: logger.error(f"Arquivo original não encontrado: {filepath}")
     except UnidentifiedImageError: logger.warning(f"Imagem inválida/corrompida: {filename}")
     except Exception as outer_e: logger.error(f"Erro GERAL EXTERNO W {worker_pid} {filename}: {outer_e}", exc_info=True)
-    # Finally externo (Fecha imagem PIL)
-    finally:
-        if img_object_pil:
-             try: img_object_pil.close()
-             except Exception: pass
 
     # Log final e retorno
     log_func = worker_logger.info if success else worker_logger.warning
     log_func(f"W[{worker_pid}] --- Finalizado: {filename} -> {'OK (Tabela salva)' if success else 'FALHA (Tabela não salva)'} ---")
     return success
 
+def processar_lote_tabelas(filepaths: List[str], base_dir: str, organizar_por_mes: bool,
+                           preprocessamento: Optional[Dict[str, bool]] = None, modo_ocr: str = OCR_MODO_PADRAO) -> List[bool]:
+    """ Worker em lote: extrai as tabelas de várias imagens de uma vez e salva cada CSV. Retorna True/False por imagem. """
+    try: extraidas = extrair_tabelas_lote([fp for fp in filepaths if caminho_csv_saida(fp)], preprocessamento, modo_ocr)
+    except Exception as lote_err: logger.error(f"W {os.getpid()}: Erro no lote ({len(filepaths)} imagens): {lote_err}", exc_info=True); extraidas = {}
+    return [processar_e_salvar_tabela_individual(fp, base_dir, organizar_por_mes, preprocessamento, modo_ocr, extraidas.get(fp)) for fp in filepaths]
+
+# --- Duplicatas (manifesto de downloads) ---
+def abrir_manifesto():
+    """ Abre o manifesto de downloads (duplicatas e estado da análise). Retorna None se indisponível. """
+    try:
+        from .services.manifest import DownloadManifest
+        return DownloadManifest()
+    except Exception as e: logger.warning(f"Manifesto indisponível ({e}). Duplicatas e análise incremental desativadas."); return None
+
+# --- Análise Incremental ---
+def caminho_csv_saida(filepath: str) -> Optional[str]:
+    """ Caminho do CSV gerado para uma imagem (data/tabelas_por_mes/MM-YYYY/<nome>_tabela.csv) ou None se o nome não tem data. """
+    data_match = filename_date_pattern.search(os.path.basename(filepath))
+    if not data_match: return None
+    _, month, year, _ = data_match.groups()
+    return os.path.join(OUTPUT_DIR_BASE_TABELAS, f"{month}-{year}", f"{os.path.splitext(os.path.basename(filepath))[0]}_tabela.csv")
+
+def caminho_notas_saida(filepath: str) -> Optional[str]:
+    """ Caminho das notas (rodapé e células mescladas) de uma imagem: '<nome>_notas.json' ao lado do CSV. """
+    saida = caminho_csv_saida(filepath)
+    return saida[:-len("_tabela.csv")] + "_notas.json" if saida else None
+
+def salvar_notas(caminho: Optional[str], notas: Dict, fonte: str):
+    """ Grava as notas separadas da grade (remove um arquivo antigo se não houver notas). """
+    if not caminho: return
+    if not notas.get("rodape") and not notas.get("mesclas"):
+        if os.path.isfile(caminho): os.remove(caminho)
+        return
+    with open(caminho, 'w', encoding='utf-8') as f: json.dump({"fonte": fonte, **notas}, f, ensure_ascii=False, indent=1)
+
+def caminho_valores_saida(filepath: str) -> Optional[str]:
+    """ Caminho da tabela tipada (valores normalizados) de uma imagem: '<nome>_valores.csv' ao lado do CSV. """
+    saida = caminho_csv_saida(filepath)
+    return saida[:-len("_tabela.csv")] + "_valores.csv" if saida else None
+
+def salvar_valores(caminho: Optional[str], df_tabela: pd.DataFrame, data: str, fonte: str):
+    """ Normaliza os valores da tabela (src/normalizacao.py) e grava a saída tipada. Falhas só geram aviso. """
+    if not caminho: return
+    try:
+        valores = _modulo_local("normalizacao").normalizar_tabela(df_tabela, data)
+        if valores.empty: logger.warning(f"W {os.getpid()}: Grade combustível x refinaria não encontrada em {fonte}. Sem valores normalizados."); return
+        valores.to_csv(caminho, index=False, encoding='utf-8', date_format='%Y-%m-%d', float_format='%.4f')
+        logger.debug(f"W {os.getpid()}: Valores normalizados de {fonte}: {_modulo_local('normalizacao').resumo_flags(valores)}")
+    except Exception as e: logger.warning(f"W {os.getpid()}: Falha ao normalizar valores de {fonte}: {e}")
+
+def _hash_arquivo(filepath: str) -> str:
+    """ SHA-256 do conteúdo de uma imagem. """
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for bloco in iter(lambda: f.read(65536), b''): digest.update(bloco)
+    return digest.hexdigest()
+
+def analise_atualizada(filepath: str, estado: Optional[Dict], versao_extrator: str) -> bool:
+    """
+    Indica se a saída de uma imagem está em dia: CSV existente, mesma versão do extrator e mesmo
+    conteúdo. O hash só é recalculado quando tamanho/mtime mudaram desde a última análise.
+    """
+    saida = caminho_csv_saida(filepath)
+    if not estado or not saida or not os.path.isfile(saida) or estado["extractor_version"] != versao_extrator: return False
+    stat = os.stat(filepath)
+    if stat.st_size == estado["size"] and stat.st_mtime == estado["mtime"]: return True
+    return _hash_arquivo(filepath) == estado["sha256"]
+
+def registrar_analise(manifest, filepath: str, versao_extrator: str):
+    """ Registra no manifesto o estado da imagem analisada com sucesso. """
+    try:
+        stat = os.stat(filepath)
+        manifest.record_analysis(os.path.abspath(filepath), _hash_arquivo(filepath), versao_extrator, stat.st_size, stat.st_mtime, caminho_csv_saida(filepath))
+    except Exception as e: logger.warning(f"Falha ao registrar estado da análise de {filepath}: {e}")
+
 # --- Função Coordenadora Paralela ---
-# (Mantida como antes - conta sucessos/falhas dos workers)
-def analisar_e_salvar_paralelo(diretorio_base: str, organizar_por_mes: bool, max_workers: Optional[int] = None) -> Tuple[int, int]:
-    """ Coordena análise/salvamento paralelo. Retorna (sucessos, falhas). """
+# (Conta sucessos/falhas dos workers e as imagens puladas por já estarem em dia)
+def analisar_e_salvar_paralelo(diretorio_base: str, organizar_por_mes: bool, max_workers: Optional[int] = None,
+                               pool: Optional[OcrWorkerPool] = None, max_tasks_per_child: Optional[int] = OCR_MAX_TASKS_PER_CHILD,
+                               force: bool = False, preprocessamento: Optional[Dict[str, bool]] = None,
+                               modo_ocr: str = OCR_MODO_PADRAO, lote_imagens: int = OCR_LOTE_IMAGENS) -> Tuple[int, int, int]:
+    """
+    Coordena análise/salvamento paralelo no pool OCR persistente (o informado ou o compartilhado).
+    Imagens duplicadas ou com CSV em dia são puladas (exceto com force=True). Com lote_imagens > 1, cada
+    tarefa do pool processa um lote de imagens (reconhecimento em lote). Retorna (sucessos, falhas, pulados).
+    """
     start_time = time.time(); logger.info(f"Iniciando análise/salvamento de tabelas individuais em: {diretorio_base}")
     try: all_files_paths = [os.path.join(r, f) for r, d, fs in os.walk(diretorio_base) for f in fs if f.lower().endswith(tuple(IMAGE_EXTENSIONS))]; total_files = len(all_files_paths); logger.info(f"Encontrados {total_files} arquivos para analisar/salvar."); # Removido Assert
-    except Exception as walk_err: logger.error(f"Erro ao listar arquivos: {walk_err}"); return 0, 1
-    if total_files == 0: logger.warning("Nenhum arquivo de imagem encontrado."); return 0, 0
-
-    success_count = 0; failure_count = 0; workers = max_workers if isinstance(max_workers, int) and max_workers > 0 else os.cpu_count(); logger.info(f"Usando até {workers} processos.")
-    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
-        futures = {executor.submit(processar_e_salvar_tabela_individual, fp, diretorio_base, organizar_por_mes): fp for fp in all_files_paths}
-        processed_count = 0
-        for future in concurrent.futures.as_completed(futures):
-            filepath = futures[future]; processed_count += 1
-            try: worker_success = future.result();
-            except Exception as exc: logger.error(f'Worker {os.path.basename(filepath)} CRASHOU: {exc}', exc_info=True); worker_success = False
-            if worker_success: success_count += 1
+    except Exception as walk_err: logger.error(f"Erro ao listar arquivos: {walk_err}"); return 0, 1, 0
+    if total_files == 0: logger.warning("Nenhum arquivo de imagem encontrado."); return 0, 0, 0
+
+    manifest = abrir_manifesto()
+    try:
+        resultado = _analisar_arquivos(all_files_paths, diretorio_base, organizar_por_mes, manifest, max_workers, pool, max_tasks_per_child, force, preprocessamento, modo_ocr, lote_imagens, start_time)
+    finally:
+        if manifest is not None: manifest.close()
+    atualizar_dataset_ppi()
+    return resultado
+
+def atualizar_dataset_ppi():
+    """ Atualiza as partições desatualizadas do dataset Parquet consolidado (src/dataset_ppi.py). Falhas só geram aviso. """
+    try: _modulo_local("dataset_ppi").atualizar_dataset(tabelas_dir=OUTPUT_DIR_BASE_TABELAS)
+    except Exception as e: logger.warning(f"Falha ao atualizar o dataset Parquet do PPI: {e}")
+
+def _analisar_arquivos(all_files_paths: List[str], diretorio_base: str, organizar_por_mes: bool, manifest, max_workers: Optional[int],
+                       pool: Optional[OcrWorkerPool], max_tasks_per_child: Optional[int], force: bool,
+                       preprocessamento: Optional[Dict[str, bool]], modo_ocr: str, lote_imagens: int, start_time: float) -> Tuple[int, int, int]:
+    """ Filtra duplicatas/imagens em dia e envia as restantes ao pool OCR. Retorna (sucessos, falhas, pulados). """
+    skipped_count = 0; versao_extrator = assinatura_extrator(preprocessamento, modo_ocr)
+    if manifest is not None:
+        duplicatas = manifest.duplicate_paths()
+        pendentes = [fp for fp in all_files_paths if os.path.abspath(fp) not in duplicatas]
+        skipped_count += len(all_files_paths) - len(pendentes)
+        if skipped_count: logger.info(f"{skipped_count} imagens com conteúdo duplicado ignoradas (OCR já feito no original).")
+        if not force:
+            estados = manifest.load_analysis_state(); antes = len(pendentes)
+            pendentes = [fp for fp in pendentes if not analise_atualizada(fp, estados.get(os.path.abspath(fp)), versao_extrator)]
+            skipped_count += antes - len(pendentes)
+            logger.info(f"Análise incremental: {antes - len(pendentes)} imagens já analisadas (CSV em dia), {len(pendentes)} a processar.")
+        all_files_paths = pendentes
+    total_files = len(all_files_paths)
+    if total_files == 0: logger.info("Nenhuma imagem nova ou alterada para analisar."); return 0, 0, skipped_count
+
+    success_count = 0; failure_count = 0
+    pool = pool if pool is not None else obter_pool_ocr(max_workers, max_tasks_per_child); logger.info(f"Usando até {pool.max_workers} processos (pool OCR persistente).")
+    # O pool não é encerrado aqui: é reaproveitado pelo próximo ciclo de análise
+    lote_imagens = max(1, lote_imagens or 1); inicio_ocr = time.time()
+    if lote_imagens > 1:
+        lotes = [all_files_paths[i:i + lote_imagens] for i in range(0, total_files, lote_imagens)]
+        futures = {pool.submit(processar_lote_tabelas, lote, diretorio_base, organizar_por_mes, preprocessamento, modo_ocr): lote for lote in lotes}
+    else: futures = {pool.submit(processar_e_salvar_tabela_individual, fp, diretorio_base, organizar_por_mes, preprocessamento, modo_ocr): [fp] for fp in all_files_paths}
+    processed_count = 0
+    for future in concurrent.futures.as_completed(futures):
+        arquivos = futures[future]
+        try: resultados_worker = future.result(); resultados_worker = resultados_worker if isinstance(resultados_worker, list) else [resultados_worker]
+        except Exception as exc: logger.error(f'Worker {os.path.basename(arquivos[0])} (+{len(arquivos) - 1}) CRASHOU: {exc}', exc_info=True); resultados_worker = [False] * len(arquivos)
+        for filepath, worker_success in zip(arquivos, resultados_worker):
+            processed_count += 1
+            if worker_success:
+                success_count += 1
+                if manifest is not None: registrar_analise(manifest, filepath, versao_extrator)
             else: failure_count += 1
             if processed_count % 20 == 0 or processed_count == total_files: logger.info(f"Progresso Salvar Tabelas Indiv.: {processed_count}/{total_files} concluídos ({success_count} S, {failure_count} F).")
     end_time = time.time(); logger.info(f"Processamento concluído em {end_time - start_time:.2f} s.")
-    logger.info(f"Resultado Final: {success_count} tabelas individuais salvas, {failure_count} falhas.")
-    return success_count, failure_count
+    logger.info(f"Vazão OCR: {processed_count / max(end_time - inicio_ocr, 1e-9) * 60:.1f} imagens/min ({'lotes de ' + str(lote_imagens) + ' imagens' if lote_imagens > 1 else 'por imagem'}).")
+    logger.info(f"Resultado Final: {success_count} tabelas individuais salvas, {failure_count} falhas, {skipped_count} puladas.")
+    return success_count, failure_count, skipped_count
+
+
+# --- Pipeline: Download → OCR em Fluxo ---
+class PipelineOcr:
+    """
+    Analisa as imagens assim que são baixadas, sem esperar o fim do scraping.
+    Os caminhos entram numa fila limitada (enviar bloqueia quando cheia = contrapressão sobre os downloads)
+    e uma thread despachante os envia ao pool OCR persistente, com no máximo 'max_workers' tarefas em
+    andamento. A latência de cada imagem (entrada na fila → CSV salvo) é registrada.
+    """
+    def __init__(self, organizar_por_mes: bool, max_workers: Optional[int] = None, tamanho_fila: Optional[int] = None,
+                 max_tasks_per_child: Optional[int] = OCR_MAX_TASKS_PER_CHILD, preprocessamento: Optional[Dict[str, bool]] = None,
+                 modo_ocr: str = OCR_MODO_PADRAO, force: bool = False):
+        self.organizar_por_mes = organizar_por_mes; self.preprocessamento = preprocessamento; self.modo_ocr = modo_ocr; self.force = force
+        self.pool = obter_pool_ocr(max_workers, max_tasks_per_child)
+        self.fila: "queue.Queue[Optional[Tuple[str, float]]]" = queue.Queue(maxsize=tamanho_fila or 2 * self.pool.max_workers)
+        self.versao_extrator = assinatura_extrator(preprocessamento, modo_ocr); self.manifest = abrir_manifesto()
+        self.sucessos = 0; self.falhas = 0; self.pulados = 0; self.latencias: List[float] = []
+        self._vagas = threading.Semaphore(self.pool.max_workers); self._lock = threading.Lock(); self._futures = []; self._encerrado = False
+        self._inicio = time.time(); self._despachante = threading.Thread(target=self._despachar, name="pipeline-ocr", daemon=True)
+        self._despachante.start()
+        logger.info(f"Pipeline OCR iniciado (fila de {self.fila.maxsize}, {self.pool.max_workers} processos).")
+
+    def enviar(self, filepath: str):
+        """ Enfileira uma imagem recém-baixada (bloqueia enquanto a fila estiver cheia e o despachante estiver ativo). """
+        if not self._colocar((filepath, time.time())):
+            logger.error(f"Pipeline OCR parado: {os.path.basename(filepath)} fica para a análise ao fim do scraping.")
+            with self._lock: self.falhas += 1
+
+    def _colocar(self, item) -> bool:
+        """ put na fila que não bloqueia para sempre se a thread despachante morreu. Retorna False se o item não entrou. """
+        while self._despachante.is_alive():
+            try: self.fila.put(item, timeout=PIPELINE_ESPERA_FILA_S); return True
+            except queue.Full: continue
+        return False
+
+    def _despachar(self):
+        """ Thread despachante: fila → pool OCR, respeitando o número de tarefas em andamento. Um erro numa imagem conta como falha e não para a thread. """
+        while True:
+            item = self.fila.get()
+            if item is None: break
+            filepath, enfileirado_em = item
+            try: self._submeter(filepath, enfileirado_em)
+            except Exception as e:
+                logger.error(f"Pipeline OCR: falha ao despachar {os.path.basename(filepath)}: {e}", exc_info=True)
+                with self._lock: self.falhas += 1
+
+    def _submeter(self, filepath: str, enfileirado_em: float):
+        """ Pula a imagem se a análise está em dia; senão ocupa uma vaga e a envia ao pool (a vaga é devolvida se o envio falhar). """
+        estado = None
+        if not self.force and self.manifest is not None:
+            try: estado = self.manifest.get_analysis_state(os.path.abspath(filepath))
+            except Exception as e: logger.debug(f"Estado da análise indisponível para {filepath}: {e}")
+        if estado is not None and analise_atualizada(filepath, estado, self.versao_extrator):
+            with self._lock: self.pulados += 1
+            return
+        self._vagas.acquire()
+        try: future = self.pool.submit(processar_e_salvar_tabela_individual, filepath, os.path.dirname(filepath), self.organizar_por_mes, self.preprocessamento, self.modo_ocr)
+        except BaseException: self._vagas.release(); raise
+        with self._lock: self._futures.append(future)
+        future.add_done_callback(lambda f, fp=filepath, t=enfileirado_em: self._concluir(f, fp, t))
+
+    def _concluir(self, future, filepath: str, enfileirado_em: float):
+        """ Callback de conclusão: contabiliza, registra a análise e libera a vaga (sempre). """
+        try:
+            try: sucesso = future.result()
+            except Exception as exc: logger.error(f'Worker {os.path.basename(filepath)} CRASHOU: {exc}', exc_info=True); sucesso = False
+            latencia = time.time() - enfileirado_em
+            with self._lock:
+                if sucesso: self.sucessos += 1; self.latencias.append(latencia)
+                else: self.falhas += 1
+            if sucesso:
+                logger.info(f"Pipeline OCR: {os.path.basename(filepath)} analisada {latencia:.1f}s após o download.")
+                if self.manifest is not None: registrar_analise(self.manifest, filepath, self.versao_extrator)
+        finally: self._vagas.release()
+
+    def encerrar(self) -> Tuple[int, int, int]:
+        """ Aguarda as imagens enfileiradas terminarem e fecha o manifesto. Retorna (sucessos, falhas, pulados). """
+        if self._encerrado: return self.sucessos, self.falhas, self.pulados
+        self._encerrado = True; self._colocar(None); self._despachante.join()
+        with self._lock: futures = list(self._futures)
+        concurrent.futures.wait(futures)
+        if self.manifest is not None: self.manifest.close(); self.manifest = None
+        if self.sucessos: atualizar_dataset_ppi()
+        total = self.sucessos + self.falhas; duracao = time.time() - self._inicio
+        if self.latencias: logger.info(f"Pipeline OCR: latência download→CSV média {sum(self.latencias) / len(self.latencias):.1f}s, máx. {max(self.latencias):.1f}s.")
+        logger.info(f"Pipeline OCR encerrado: {self.sucessos} tabelas salvas, {self.falhas} falhas, {self.pulados} puladas em {duracao:.1f}s ({total} imagens).")
+        return self.sucessos, self.falhas, self.pulados
+
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc_val, exc_tb): self.encerrar()
 
 
 # --- Função Principal de Análise e Reporte ---
 # (Mantida como antes - apenas reporta as contagens)
-def executar_e_reportar_analise(diretorio_imagens: str, organizar_por_mes: bool, diretorio_csv: str, num_workers: Optional[int] = None):
+def executar_e_reportar_analise(diretorio_imagens: str, organizar_por_mes: bool, diretorio_csv: str, num_workers: Optional[int] = None,
+                                max_tasks_per_child: Optional[int] = OCR_MAX_TASKS_PER_CHILD, force: bool = False,
+                                preprocessamento: Optional[Dict[str, bool]] = None, modo_ocr: str = OCR_MODO_PADRAO,
+                                lote_imagens: int = OCR_LOTE_IMAGENS):
     """ Chama a função paralela e reporta o resultado no console. """
     logger.info(f"Executando extração e salvamento de tabelas individuais para: {diretorio_imagens}")
-    sucessos, falhas = analisar_e_salvar_paralelo(diretorio_imagens, organizar_por_mes, max_workers=num_workers)
+    sucessos, falhas, pulados = analisar_e_salvar_paralelo(diretorio_imagens, organizar_por_mes, max_workers=num_workers, max_tasks_per_child=max_tasks_per_child, force=force, preprocessamento=preprocessamento, modo_ocr=modo_ocr, lote_imagens=lote_imagens)
     print("\n--- Resumo da Extração de Tabelas Individuais ---")
     print(f"Diretório base de saída das tabelas: {OUTPUT_DIR_BASE_TABELAS}")
     print(f"Total de imagens processadas: {sucessos + falhas}")
+    print(f"Imagens puladas (já analisadas ou duplicadas): {pulados}")
     print(f"Tabelas individuais salvas com sucesso: {sucessos}")
     print(f"Falhas ao processar/salvar: {falhas}")
     if falhas > 0: print("Verifique o arquivo 'scraper.log' e 'data/error.log' para detalhes.")
@@ -230,10 +781,18 @@ if __name__ == "__main__":
     parser_test = argparse.ArgumentParser(description='Executor Standalone - Analisa Imagens e Salva Tabelas Individuais por Mês.')
     parser_test.add_argument('-i', '--image-path', type=str, default=None, help='(TESTE) Caminho para UMA imagem específica.')
     parser_test.add_argument('-w', '--workers', type=int, default=None, help='(TESTE) Número de workers (padrão: CPU count). Use 1 para sequencial.')
+    parser_test.add_argument('--max-tasks-per-child', type=int, default=OCR_MAX_TASKS_PER_CHILD, help='Recicla cada processo OCR após N imagens (0 = nunca).')
+    parser_test.add_argument('--force', action='store_true', help='Reprocessa todas as imagens, mesmo as que já têm CSV em dia.')
+    parser_test.add_argument('--sem-recorte', action='store_true', help='Não recorta a imagem para CROP_BOX_MAIN_TABLE.')
+    parser_test.add_argument('--sem-reducao', action='store_true', help='Não reduz a imagem para MAX_IMAGE_DIM_FOR_OCR.')
+    parser_test.add_argument('--binarizar', action='store_true', help='Binariza a imagem (limiar de Otsu) antes do OCR.')
+    parser_test.add_argument('--modo', choices=OCR_MODOS, default=OCR_MODO_PADRAO, help='Modo OCR: template (células da grade conhecida) ou img2table (detecção completa).')
+    parser_test.add_argument('--lote', type=int, default=OCR_LOTE_IMAGENS, help='Imagens por tarefa do pool (>1 = reconhecimento em lote no modo template).')
     parser_test.add_argument('-v', '--verbose', action='store_true', help='(TESTE) Ativa log nível DEBUG.')
     args_test = parser_test.parse_args()
     if args_test.verbose: logging.getLogger().setLevel(logging.DEBUG); logger.info("Log DEBUG ativado.")
 
+    preproc_test = {"recortar": not args_test.sem_recorte, "reduzir": not args_test.sem_reducao, "binarizar": args_test.binarizar}
     logger.info(f"Executando {__file__} standalone...")
     try:
         if args_test.image_path: # Teste de Imagem Única
@@ -241,12 +800,12 @@ if __name__ == "__main__":
             image_path_test = os.path.abspath(args_test.image_path)
             logger.info(f"Arquivo: {image_path_test}")
             if os.path.isfile(image_path_test):
-                success = processar_e_salvar_tabela_individual(filepath=image_path_test, base_dir=DATA_DIR, organizar_por_mes=ORGANIZE_BY_MONTH)
+                success = processar_e_salvar_tabela_individual(filepath=image_path_test, base_dir=DATA_DIR, organizar_por_mes=ORGANIZE_BY_MONTH, preprocessamento=preproc_test, modo_ocr=args_test.modo)
                 print(f"\nTeste concluído. {'Tabela salva.' if success else 'FALHA (ver logs).'}")
             else: logger.error(f"Erro: Imagem teste não encontrada: {image_path_test}")
         else: # Execução Normal (todas as imagens)
             logger.info("Iniciando análise completa...")
-            executar_e_reportar_analise(OUTPUT_DIR, ORGANIZE_BY_MONTH, DATA_DIR, num_workers=args_test.workers)
+            executar_e_reportar_analise(OUTPUT_DIR, ORGANIZE_BY_MONTH, DATA_DIR, num_workers=args_test.workers, max_tasks_per_child=args_test.max_tasks_per_child, force=args_test.force, preprocessamento=preproc_test, modo_ocr=args_test.modo, lote_imagens=args_test.lote)
     except Exception as e: logger.critical(f"Erro fatal standalone: {e}", exc_info=True)
 
     logger.info(f"Execução standalone de {__file__} finalizada.")
@@ -0,0 +1,119 @@
+# src/benchmark_ocr.py
+
+"""
+Benchmark do pré-processamento da análise de imagens.
+Executa a extração de tabelas (mesmo caminho do worker de `analise_imagens`) sobre uma amostra de
+imagens com diferentes combinações de pré-processamento e reporta, para cada uma:
+1. Tempo de OCR por imagem (média e total, modelo já carregado).
+2. Tabelas extraídas.
+3. Acurácia por célula contra CSVs de referência revisados manualmente (`<nome>_tabela.csv`), se houver.
+Com --lote N, compara também a vazão (imagens/min) do caminho por imagem com o reconhecimento em lote.
+
+Uso: python -m src.benchmark_ocr [-i DIR_IMAGENS] [-r DIR_REFERENCIA] [-n LIMITE] [-m MODO] [-l LOTE]
+"""
+
+# --- Imports ---
+import os
+import sys
+import time
+import logging
+import argparse
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from .config import OUTPUT_DIR, IMAGE_EXTENSIONS
+from .analise_imagens import extrair_tabela, extrair_tabelas_lote, separar_celulas_mescladas, preencher_cabecalhos, obter_ocr_wrapper, OUTPUT_DIR_BASE_TABELAS, OCR_MODOS
+
+logger = logging.getLogger(__name__)
+
+# --- Configurações comparadas ---
+CONFIGURACOES = {
+    "original": {"recortar": False, "reduzir": False, "binarizar": False},
+    "recorte+reducao": {"recortar": True, "reduzir": True, "binarizar": False},
+    "recorte+reducao+binarizacao": {"recortar": True, "reduzir": True, "binarizar": True},
+}
+
+def listar_imagens(diretorio: str, limite: Optional[int]) -> List[str]:
+    """ Imagens do diretório (recursivo), em ordem de nome, limitadas a 'limite'. """
+    imagens = sorted(os.path.join(r, f) for r, d, fs in os.walk(diretorio) for f in fs if f.lower().endswith(tuple(IMAGE_EXTENSIONS)))
+    return imagens[:limite] if limite else imagens
+
+def indexar_referencias(diretorio: str) -> Dict[str, str]:
+    """ Mapeia '<nome>_tabela.csv' → caminho, buscando recursivamente no diretório de referência. """
+    return {f: os.path.join(r, f) for r, d, fs in os.walk(diretorio) for f in fs if f.endswith("_tabela.csv")}
+
+def _normalizar_celula(valor) -> str:
+    """ Texto de uma célula para comparação (vazio para NaN/None, sem espaços extras, minúsculo). """
+    return "" if pd.isna(valor) else " ".join(str(valor).split()).lower()
+
+def acuracia_celulas(df_extraida: Optional[pd.DataFrame], df_referencia: pd.DataFrame) -> Tuple[int, int]:
+    """ Conta células iguais por posição sobre a grade da referência. Retorna (acertos, total). """
+    total = df_referencia.size
+    if df_extraida is None or df_extraida.empty: return 0, total
+    acertos = 0
+    for i in range(df_referencia.shape[0]):
+        for j in range(df_referencia.shape[1]):
+            if i < df_extraida.shape[0] and j < df_extraida.shape[1] and \
+               _normalizar_celula(df_extraida.iat[i, j]) == _normalizar_celula(df_referencia.iat[i, j]):
+                acertos += 1
+    return acertos, total
+
+def executar_benchmark(imagens: List[str], referencias: Dict[str, str], configuracoes: Dict[str, Dict[str, bool]],
+                       modo_ocr: str = "img2table") -> List[Dict]:
+    """ Roda cada configuração sobre as imagens e retorna uma linha de resultados por configuração. """
+    logger.info("Carregando modelo OCR (fora da medição)...")
+    if obter_ocr_wrapper() is None: raise RuntimeError("OCR indisponível: verifique easyocr/img2table.")
+    resultados = []
+    for nome, opcoes in configuracoes.items():
+        tempos = []; extraidas = 0; acertos = 0; celulas = 0
+        for filepath in imagens:
+            inicio = time.perf_counter()
+            try: df, erro = extrair_tabela(filepath, opcoes, modo_ocr, usar_cache=False)
+            except Exception as e: df, erro = None, str(e)
+            tempos.append(time.perf_counter() - inicio)
+            if df is not None and not df.empty: extraidas += 1; df, notas = separar_celulas_mescladas(df); df = preencher_cabecalhos(df, notas["mesclas"])
+            else: logger.debug(f"[{nome}] Sem tabela em {os.path.basename(filepath)}: {erro}")
+            referencia = referencias.get(f"{os.path.splitext(os.path.basename(filepath))[0]}_tabela.csv")
+            if referencia:
+                a, t = acuracia_celulas(df, pd.read_csv(referencia, encoding='utf-8-sig')); acertos += a; celulas += t
+        resultados.append({"configuracao": nome, "imagens": len(imagens), "tempo_total_s": sum(tempos),
+                           "tempo_medio_s": sum(tempos) / len(tempos) if tempos else 0.0, "tabelas": extraidas,
+                           "acuracia_celulas": acertos / celulas if celulas else None})
+        logger.info(f"[{nome}] {len(imagens)} imagens em {sum(tempos):.1f}s")
+    return resultados
+
+def comparar_vazao(imagens: List[str], opcoes: Dict[str, bool], modo_ocr: str, tamanho_lote: int) -> Dict[str, float]:
+    """ Vazão (imagens/min, sem cache OCR) do caminho por imagem e do reconhecimento em lotes de 'tamanho_lote' imagens. """
+    inicio = time.perf_counter()
+    for filepath in imagens: extrair_tabela(filepath, opcoes, modo_ocr, usar_cache=False)
+    por_imagem = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    for i in range(0, len(imagens), tamanho_lote): extrair_tabelas_lote(imagens[i:i + tamanho_lote], opcoes, modo_ocr, usar_cache=False)
+    em_lote = time.perf_counter() - inicio
+    return {"por_imagem": len(imagens) / por_imagem * 60 if por_imagem else 0.0, "em_lote": len(imagens) / em_lote * 60 if em_lote else 0.0}
+
+def imprimir_resultados(resultados: List[Dict]):
+    """ Tabela de resultados no console. """
+    print(f"\n{'Configuração':<30} {'Imagens':>7} {'Total (s)':>10} {'Média (s)':>10} {'Tabelas':>8} {'Acurácia':>9}")
+    for r in resultados:
+        acuracia = f"{r['acuracia_celulas']:.1%}" if r["acuracia_celulas"] is not None else "n/d"
+        print(f"{r['configuracao']:<30} {r['imagens']:>7} {r['tempo_total_s']:>10.2f} {r['tempo_medio_s']:>10.2f} {r['tabelas']:>8} {acuracia:>9}")
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description='Benchmark do pré-processamento do OCR (tempo e acurácia por célula).')
+    parser.add_argument('-i', '--images-dir', type=str, default=OUTPUT_DIR, help='Diretório das imagens.')
+    parser.add_argument('-r', '--referencia', type=str, default=None, help=f'Diretório com CSVs de referência revisados (<nome>_tabela.csv). Ex.: cópia revisada de {OUTPUT_DIR_BASE_TABELAS}.')
+    parser.add_argument('-m', '--modo', choices=OCR_MODOS, default='img2table', help='Modo OCR medido (template usa/aprende a grade do layout).')
+    parser.add_argument('-l', '--lote', type=int, default=0, help='Compara a vazão por imagem x em lotes de N imagens (0 = não compara).')
+    parser.add_argument('-n', '--limite', type=int, default=20, help='Máximo de imagens da amostra (0 = todas).')
+    args = parser.parse_args()
+
+    imagens = listar_imagens(args.images_dir, args.limite)
+    if not imagens: logger.error(f"Nenhuma imagem em {args.images_dir}"); sys.exit(1)
+    referencias = indexar_referencias(args.referencia) if args.referencia else {}
+    if not referencias: logger.warning("Sem CSVs de referência: acurácia por célula não será calculada.")
+    imprimir_resultados(executar_benchmark(imagens, referencias, CONFIGURACOES, args.modo))
+    if args.lote > 1:
+        vazao = comparar_vazao(imagens, CONFIGURACOES["recorte+reducao"], args.modo, args.lote)
+        print(f"\nVazão ({args.modo}, recorte+redução): {vazao['por_imagem']:.1f} imagens/min por imagem x {vazao['em_lote']:.1f} imagens/min em lotes de {args.lote}")
@@ -26,9 +26,32 @@ RETRY_DELAY = 2
 
 # --- Configurações de Navegação do Scraper ---
 # (Mantidas como antes)
-SLEEP_BETWEEN_REQUESTS = 1
-SLEEP_BETWEEN_PAGES = 2
 MAX_PAGES = 4
+# Número de posts buscados em paralelo por página de listagem (1 = sequencial)
+SCRAPER_CONCURRENCY = 1
+# Número de imagens baixadas em paralelo por ImageService.process_images (1 = sequencial)
+DOWNLOAD_WORKERS = 4
+# Orçamento de cortesia por host (token bucket compartilhado por todos os clientes HTTP):
+# requisições por segundo (None = sem limite) e rajada liberada de imediato
+MAX_REQUESTS_PER_SECOND = 1.0
+REQUEST_BURST = 2
+# Concorrência adaptativa (AIMD) do HttpClient, um limitador por host compartilhado pelos clientes:
+# limites de requisições simultâneas, janela de latências para o p95 e fator que caracteriza pico de latência
+ADAPTIVE_INITIAL_CONCURRENCY = 2
+ADAPTIVE_MIN_CONCURRENCY = 1
+ADAPTIVE_MAX_CONCURRENCY = 8
+ADAPTIVE_LATENCY_WINDOW = 20
+ADAPTIVE_SPIKE_FACTOR = 2.0
+# Máximo de requisições simultâneas do AsyncHttpClient (modo --async)
+ASYNC_MAX_CONCURRENCY = 20
+
+# --- Configurações de OCR (--analyze) ---
+# Modo de extração: "template" lê só as células da grade já conhecida do layout (cai no img2table se não conferir);
+# "img2table" detecta a tabela em toda imagem
+OCR_MODOS = ("template", "img2table")
+OCR_MODO_PADRAO = "template"
+# Imagens por tarefa do pool OCR: >1 reconhece as células de várias imagens de uma vez; 1 = caminho por imagem
+OCR_LOTE_IMAGENS = 1
 
 # --- Configurações de Imagem ---
 # (Mantidas como antes)
@@ -43,6 +66,14 @@ DATA_DIR = os.path.join(BASE_PROJECT_DIR, "data")
 OUTPUT_DIR = os.path.join(DATA_DIR, "images")
 # 4. REMOVIDO/COMENTADO: DATABASE_FILE (OK para versão sem DB)
 # DATABASE_FILE = os.path.join(DATA_DIR, "abicom_data.db")
+# Manifesto persistente das imagens baixadas (post → imagem → arquivo)
+MANIFEST_FILE = os.path.join(DATA_DIR, "manifest.sqlite3")
+# Cache de respostas HTTP em disco (--http-cache): corpos comprimidos + índice SQLite
+HTTP_CACHE_DIR = os.path.join(DATA_DIR, "http_cache")
+HTTP_CACHE_MAX_BYTES = 200 * 1024 * 1024  # Limite do cache; acima disso remove as entradas menos usadas
+HTTP_CACHE_TTL = 0  # Validade (s) das respostas sem Cache-Control: max-age (0 = sempre revalida)
+# Validade (segundos) da resolução post → imagem guardada no manifesto (None = sem expiração)
+POST_CACHE_TTL = None
 # 5. Formatos de data (OK)
 DATE_FORMAT = "%d-%m-%Y"
 DATE_FORMAT_FOLDER = "%m-%Y"
@@ -0,0 +1,130 @@
+# src/dataset_ppi.py
+
+"""
+Dataset consolidado do PPI em formato colunar (Parquet), particionado por mês.
+Reúne as tabelas tipadas '<nome>_valores.csv' (ver `normalizacao`) de 'data/tabelas_por_mes/MM-YYYY/' em
+'data/ppi_dataset/mes=MM-YYYY/ppi.parquet' (formato longo: data, empresa, refinaria, combustível, preços,
+defasagens e flags). A atualização é incremental: só são regravadas as partições cujos CSVs de valores são
+mais novos que o Parquet do mês. Cada partição é ordenada por data para que as estatísticas dos row groups
+permitam filtrar por período sem ler os dados (ver `query`).
+
+Uso: python -m src.dataset_ppi [--tudo]
+"""
+
+# --- Imports ---
+import os
+import sys
+import glob
+import time
+import logging
+import argparse
+import pandas as pd
+from typing import Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError: # Dependência opcional: sem ela o dataset não é gerado
+    pa = None; pq = None
+
+try:
+    from .config import DATA_DIR
+except Exception: # Execução fora do pacote
+    DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+try:
+    from .normalizacao import METRICAS, COLUNAS_VALORES
+except ImportError: # Execução fora do pacote
+    from normalizacao import METRICAS, COLUNAS_VALORES
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes ---
+TABELAS_DIR = os.path.join(DATA_DIR, "tabelas_por_mes")
+DATASET_DIR = os.path.join(DATA_DIR, "ppi_dataset")
+ARQUIVO_PARTICAO = "ppi.parquet"
+PARTICAO_PREFIXO = "mes="
+ROW_GROUP_LINHAS = 2048 # ~1 semana de pôsteres por row group: estatísticas de data úteis para o filtro por período
+COMPRESSAO = "zstd"
+
+def esquema():
+    """ Esquema Arrow do dataset (a coluna de partição 'mes' vem do nome do diretório). """
+    return pa.schema([("data", pa.date32()), ("empresa", pa.string()), ("refinaria", pa.string()), ("combustivel", pa.string()),
+                      *[(m, pa.float64()) for m in METRICAS], *[(f"flag_{m}", pa.string()) for m in METRICAS], ("fonte", pa.string())])
+
+def pyarrow_disponivel() -> bool:
+    """ Indica se o pyarrow está instalado (necessário para gravar e consultar o dataset). """
+    if pa is None: logger.warning("pyarrow não instalado (pip install pyarrow): dataset Parquet desativado.")
+    return pa is not None
+
+def caminho_particao(mes: str, dataset_dir: str = DATASET_DIR) -> str:
+    """ Arquivo Parquet da partição de um mês ('MM-YYYY'). """
+    return os.path.join(dataset_dir, f"{PARTICAO_PREFIXO}{mes}", ARQUIVO_PARTICAO)
+
+def _arquivos_valores(tabelas_dir: str) -> Dict[str, List[str]]:
+    """ CSVs de valores agrupados por mês: {'MM-YYYY': [caminhos]}. """
+    meses: Dict[str, List[str]] = {}
+    for caminho in glob.glob(os.path.join(tabelas_dir, "*", "*_valores.csv")):
+        meses.setdefault(os.path.basename(os.path.dirname(caminho)), []).append(caminho)
+    return meses
+
+def particao_desatualizada(mes: str, arquivos: List[str], dataset_dir: str = DATASET_DIR) -> bool:
+    """ A partição não existe ou algum CSV de valores do mês é mais novo que ela. """
+    destino = caminho_particao(mes, dataset_dir)
+    if not os.path.isfile(destino): return True
+    return max(os.path.getmtime(a) for a in arquivos) > os.path.getmtime(destino)
+
+def ler_valores_mes(arquivos: List[str]) -> pd.DataFrame:
+    """ Lê e concatena os CSVs de valores de um mês (tipos fixos, ordenado por data/combustível/refinaria). """
+    tipos = {"empresa": "string", "refinaria": "string", "combustivel": "string",
+             **{m: "float64" for m in METRICAS}, **{f"flag_{m}": "string" for m in METRICAS}}
+    partes = []
+    for caminho in sorted(arquivos):
+        try: df = pd.read_csv(caminho, dtype=tipos, parse_dates=["data"], encoding='utf-8')
+        except Exception as e: logger.warning(f"CSV de valores ilegível ({caminho}): {e}"); continue
+        # Empresa vazia (cabeçalho sem empresa) é gravada como "" no CSV e volta como NA na leitura
+        partes.append(df.assign(empresa=df["empresa"].fillna(""), fonte=os.path.basename(caminho).replace("_valores.csv", "")))
+    if not partes: return pd.DataFrame(columns=[*COLUNAS_VALORES, "fonte"])
+    df = pd.concat(partes, ignore_index=True)[[*COLUNAS_VALORES, "fonte"]]
+    df["data"] = df["data"].dt.date
+    return df.sort_values(["data", "combustivel", "refinaria"], kind="stable").reset_index(drop=True)
+
+def gravar_particao(mes: str, df: pd.DataFrame, dataset_dir: str = DATASET_DIR):
+    """ Grava (escrita atômica) a partição Parquet de um mês; o temporário não é visto por leitores concorrentes do dataset. """
+    destino = caminho_particao(mes, dataset_dir)
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tabela = pa.Table.from_pandas(df, schema=esquema(), preserve_index=False)
+    # Prefixo "_": a descoberta de arquivos do pyarrow.dataset ignora o temporário durante a escrita
+    temp_path = os.path.join(os.path.dirname(destino), f"_{os.path.basename(destino)}.{os.getpid()}.tmp")
+    pq.write_table(tabela, temp_path, compression=COMPRESSAO, row_group_size=ROW_GROUP_LINHAS, write_statistics=True)
+    os.replace(temp_path, destino)
+
+def atualizar_dataset(meses: Optional[List[str]] = None, tudo: bool = False, tabelas_dir: str = TABELAS_DIR,
+                      dataset_dir: str = DATASET_DIR) -> int:
+    """
+    Atualiza as partições do dataset a partir dos CSVs de valores: só as desatualizadas (padrão),
+    as dos meses informados ou todas (tudo=True). Retorna o número de partições gravadas.
+    """
+    if not pyarrow_disponivel(): return 0
+    inicio = time.time(); por_mes = _arquivos_valores(tabelas_dir); gravadas = 0
+    for mes, arquivos in sorted(por_mes.items()):
+        if meses is not None and mes not in meses: continue
+        if not tudo and meses is None and not particao_desatualizada(mes, arquivos, dataset_dir): continue
+        df = ler_valores_mes(arquivos)
+        if df.empty: continue
+        try: gravar_particao(mes, df, dataset_dir); gravadas += 1
+        except Exception as e: logger.error(f"Falha ao gravar a partição {mes} do dataset: {e}", exc_info=True)
+    if gravadas: logger.info(f"Dataset PPI: {gravadas} partições atualizadas em {time.time() - inicio:.2f}s ({dataset_dir}).")
+    else: logger.debug("Dataset PPI já em dia.")
+    return gravadas
+
+def carregar_dataset(colunas: Optional[List[str]] = None, filtros=None, dataset_dir: str = DATASET_DIR) -> pd.DataFrame:
+    """ Lê o dataset (só as colunas pedidas; filtros no formato do pyarrow) como DataFrame. """
+    if not pyarrow_disponivel() or not os.path.isdir(dataset_dir): return pd.DataFrame(columns=colunas or [])
+    return pq.read_table(dataset_dir, columns=colunas, filters=filtros, partitioning="hive").to_pandas()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stdout)])
+    parser = argparse.ArgumentParser(description='Atualiza o dataset Parquet do PPI (particionado por mês) a partir dos CSVs de valores.')
+    parser.add_argument('--tudo', action='store_true', help='Regrava todas as partições (não só as desatualizadas).')
+    args = parser.parse_args()
+    print(f"Partições gravadas: {atualizar_dataset(tudo=args.tudo)}")
@@ -7,6 +7,7 @@ Orquestra: Configuração, Scraping (download imagens), Análise de Imagens
 # --- Imports Padrão ---
 import os
 import sys
+import asyncio
 import logging
 import argparse
 from logging import FileHandler, StreamHandler # Import explícito
@@ -53,20 +54,15 @@ logger = logging.getLogger(__name__)
 logger.debug("Iniciando imports do projeto...")
 from .scrapers.abicom_scraper import AbicomScraper # Scraper Abicom
 try: # Configurações
-    from .config import MAX_PAGES, OUTPUT_DIR, ORGANIZE_BY_MONTH, BASE_URL, DATA_DIR
+    from .config import MAX_PAGES, OUTPUT_DIR, ORGANIZE_BY_MONTH, BASE_URL, DATA_DIR, SCRAPER_CONCURRENCY, DOWNLOAD_WORKERS, OCR_MODOS, OCR_MODO_PADRAO, OCR_LOTE_IMAGENS
     logger.info("Configurações carregadas de .config.")
 except ImportError as e: # Fallback
     logger.critical(f"Falha CRÍTICA importar config: {e}. Usando fallbacks.", exc_info=True); raise e
 # Serviço de Imagem (Versão SEM DB)
 from .services.image_service import ImageService
-try: # Função de Análise (Versão SEM DB - Salva Tabelas Individuais)
-    from .analise_imagens import executar_e_reportar_analise
-    analysis_function_available = True
-    logger.info("Função de análise 'executar_e_reportar_analise' importada.")
-except ImportError as ie: # Erro ao importar análise
-    logger.error(f"Falha ao importar '.analise_imagens': {ie}", exc_info=True)
-    executar_e_reportar_analise = None; analysis_function_available = False
-    logger.warning("--> Análise avançada indisponível.")
+from .services.http_cache import HttpCache, CACHE_MODES
+from .services.http_client import HttpClient
+# Função de Análise: importada sob demanda (só com --analyze), ver carregar_funcao_analise()
 
 # REMOVIDO: Import da função de tratamento final do CSV
 # try: from .tratamento_dados import executar_tratamento_csv ...
@@ -74,6 +70,26 @@ except ImportError as ie: # Erro ao importar análise
 
 
 # --- Definição das Funções ---
+def carregar_funcao_analise():
+    """ Importa a análise (pandas/img2table/OCR) apenas quando ela for usada. """
+    try: # Função de Análise (Versão SEM DB - Salva Tabelas Individuais)
+        from .analise_imagens import executar_e_reportar_analise
+        logger.info("Função de análise 'executar_e_reportar_analise' importada.")
+        return executar_e_reportar_analise
+    except ImportError as ie: # Erro ao importar análise
+        logger.error(f"Falha ao importar '.analise_imagens': {ie}", exc_info=True)
+        logger.warning("--> Análise avançada indisponível.")
+        return None
+
+def carregar_pipeline_analise():
+    """ Importa o pipeline de OCR em fluxo (com --pipeline) apenas quando ele for usado. """
+    try:
+        from .analise_imagens import PipelineOcr
+        return PipelineOcr
+    except ImportError as ie:
+        logger.error(f"Falha ao importar '.analise_imagens' (pipeline): {ie}", exc_info=True)
+        return None
+
 def parse_arguments():
     """ Analisa os argumentos da linha de comando. """
     parser = argparse.ArgumentParser(
@@ -83,9 +99,19 @@ def parse_arguments():
     parser.add_argument('--start-page', type=int, default=1, help='Página inicial.')
     parser.add_argument('--max-pages', type=int, default=MAX_PAGES, help=f'Máx. páginas ({MAX_PAGES}).')
     parser.add_argument('--output-dir', type=str, default=OUTPUT_DIR, help=f'Dir. saída imagens ({OUTPUT_DIR}).')
+    parser.add_argument('--concurrency', type=int, default=SCRAPER_CONCURRENCY, help='Posts buscados em paralelo por página (1 = sequencial).')
+    parser.add_argument('--download-workers', type=int, default=DOWNLOAD_WORKERS, help='Imagens baixadas em paralelo (1 = sequencial).')
+    parser.add_argument('--incremental', action='store_true', help='Para na primeira página de listagem sem posts novos.')
+    parser.add_argument('--http-cache', choices=CACHE_MODES, default=None, help='Cache HTTP em disco: default (fresco/revalida), offline (só cache) ou refresh (sempre rede).')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='Scraping assíncrono (AsyncHttpClient, requer aiohttp).')
+    parser.add_argument('--rebuild-manifest', action='store_true', help='Regenera o manifesto de downloads a partir do disco e encerra.')
     parser.add_argument('--verbose', '-v', action='store_true', help='Log DEBUG.')
     # Help ajustado para refletir a saída atual da análise
     parser.add_argument('--analyze', '-a', action='store_true', help='Executa análise (gera CSVs individuais por mês).')
+    parser.add_argument('--force', action='store_true', help='Com --analyze, reprocessa todas as imagens (ignora a análise incremental).')
+    parser.add_argument('--ocr-mode', choices=OCR_MODOS, default=OCR_MODO_PADRAO, help='Com --analyze: template (só as células da grade conhecida do layout, com fallback) ou img2table (detecção completa).')
+    parser.add_argument('--pipeline', action='store_true', help='Com --analyze: analisa cada imagem assim que é baixada (fila limitada para o pool OCR), em vez de esperar o fim do scraping.')
+    parser.add_argument('--ocr-batch', type=int, default=OCR_LOTE_IMAGENS, help='Com --analyze: imagens por tarefa OCR (>1 = reconhecimento em lote das células no modo template).')
     return parser.parse_args()
 
 # --- Função Principal (main) ---
@@ -106,29 +132,61 @@ def main():
         # O diretório data/tabelas_por_mes será criado por analise_imagens.py se necessário
         data_dir_analysis = DATA_DIR # Usado para passar para análise
 
+        # Comando avulso: reconstrução do manifesto de downloads
+        if args.rebuild_manifest:
+            logger.info("--- Reconstruindo manifesto de downloads ---")
+            with ImageService(output_dir=args.output_dir) as image_service:
+                total_registradas = image_service.rebuild_manifest()
+            logger.info(f"Manifesto reconstruído com {total_registradas} imagens.")
+            return exit_code
+
         # 3. Log Inicial da Execução
         logger.info(f"--- 2. Iniciando Execução (Versão Sem DB) ---")
         logger.info(f"Argumentos: {args}")
         logger.info(f"Configs: OrganizePorMês={ORGANIZE_BY_MONTH}, URL={BASE_URL}")
+        executar_e_reportar_analise = carregar_funcao_analise() if args.analyze else None
+        analysis_function_available = executar_e_reportar_analise is not None
         analysis_status_log = "HABILITADA" if args.analyze else "DESABILITADA";
         if args.analyze and not analysis_function_available: analysis_status_log += " (FUNÇÃO INDISPONÍVEL!)"
         logger.info(f"Análise (--analyze): {analysis_status_log}") # Log não menciona mais tratamento
 
         # --- 4. Bloco Scraper ---
         total_downloads = 0; scraper_success = False; exception_during_scraping = None
+        pipeline = None
+        if args.pipeline and args.analyze and analysis_function_available:
+            PipelineOcr = carregar_pipeline_analise()
+            if PipelineOcr is not None:
+                pipeline = PipelineOcr(organizar_por_mes=ORGANIZE_BY_MONTH, modo_ocr=args.ocr_mode, force=args.force)
         logger.info("--- 3. Iniciando Bloco do Scraper ---")
+        http_cache = None; download_client = None
         try:
-            image_service = ImageService(output_dir=args.output_dir) # Versão Sem DB
-            logger.info("Pré-indexando imagens existentes no disco...")
-            image_service.pre_check_monthly_images() # Necessário para ImageService Sem DB
-            with AbicomScraper(image_service=image_service, base_url=BASE_URL) as scraper:
-                 total_downloads = scraper.run(start_page=args.start_page, max_pages=args.max_pages)
+            http_cache = HttpCache(mode=args.http_cache) if args.http_cache else None
+            # Com cache, os downloads também passam por ele: os corpos das imagens são guardados e,
+            # em modo offline, regravados a partir do cache (nenhum acesso à rede, também com --async)
+            download_client = HttpClient(pool_size=max(10, args.download_workers),
+                                         cache=http_cache) if http_cache is not None else None
+            image_service = ImageService(output_dir=args.output_dir, http_client=download_client,
+                                         download_workers=args.download_workers,
+                                         on_image_saved=(lambda image: pipeline.enviar(image.saved_path)) if pipeline else None)
+            logger.info("Carregando manifesto de imagens baixadas...")
+            image_service.pre_check_monthly_images() # Indexa o disco apenas se o manifesto estiver vazio
+            with AbicomScraper(image_service=image_service, base_url=BASE_URL, concurrency=args.concurrency, incremental=args.incremental,
+                                http_cache=http_cache) as scraper:
+                 if args.use_async: total_downloads = asyncio.run(scraper.run_async(start_page=args.start_page, max_pages=args.max_pages))
+                 else: total_downloads = scraper.run(start_page=args.start_page, max_pages=args.max_pages)
+                 if args.incremental: logger.info(f"Modo incremental: {scraper.run_stats['pages_skipped']} páginas puladas.")
             if total_downloads > 0: logger.info(f"Scraping OK. {total_downloads} novas imagens.")
             else: logger.info("Scraping OK. Nenhuma nova imagem.")
             scraper_success = True
         except KeyboardInterrupt as e: logger.warning("Scraping interrompido."); exception_during_scraping = e; scraper_success = False
         except Exception as e: logger.error(f"Erro scraping: {e}", exc_info=True); exception_during_scraping = e; scraper_success = False
+        finally: # O cache (compartilhado pelo cliente do scraper e pelo de downloads) é fechado só aqui, por quem o criou
+            if download_client is not None: download_client.close()
+            if http_cache is not None: http_cache.close()
         logger.info("--- Bloco do Scraper Finalizado ---")
+        if pipeline is not None: # Aguarda as imagens ainda na fila/em OCR
+            sucessos_pipeline, falhas_pipeline, _ = pipeline.encerrar()
+            print(f"\n--- Pipeline OCR: {sucessos_pipeline} tabelas salvas durante o scraping, {falhas_pipeline} falhas ---")
 
         # --- 5. Bloco Análise (Salva CSVs Individuais por Mês) ---
         analysis_success = True # Assume sucesso
@@ -141,7 +199,12 @@ def main():
                     diretorio_imagens=args.output_dir,
                     organizar_por_mes=ORGANIZE_BY_MONTH,
                     diretorio_csv=data_dir_analysis, # Passa 'data', mas não salva CSV principal aqui
-                    num_workers=None # Usa default (os.cpu_count) - poderia ser argumento
+                    num_workers=None, # Usa default (os.cpu_count) - poderia ser argumento
+                    # Sem --force, só imagens novas/alteradas são analisadas. Com --pipeline, esta etapa só
+                    # completa pendências anteriores (as imagens do pipeline já estão em dia)
+                    force=args.force and pipeline is None,
+                    modo_ocr=args.ocr_mode,
+                    lote_imagens=args.ocr_batch
                 )
                 # Assume sucesso se não houve exceção. A função reporta sucessos/falhas no console.
                 # Para um controle mais fino do status final, poderíamos fazer
@@ -0,0 +1,172 @@
+# src/normalizacao.py
+
+"""
+Normalização tipada dos valores extraídos da tabela do PPI (formato brasileiro lido por OCR).
+A partir da grade já tratada (cabeçalhos preenchidos), gera uma linha por (empresa, refinaria, combustível) com:
+1. preco_petrobras, ppi, defasagem_rs_l (R$/L) e defasagem_pct (%) em float64.
+2. Uma flag por valor: ok, virgula_inserida, percentual_reparado, sinal_corrigido, calculado,
+   inconsistente, fora_limites, invalido ou vazio.
+Toda a conversão é vetorizada (operações de string/numéricas do pandas sobre todas as células de uma vez).
+Correções aplicadas:
+- Vírgula decimal ("3,6160") e ponto/vírgula duplicados ("0,.05").
+- Preço/defasagem lidos sem vírgula ("36664", "0954"): divididos por 10^4 (o pôster usa 4 casas).
+- Percentual com o "%" lido como "9" ("49" → 4%): as duas leituras são mantidas e a conferência
+  contra defasagem / PPI escolhe a mais próxima ("19" fica 19% se é o que os preços indicam).
+- Limites de plausibilidade por combustível/métrica; fora deles o valor vira NaN.
+- Defasagem (= Petrobras - PPI) e percentual (= defasagem / PPI) conferidos contra os preços.
+"""
+
+# --- Imports ---
+import logging
+import unicodedata
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes ---
+# Ordem das linhas de cada combustível no pôster
+METRICAS = ("preco_petrobras", "ppi", "defasagem_rs_l", "defasagem_pct")
+CASAS_DECIMAIS_PRECO = 4 # "36664" = 3,6664
+TOLERANCIA_DEFASAGEM = 0.0015 # R$/L aceitos entre a defasagem lida e Petrobras - PPI
+TOLERANCIA_PERCENTUAL = 1.5 # Pontos percentuais (o pôster arredonda o % para inteiro)
+# Limites de plausibilidade (mín., máx.) por combustível e métrica
+LIMITES = {
+    ("diesel", "preco_petrobras"): (2.0, 6.5), ("diesel", "ppi"): (2.0, 6.5),
+    ("gasolina", "preco_petrobras"): (1.5, 6.0), ("gasolina", "ppi"): (1.5, 6.0),
+}
+LIMITES_PADRAO = {"preco_petrobras": (1.0, 8.0), "ppi": (1.0, 8.0), "defasagem_rs_l": (-2.0, 2.0), "defasagem_pct": (-50.0, 50.0)}
+COMBUSTIVEIS = {"diesel": "diesel", "gasolina": "gasolina", "glp": "glp", "querosene": "querosene"}
+REFINARIAS = {"itaqui": "Itaqui", "suape": "Suape", "paulinia": "Paulínia", "araucaria": "Araucária",
+              "itacoatiara": "Itacoatiara", "aratu": "Aratu", "manaus": "Manaus", "mataripe": "Mataripe"}
+COLUNAS_VALORES = ["data", "empresa", "refinaria", "combustivel", *METRICAS, *[f"flag_{m}" for m in METRICAS]]
+
+def _sem_acentos(texto: str) -> str:
+    return unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii").lower()
+
+def _canonico(texto, nomes: Dict[str, str]) -> Optional[str]:
+    """ Nome canônico (ex.: 'Paulínia _' → 'Paulínia') ou None se nenhum nome conhecido aparece no texto. """
+    if texto is None or (isinstance(texto, float) and np.isnan(texto)): return None
+    sem_acentos = _sem_acentos(texto)
+    return next((canonico for chave, canonico in nomes.items() if chave in sem_acentos), None)
+
+# --- Grade → Formato Longo ---
+def celulas_da_grade(df_grade: pd.DataFrame) -> pd.DataFrame:
+    """
+    Localiza o bloco combustível x refinaria e retorna uma linha por célula de valor:
+    (empresa, refinaria, combustivel, metrica, texto). Só o primeiro bloco de cada combustível é
+    usado (os quadros de médias abaixo da tabela repetem os nomes dos combustíveis).
+    """
+    vazio = pd.DataFrame(columns=["empresa", "refinaria", "combustivel", "metrica", "texto"])
+    if df_grade is None or df_grade.empty: return vazio
+    grade = df_grade.astype(object).where(df_grade.notna(), None).to_numpy()
+    refinarias = [[_canonico(v, REFINARIAS) for v in linha] for linha in grade]
+    linha_refinarias = next((i for i, linha in enumerate(refinarias) if sum(r is not None for r in linha) >= 2), None)
+    if linha_refinarias is None: return vazio
+    colunas = [j for j, r in enumerate(refinarias[linha_refinarias]) if r is not None]
+    empresas = grade[linha_refinarias - 1] if linha_refinarias > 0 else [None] * grade.shape[1]
+
+    registros = []; vistos = set(); atual = None; posicao = 0
+    for linha in grade[linha_refinarias + 1:]:
+        combustivel = _canonico(linha[0], COMBUSTIVEIS)
+        if combustivel != atual: # Início de um novo bloco de combustível
+            if combustivel is None or combustivel in vistos: break
+            vistos.add(combustivel); atual = combustivel; posicao = 0
+        if posicao < len(METRICAS):
+            registros.extend((str(empresas[j]).strip() if empresas[j] is not None else None, refinarias[linha_refinarias][j],
+                              combustivel, METRICAS[posicao], linha[j]) for j in colunas)
+        posicao += 1
+    return pd.DataFrame(registros, columns=vazio.columns) if registros else vazio
+
+# --- Conversão Vetorizada ---
+def converter_valores(celulas: pd.DataFrame) -> pd.DataFrame:
+    """
+    Acrescenta 'valor' (float64), 'flag' e 'valor_alt' às células (texto, métrica, combustível), de forma
+    vetorizada. 'valor_alt' é a leitura alternativa de percentuais terminados em "9" sem "%" (o "%" lido
+    como "9"; NaN nas demais células), decidida depois por conferir_consistencia.
+    """
+    texto = celulas["texto"].where(celulas["texto"].notna(), "").astype(str).str.replace(r"\s+", "", regex=True).str.replace("R$", "", regex=False)
+    percentual = celulas["metrica"].eq("defasagem_pct").to_numpy()
+    tem_sinal_pct = texto.str.endswith("%").to_numpy(dtype=bool)
+    limpo = texto.str.rstrip("%").str.replace(".", ",", regex=False).str.replace(r",+", ",", regex=True)
+    so_digitos = limpo.str.fullmatch(r"-?\d+").to_numpy(dtype=bool)
+    numero = pd.to_numeric(limpo.str.replace(",", ".", regex=False), errors="coerce").to_numpy(dtype="float64")
+
+    valor = numero.copy(); flag = np.full(len(celulas), "ok", dtype=object)
+    # Preços/defasagens sem vírgula: o pôster sempre usa 4 casas decimais
+    sem_virgula = ~percentual & so_digitos
+    valor[sem_virgula] = numero[sem_virgula] / 10 ** CASAS_DECIMAIS_PRECO; flag[sem_virgula] = "virgula_inserida"
+    # Percentual possivelmente com o "%" lido como "9" (ex.: "49" → 4%): guarda a leitura alternativa
+    digitos = limpo.str.lstrip("-").str.len().to_numpy()
+    pct_ambiguo = percentual & ~tem_sinal_pct & so_digitos & (digitos >= 2) & limpo.str.endswith("9").to_numpy(dtype=bool)
+    valor_alt = np.full(len(celulas), np.nan); valor_alt[pct_ambiguo] = np.trunc(numero[pct_ambiguo] / 10)
+
+    flag[np.isnan(numero)] = "invalido"
+    flag[texto.eq("").to_numpy(dtype=bool)] = "vazio"
+    # Limites de plausibilidade por combustível/métrica
+    limites = [LIMITES.get((c, m), LIMITES_PADRAO[m]) for c, m in zip(celulas["combustivel"], celulas["metrica"])]
+    minimo = np.array([l[0] for l in limites], dtype="float64"); maximo = np.array([l[1] for l in limites], dtype="float64")
+    fora = ~np.isnan(valor) & ((valor < minimo) | (valor > maximo))
+    flag[fora] = "fora_limites"; valor[fora] = np.nan
+    valor_alt[~np.isnan(valor_alt) & ((valor_alt < minimo) | (valor_alt > maximo))] = np.nan
+    return celulas.assign(valor=valor, flag=flag, valor_alt=valor_alt)
+
+def conferir_consistencia(valores: pd.DataFrame) -> pd.DataFrame:
+    """
+    Confere (vetorizado, no formato largo) defasagem = Petrobras - PPI e percentual = defasagem / PPI:
+    valores ausentes são calculados, sinal perdido pelo OCR é corrigido e divergências são marcadas.
+    Percentuais com leitura alternativa (coluna opcional 'defasagem_pct_alt', "%" lido como "9") ficam
+    com a leitura mais próxima de defasagem / PPI; sem essa referência, vale a leitura reparada.
+    """
+    precos_ok = valores["preco_petrobras"].notna() & valores["ppi"].notna()
+    esperado = valores["preco_petrobras"] - valores["ppi"]
+    lido = valores["defasagem_rs_l"]
+    calcular = precos_ok & lido.isna()
+    corrigir_sinal = precos_ok & lido.notna() & ((lido - esperado).abs() > TOLERANCIA_DEFASAGEM) & ((-lido - esperado).abs() <= TOLERANCIA_DEFASAGEM)
+    divergente = precos_ok & lido.notna() & ~corrigir_sinal & ((lido - esperado).abs() > TOLERANCIA_DEFASAGEM)
+    valores.loc[calcular, "defasagem_rs_l"] = esperado[calcular].round(CASAS_DECIMAIS_PRECO); valores.loc[calcular, "flag_defasagem_rs_l"] = "calculado"
+    valores.loc[corrigir_sinal, "defasagem_rs_l"] = -lido[corrigir_sinal]; valores.loc[corrigir_sinal, "flag_defasagem_rs_l"] = "sinal_corrigido"
+    valores.loc[divergente, "flag_defasagem_rs_l"] = "inconsistente"
+
+    pct_esperado = valores["defasagem_rs_l"] / valores["ppi"] * 100
+    base_ok = pct_esperado.notna()
+    if "defasagem_pct_alt" in valores.columns:
+        alt = valores["defasagem_pct_alt"]; lido = valores["defasagem_pct"]
+        def distancia(leitura: pd.Series) -> pd.Series: # Sinal perdido é corrigido logo abaixo
+            return (leitura.abs() - pct_esperado.abs()).abs()
+        reparar = alt.notna() & (~base_ok | lido.isna() | (distancia(alt) < distancia(lido)))
+        valores.loc[reparar, "defasagem_pct"] = alt[reparar]; valores.loc[reparar, "flag_defasagem_pct"] = "percentual_reparado"
+    pct = valores["defasagem_pct"]
+    calcular = base_ok & pct.isna()
+    corrigir_sinal = base_ok & pct.notna() & ((pct - pct_esperado).abs() > TOLERANCIA_PERCENTUAL) & ((-pct - pct_esperado).abs() <= TOLERANCIA_PERCENTUAL)
+    divergente = base_ok & pct.notna() & ~corrigir_sinal & ((pct - pct_esperado).abs() > TOLERANCIA_PERCENTUAL)
+    valores.loc[calcular, "defasagem_pct"] = pct_esperado[calcular].round(2); valores.loc[calcular, "flag_defasagem_pct"] = "calculado"
+    valores.loc[corrigir_sinal, "defasagem_pct"] = -pct[corrigir_sinal]; valores.loc[corrigir_sinal, "flag_defasagem_pct"] = "sinal_corrigido"
+    valores.loc[divergente, "flag_defasagem_pct"] = "inconsistente"
+    return valores
+
+def normalizar_tabela(df_grade: pd.DataFrame, data: Optional[str] = None) -> pd.DataFrame:
+    """
+    Tabela tipada de uma imagem: uma linha por (empresa, refinaria, combustível) com as métricas em
+    float64 e uma flag por métrica (colunas COLUNAS_VALORES). 'data' no formato AAAA-MM-DD.
+    """
+    celulas = celulas_da_grade(df_grade)
+    if celulas.empty: return pd.DataFrame(columns=COLUNAS_VALORES)
+    chaves = ["empresa", "refinaria", "combustivel"]
+    convertidas = converter_valores(celulas).assign(empresa=lambda d: d["empresa"].fillna("")).drop_duplicates(chaves + ["metrica"])
+    largas = convertidas.set_index(chaves + ["metrica"])[["valor", "flag", "valor_alt"]].unstack("metrica")
+    valores = pd.DataFrame(index=largas.index)
+    for metrica in METRICAS:
+        valores[metrica] = largas["valor"][metrica].astype("float64") if ("valor", metrica) in largas.columns else np.nan
+        valores[f"flag_{metrica}"] = largas["flag"][metrica].fillna("vazio") if ("flag", metrica) in largas.columns else "vazio"
+    valores["defasagem_pct_alt"] = largas["valor_alt"]["defasagem_pct"].astype("float64") if ("valor_alt", "defasagem_pct") in largas.columns else np.nan
+    valores = conferir_consistencia(valores.reset_index())
+    valores.insert(0, "data", pd.to_datetime(data) if data else pd.NaT)
+    return valores[COLUNAS_VALORES]
+
+def resumo_flags(valores: pd.DataFrame) -> Dict[str, int]:
+    """ Contagem de flags (todas as métricas) de uma tabela normalizada, para log. """
+    flags = valores[[f"flag_{m}" for m in METRICAS]].to_numpy().ravel()
+    nomes, contagens = np.unique(flags.astype(str), return_counts=True)
+    return dict(zip(nomes.tolist(), contagens.tolist()))
@@ -0,0 +1,80 @@
+# src/ocr_cache.py
+
+"""
+Cache em disco do resultado bruto do OCR (células e confianças, antes do tratamento de cabeçalho).
+A chave combina o SHA-256 da imagem com a versão do motor OCR e os parâmetros que alteram a leitura
+(confiança mínima, idiomas, recorte/pré-processamento, modo). Mudanças no pós-processamento ou na
+gravação dos CSVs reaproveitam o cache sem carregar o torch; mudanças nos parâmetros geram nova chave.
+Cada entrada é um JSON comprimido em `data/cache_ocr/<2 primeiros caracteres>/<chave>.json.gz`.
+"""
+
+# --- Imports ---
+import os
+import json
+import gzip
+import hashlib
+import logging
+import importlib.metadata
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from .config import DATA_DIR
+except Exception: # Execução fora do pacote
+    DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes ---
+OCR_CACHE_DIR = os.path.join(DATA_DIR, "cache_ocr")
+OCR_CACHE_FORMATO = 1 # Versão do formato das entradas (incremente ao mudar a estrutura do JSON)
+_versoes_motor: Optional[Dict[str, str]] = None
+
+def versoes_motor() -> Dict[str, str]:
+    """ Versões instaladas dos pacotes de OCR (lidas dos metadados, sem importar torch/easyocr). """
+    global _versoes_motor
+    if _versoes_motor is None:
+        _versoes_motor = {}
+        for pacote in ("easyocr", "img2table"):
+            try: _versoes_motor[pacote] = importlib.metadata.version(pacote)
+            except importlib.metadata.PackageNotFoundError: _versoes_motor[pacote] = "ausente"
+    return _versoes_motor
+
+def chave_cache(sha256: str, parametros: Dict[str, Any]) -> str:
+    """ Chave do resultado de uma imagem: hash do conteúdo + versão do motor + parâmetros do OCR. """
+    assinatura = json.dumps({"formato": OCR_CACHE_FORMATO, "motor": versoes_motor(), "parametros": parametros}, sort_keys=True, default=str)
+    return hashlib.sha256(f"{sha256}|{assinatura}".encode("utf-8")).hexdigest()
+
+def _caminho_entrada(chave: str, diretorio: str) -> str:
+    return os.path.join(diretorio, chave[:2], f"{chave}.json.gz")
+
+def _para_lista(df: pd.DataFrame) -> list:
+    """ Valores do DataFrame como listas JSON (NaN/None → null). """
+    return [[None if v is None or (isinstance(v, float) and np.isnan(v)) else v for v in linha] for linha in df.astype(object).to_numpy().tolist()]
+
+def ler_resultado(chave: str, diretorio: str = OCR_CACHE_DIR) -> Optional[Tuple[pd.DataFrame, Optional[pd.DataFrame]]]:
+    """ Resultado em cache (células, confianças ou None) ou None se ausente/ilegível. """
+    caminho = _caminho_entrada(chave, diretorio)
+    try:
+        with gzip.open(caminho, 'rt', encoding='utf-8') as f: entrada = json.load(f)
+    except FileNotFoundError: return None
+    except (OSError, EOFError, ValueError) as e:
+        logger.warning(f"Entrada do cache OCR ilegível ({os.path.basename(caminho)}): {e}. Descartando.")
+        try: os.remove(caminho)
+        except OSError: pass
+        return None
+    celulas = pd.DataFrame(entrada["celulas"])
+    confiancas = pd.DataFrame(entrada["confiancas"], dtype="float64") if entrada.get("confiancas") is not None else None
+    return celulas, confiancas
+
+def gravar_resultado(chave: str, celulas: pd.DataFrame, confiancas: Optional[pd.DataFrame] = None,
+                     metadados: Optional[Dict[str, Any]] = None, diretorio: str = OCR_CACHE_DIR):
+    """ Grava (escrita atômica) o resultado bruto do OCR de uma imagem. """
+    caminho = _caminho_entrada(chave, diretorio)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    entrada = {"formato": OCR_CACHE_FORMATO, "metadados": metadados or {}, "celulas": _para_lista(celulas),
+               "confiancas": _para_lista(confiancas) if confiancas is not None else None}
+    temp_path = f"{caminho}.{os.getpid()}.tmp"
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as f: json.dump(entrada, f, ensure_ascii=False, default=str)
+    os.replace(temp_path, caminho)
@@ -0,0 +1,189 @@
+# src/ocr_template.py
+
+"""
+Extração por template (regiões fixas) para o layout conhecido do PPI da Abicom.
+O pôster tem grade estável (linhas de combustível x colunas de refinaria). Em vez de detectar a
+tabela em toda imagem (`borderless_tables`/`implicit_rows` do img2table):
+1. A grade é detectada uma vez por versão de layout (via img2table) e as caixas das células
+   são guardadas em `data/ocr_templates.json`.
+2. Nas imagens seguintes do mesmo layout, apenas os recortes das células passam pelo
+   reconhecimento do EasyOCR (sem detecção de texto nem de tabela), em lote: os recortes de uma
+   ou várias imagens formam um mosaico reconhecido em uma única chamada.
+3. Se o resultado não confere com o layout esperado (refinarias do cabeçalho na ordem e em colunas
+   consecutivas, combustíveis na 1ª coluna), o chamador volta ao img2table. A chave do layout é só o
+   tamanho da imagem; a conferência do conteúdo impede que uma grade antiga seja usada em um pôster
+   do mesmo tamanho com outra grade (ex.: uma refinaria a mais).
+"""
+
+# --- Imports ---
+import os
+import json
+import hashlib
+import logging
+import unicodedata
+import threading
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from .config import DATA_DIR
+except Exception: # Execução fora do pacote
+    DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes ---
+TEMPLATE_CACHE_FILE = os.path.join(DATA_DIR, "ocr_templates.json")
+TEMPLATE_MARGEM_PX = 2 # Margem interna removida de cada célula (evita as linhas da grade)
+TEMPLATE_ESPACO_MOSAICO_PX = 8 # Faixa branca entre recortes no mosaico do reconhecimento em lote
+TEMPLATE_ALTURA_RECONHECEDOR = 64 # Altura (px) das caixas na entrada do modelo de reconhecimento (imgH do EasyOCR)
+TEMPLATE_MIN_PREENCHIMENTO = 0.6 # Fração mínima de células com texto para aceitar o resultado
+# Refinarias do cabeçalho do PPI, na ordem das colunas: todas devem aparecer em colunas consecutivas
+TEMPLATE_PALAVRAS_CHAVE = ("itaqui", "suape", "paulinia", "araucaria", "itacoatiara", "aratu")
+# Combustíveis da 1ª coluna, na ordem dos blocos logo abaixo do cabeçalho
+TEMPLATE_COMBUSTIVEIS = ("diesel", "gasolina")
+TEMPLATE_LINHAS_CABECALHO = 3 # Linhas do topo onde a linha das refinarias é procurada
+
+_templates: Optional[Dict[str, List[List[List[int]]]]] = None
+_templates_lock = threading.Lock()
+
+# --- Cache de Templates ---
+def chave_layout(largura: int, altura: int) -> str:
+    """ Versão de layout de uma imagem (já pré-processada): pôsteres do mesmo layout têm as mesmas dimensões. """
+    return f"{largura}x{altura}"
+
+def carregar_templates(caminho: str = TEMPLATE_CACHE_FILE) -> Dict[str, List[List[List[int]]]]:
+    """ Templates conhecidos (lidos do disco uma vez por processo): chave de layout → grade de caixas [x1, y1, x2, y2]. """
+    global _templates
+    with _templates_lock:
+        if _templates is None:
+            try:
+                with open(caminho, 'r', encoding='utf-8') as f: _templates = json.load(f)
+            except FileNotFoundError: _templates = {}
+            except (OSError, ValueError) as e: logger.warning(f"Cache de templates ilegível ({e}). Recomeçando."); _templates = {}
+        return _templates
+
+def salvar_template(chave: str, grade: List[List[List[int]]], caminho: str = TEMPLATE_CACHE_FILE):
+    """ Registra o template de um layout (mescla com o que outros processos já gravaram; escrita atômica). """
+    templates = carregar_templates(caminho)
+    with _templates_lock:
+        try:
+            with open(caminho, 'r', encoding='utf-8') as f: templates.update({k: v for k, v in json.load(f).items() if k not in templates})
+        except (OSError, ValueError): pass
+        templates[chave] = grade
+        temp_path = f"{caminho}.{os.getpid()}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f: json.dump(templates, f)
+        os.replace(temp_path, caminho)
+    logger.info(f"Template OCR registrado para o layout {chave} ({len(grade)} linhas).")
+
+def hash_grade(grade: Optional[List[List[List[int]]]]) -> Optional[str]:
+    """ Hash da grade de um layout (compõe a chave do cache OCR no modo template); None sem template. """
+    return hashlib.sha256(json.dumps(grade).encode("utf-8")).hexdigest()[:16] if grade else None
+
+def aprender_template(tabela) -> List[List[List[int]]]:
+    """ Grade de caixas [x1, y1, x2, y2] por linha a partir de uma tabela extraída pelo img2table (ExtractedTable.content). """
+    return [[[int(c.bbox.x1), int(c.bbox.y1), int(c.bbox.x2), int(c.bbox.y2)] for c in linha] for linha in tabela.content.values()]
+
+# --- Extração por Template ---
+def recortar_celula(imagem_cinza: np.ndarray, caixa: List[int]) -> Optional[np.ndarray]:
+    """ Recorte de uma célula (sem a margem da grade) ou None se a caixa não cabe na imagem. """
+    x1, y1, x2, y2 = caixa; m = TEMPLATE_MARGEM_PX
+    altura, largura = imagem_cinza.shape[:2]
+    if x2 > largura or y2 > altura: return None
+    x1, y1, x2, y2 = x1 + m, y1 + m, max(x1 + m + 1, x2 - m), max(y1 + m + 1, y2 - m)
+    return imagem_cinza[y1:y2, x1:x2]
+
+def reconhecer_celulas(reader, recortes: List[np.ndarray], min_confidence: int, batch_size: int = 32) -> List[Tuple[str, float]]:
+    """
+    Texto e confiança (0-100; NaN se vazio) de cada recorte, em uma única chamada ao reconhecedor.
+    Os recortes (de uma ou várias imagens) são empilhados em um mosaico; as caixas são recortadas
+    e normalizadas pelo `easyocr.utils.get_image_list` e vão direto ao modelo de reconhecimento
+    (`easyocr.recognition.get_text`) em lotes de batch_size. O `reader.recognize` não serve aqui:
+    ele chama o modelo uma vez por caixa e ignora o batch_size.
+    """
+    if not recortes: return []
+    largura = max(r.shape[1] for r in recortes); altura = sum(r.shape[0] + TEMPLATE_ESPACO_MOSAICO_PX for r in recortes)
+    mosaico = np.full((altura, largura), 255, dtype=np.uint8); caixas = []; y = 0
+    for recorte in recortes:
+        h, w = recorte.shape[:2]; mosaico[y:y + h, :w] = recorte
+        caixas.append([0, w, y, y + h]); y += h + TEMPLATE_ESPACO_MOSAICO_PX
+    # Resultados vêm ordenados pelo topo da caixa: associa cada um ao recorte pelo y inicial
+    por_topo = {int(caixa[0][1]): (texto, confianca * 100) for caixa, texto, confianca in _reconhecer_em_lote(reader, mosaico, caixas, batch_size)}
+    lidas = []
+    for _, _, y_min, _ in caixas:
+        texto, confianca = por_topo.get(y_min, ("", float("nan")))
+        lidas.append((texto.strip(), confianca) if confianca >= min_confidence else ("", float("nan")))
+    return lidas
+
+def _reconhecer_em_lote(reader, mosaico: np.ndarray, caixas: List[List[int]], batch_size: int) -> list:
+    """ [(caixa, texto, confiança 0-1)] das caixas do mosaico em lotes de batch_size no reconhecedor do EasyOCR. """
+    try:
+        from easyocr.utils import get_image_list
+        from easyocr.recognition import get_text
+    except ImportError: # Versão do EasyOCR sem essas funções internas: reconhecimento caixa a caixa
+        return reader.recognize(mosaico, horizontal_list=caixas, free_list=[], batch_size=max(1, batch_size), detail=1, paragraph=False)
+    imagens, largura_max = get_image_list(caixas, [], mosaico, model_height=TEMPLATE_ALTURA_RECONHECEDOR)
+    ignorar = ''.join(set(reader.character) - set(reader.lang_char)) # Mesmo filtro de caracteres do reader.recognize
+    return get_text(reader.character, TEMPLATE_ALTURA_RECONHECEDOR, int(largura_max), reader.recognizer, reader.converter, imagens,
+                    ignorar, 'greedy', 5, max(1, batch_size), 0.1, 0.5, 0.003, 0, reader.device)
+
+def recortes_template(imagem_cinza: np.ndarray, grade: List[List[List[int]]]) -> Optional[Tuple[List[tuple], List[np.ndarray]]]:
+    """ Caixas únicas da grade (células mescladas aparecem uma vez) e seus recortes, ou None se a grade não cabe na imagem. """
+    caixas = list(dict.fromkeys(tuple(caixa) for linha in grade for caixa in linha))
+    recortes = [recortar_celula(imagem_cinza, list(caixa)) for caixa in caixas]
+    return None if any(r is None for r in recortes) else (caixas, recortes)
+
+def montar_tabela(grade: List[List[List[int]]], lidas: Dict[tuple, Tuple[str, float]]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """ (textos, confianças) na forma da grade; células mescladas repetem o valor, como no DataFrame do img2table. """
+    linhas = [[lidas[tuple(caixa)][0] or None for caixa in linha] for linha in grade]
+    confiancas = [[lidas[tuple(caixa)][1] for caixa in linha] for linha in grade]
+    return pd.DataFrame(linhas), pd.DataFrame(confiancas, dtype="float64")
+
+def extrair_com_template(imagem_cinza: np.ndarray, reader, grade: List[List[List[int]]],
+                         min_confidence: int = 50, batch_size: int = 32) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    Lê as células do template na imagem (todas as células em uma chamada ao reconhecedor).
+    Retorna (textos, confianças) com a mesma forma, ou None se a grade não cabe na imagem.
+    """
+    celulas = recortes_template(imagem_cinza, grade)
+    if celulas is None: return None
+    caixas, recortes = celulas
+    return montar_tabela(grade, dict(zip(caixas, reconhecer_celulas(reader, recortes, min_confidence, batch_size))))
+
+def _sem_acentos(texto: str) -> str:
+    return unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode("ascii").lower()
+
+def _textos(valores) -> List[str]:
+    return ["" if v is None or pd.isna(v) else _sem_acentos(str(v)) for v in valores]
+
+def _linha_refinarias(df: pd.DataFrame) -> Optional[int]:
+    """
+    Índice da linha de cabeçalho com as refinarias na sequência esperada (TEMPLATE_PALAVRAS_CHAVE,
+    uma por coluna, em colunas consecutivas), ou None se nenhuma linha do topo confere.
+    """
+    for i, linha in enumerate(df.head(TEMPLATE_LINHAS_CABECALHO).to_numpy()):
+        achadas = [(j, palavra) for j, texto in enumerate(_textos(linha)) for palavra in TEMPLATE_PALAVRAS_CHAVE if palavra in texto]
+        if len(achadas) < 2: continue
+        colunas = [j for j, _ in achadas]
+        return i if [p for _, p in achadas] == list(TEMPLATE_PALAVRAS_CHAVE) and colunas == list(range(colunas[0], colunas[0] + len(colunas))) else None
+    return None
+
+def _combustiveis_conferem(df: pd.DataFrame, linha_cabecalho: int) -> bool:
+    """ Os blocos da 1ª coluna logo abaixo do cabeçalho são os combustíveis esperados, na ordem (TEMPLATE_COMBUSTIVEIS). """
+    blocos = []
+    for texto in _textos(df.iloc[linha_cabecalho + 1:, 0]):
+        combustivel = next((c for c in TEMPLATE_COMBUSTIVEIS if c in texto), None)
+        if combustivel is None: break
+        if not blocos or blocos[-1] != combustivel: blocos.append(combustivel)
+    return blocos == list(TEMPLATE_COMBUSTIVEIS)
+
+def template_confere(df: Optional[pd.DataFrame]) -> bool:
+    """
+    Confere se a tabela lida tem o layout esperado: células preenchidas, refinarias do cabeçalho na
+    sequência e colunas esperadas e os blocos de combustível na 1ª coluna. Uma grade deslocada (layout
+    diferente com o mesmo tamanho de imagem) corta os nomes e não passa.
+    """
+    if df is None or df.empty or df.notna().to_numpy().mean() < TEMPLATE_MIN_PREENCHIMENTO: return False
+    linha_cabecalho = _linha_refinarias(df)
+    return linha_cabecalho is not None and _combustiveis_conferem(df, linha_cabecalho)
@@ -0,0 +1,141 @@
+# src/query.py
+
+"""
+Consultas ad hoc ao histórico consolidado do PPI (dataset Parquet de `dataset_ppi`), sem carregar tudo no pandas.
+Os filtros são empurrados para o pyarrow.dataset:
+1. Período → poda de partições (mes=MM-YYYY) e das row groups pelas estatísticas da coluna 'data'.
+2. Combustível/refinaria → filtro aplicado na leitura (só as colunas pedidas são lidas).
+Saída em CSV ou JSON (stdout ou arquivo); o tempo da consulta vai para o stderr.
+
+Exemplos:
+    python -m src.query --combustivel diesel --refinaria Itaqui --inicio 2025-03-01 --fim 2025-03-31 --metricas defasagem_rs_l
+    python -m src.query --combustivel gasolina --metricas preco_petrobras --ultimo --formato json
+"""
+
+# --- Imports ---
+import os
+import re
+import sys
+import time
+import logging
+import argparse
+from datetime import date
+from typing import List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+except ImportError: # Dependência opcional: necessária só para consultar o dataset
+    pa = None; ds = None
+
+try:
+    from .dataset_ppi import DATASET_DIR
+    from .normalizacao import METRICAS, REFINARIAS, COMBUSTIVEIS, _canonico
+except ImportError: # Execução fora do pacote
+    from dataset_ppi import DATASET_DIR
+    from normalizacao import METRICAS, REFINARIAS, COMBUSTIVEIS, _canonico
+
+logger = logging.getLogger(__name__)
+
+# --- Constantes ---
+COLUNAS_CHAVE = ["data", "empresa", "refinaria", "combustivel"]
+FORMATOS = ("csv", "json")
+
+def meses_existentes(dataset_dir: str = DATASET_DIR) -> List[str]:
+    """ Partições ('MM-YYYY') presentes no dataset (diretórios mes=MM-YYYY). """
+    try: return sorted(nome[len("mes="):] for nome in os.listdir(dataset_dir) if re.fullmatch(r"mes=\d{2}-\d{4}", nome) and os.path.isdir(os.path.join(dataset_dir, nome)))
+    except OSError: return []
+
+def meses_do_periodo(inicio: Optional[date], fim: Optional[date], existentes: Optional[List[str]] = None) -> Optional[List[str]]:
+    """
+    Partições ('MM-YYYY') que cobrem o período, ou None se não há como podar. Sem início, as partições
+    existentes até o fim (informe 'existentes', ver meses_existentes).
+    """
+    if inicio is None:
+        if fim is None or existentes is None: return None
+        return [m for m in existentes if (int(m[3:]), int(m[:2])) <= (fim.year, fim.month)]
+    fim = fim or date.today(); meses = []; ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        meses.append(f"{mes:02d}-{ano}"); ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+def montar_filtro(inicio: Optional[date] = None, fim: Optional[date] = None, combustiveis: Optional[List[str]] = None,
+                  refinarias: Optional[List[str]] = None, existentes: Optional[List[str]] = None):
+    """
+    Expressão de filtro do pyarrow.dataset (None = sem filtro). Nomes são normalizados como no dataset.
+    'existentes' (partições do dataset) permite podar partições também quando só o fim é informado.
+    """
+    condicoes = []
+    meses = meses_do_periodo(inicio, fim, existentes)
+    if meses is not None: condicoes.append(ds.field("mes").isin(meses)) # Poda de partições
+    if inicio is not None: condicoes.append(ds.field("data") >= pa.scalar(inicio, pa.date32())) # Estatísticas das row groups
+    if fim is not None: condicoes.append(ds.field("data") <= pa.scalar(fim, pa.date32()))
+    if combustiveis: condicoes.append(ds.field("combustivel").isin([_canonico(c, COMBUSTIVEIS) or c for c in combustiveis]))
+    if refinarias: condicoes.append(ds.field("refinaria").isin([_canonico(r, REFINARIAS) or r for r in refinarias]))
+    filtro = None
+    for condicao in condicoes: filtro = condicao if filtro is None else filtro & condicao
+    return filtro
+
+def abrir_dataset(dataset_dir: str = DATASET_DIR):
+    """ Dataset Parquet particionado (hive: mes=MM-YYYY). """
+    particionamento = ds.partitioning(pa.schema([("mes", pa.string())]), flavor="hive")
+    return ds.dataset(dataset_dir, format="parquet", partitioning=particionamento)
+
+def consultar(inicio: Optional[date] = None, fim: Optional[date] = None, combustiveis: Optional[List[str]] = None,
+              refinarias: Optional[List[str]] = None, metricas: Optional[List[str]] = None, ultimo: bool = False,
+              com_flags: bool = False, dataset_dir: str = DATASET_DIR):
+    """
+    Executa a consulta e retorna (tabela Arrow, partições lidas). Com ultimo=True, mantém só a linha
+    mais recente de cada (empresa, refinaria, combustível).
+    """
+    dataset = abrir_dataset(dataset_dir)
+    filtro = montar_filtro(inicio, fim, combustiveis, refinarias, meses_existentes(dataset_dir) if inicio is None and fim is not None else None)
+    metricas = list(metricas or METRICAS)
+    colunas = COLUNAS_CHAVE + metricas + ([f"flag_{m}" for m in metricas] if com_flags else [])
+    particoes = len(list(dataset.get_fragments(filter=filtro)))
+    tabela = dataset.to_table(columns=colunas, filter=filtro)
+    tabela = tabela.sort_by([("data", "ascending"), ("combustivel", "ascending"), ("refinaria", "ascending")])
+    if ultimo and tabela.num_rows:
+        # Última linha de cada grupo (empresa, refinaria, combustível) na tabela ordenada por data. Sem join:
+        # chaves nulas (ex.: empresa vazia) formam um grupo no group_by, mas nunca casam num join
+        numeradas = tabela.append_column("_linha", pa.array(range(tabela.num_rows), pa.int64()))
+        ultimas = numeradas.group_by(["empresa", "refinaria", "combustivel"]).aggregate([("_linha", "max")])
+        tabela = tabela.take(ultimas["_linha_max"])
+        tabela = tabela.sort_by([("combustivel", "ascending"), ("refinaria", "ascending")])
+    return tabela, particoes
+
+def escrever_resultado(tabela, formato: str, saida=None):
+    """ Escreve o resultado em CSV ou JSON (lista de registros) no arquivo ou stdout. """
+    df = tabela.to_pandas()
+    if "data" in df.columns: df["data"] = df["data"].astype(str)
+    destino = saida or sys.stdout
+    if formato == "json": destino.write(df.to_json(orient="records", force_ascii=False, indent=1) + "\n")
+    else: df.to_csv(destino, index=False)
+
+def _data(valor: str) -> date:
+    return date.fromisoformat(valor)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s', handlers=[logging.StreamHandler(sys.stderr)])
+    parser = argparse.ArgumentParser(description='Consulta o histórico consolidado do PPI (dataset Parquet particionado por mês).')
+    parser.add_argument('--inicio', type=_data, default=None, help='Data inicial (AAAA-MM-DD).')
+    parser.add_argument('--fim', type=_data, default=None, help='Data final (AAAA-MM-DD).')
+    parser.add_argument('-c', '--combustivel', nargs='+', default=None, help='Combustível(is): diesel, gasolina.')
+    parser.add_argument('-r', '--refinaria', nargs='+', default=None, help='Refinaria(s): Itaqui, Suape, Paulínia, Araucária, Itacoatiara, Aratu.')
+    parser.add_argument('-m', '--metricas', nargs='+', choices=METRICAS, default=None, help='Métricas retornadas (padrão: todas).')
+    parser.add_argument('--ultimo', action='store_true', help='Só o valor mais recente de cada refinaria/combustível.')
+    parser.add_argument('--flags', action='store_true', help='Inclui as flags de normalização das métricas.')
+    parser.add_argument('-f', '--formato', choices=FORMATOS, default="csv", help='Formato da saída.')
+    parser.add_argument('-o', '--saida', type=str, default=None, help='Arquivo de saída (padrão: stdout).')
+    parser.add_argument('-d', '--dataset', type=str, default=DATASET_DIR, help='Diretório do dataset Parquet.')
+    args = parser.parse_args()
+
+    if pa is None: print("ERRO: pyarrow não instalado (pip install pyarrow).", file=sys.stderr); sys.exit(1)
+    if not os.path.isdir(args.dataset): print(f"ERRO: dataset não encontrado em {args.dataset} (rode a análise ou python -m src.dataset_ppi).", file=sys.stderr); sys.exit(1)
+    inicio = time.perf_counter()
+    tabela, particoes = consultar(args.inicio, args.fim, args.combustivel, args.refinaria, args.metricas, args.ultimo, args.flags, args.dataset)
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8', newline='') as f: escrever_resultado(tabela, args.formato, f)
+    else: escrever_resultado(tabela, args.formato)
+    print(f"Consulta: {tabela.num_rows} linhas de {particoes} partições em {duracao_ms:.1f} ms.", file=sys.stderr)
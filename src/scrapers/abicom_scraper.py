@@ -3,17 +3,21 @@ Implementação específica de scraper para o site da Abicom.
 """
 import logging
 import os
-import time
 import re
+import asyncio
+import concurrent.futures
+from datetime import datetime
 from typing import List, Optional, Set, Dict
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from src.scrapers.base_scraper import BaseScraper
 from src.models.image import Image
 from src.services.http_client import HttpClient
+from src.services.http_cache import HttpCache
+from src.services.async_http_client import AsyncHttpClient
 from src.services.image_service import ImageService
 from src.utils.url_utils import normalize_url, is_image_url
-from src.config import BASE_URL, PAGE_PATTERN, IMAGE_EXTENSIONS, SLEEP_BETWEEN_REQUESTS
+from src.config import BASE_URL, PAGE_PATTERN, IMAGE_EXTENSIONS, SCRAPER_CONCURRENCY, POST_CACHE_TTL
 
 logger = logging.getLogger(__name__)
 
@@ -26,7 +30,11 @@ class AbicomScraper(BaseScraper):
                 base_url: str = BASE_URL, 
                 page_pattern: str = PAGE_PATTERN,
                 http_client: Optional[HttpClient] = None,
-                image_service: Optional[ImageService] = None):
+                image_service: Optional[ImageService] = None,
+                concurrency: int = SCRAPER_CONCURRENCY,
+                incremental: bool = False,
+                post_cache_ttl: Optional[float] = POST_CACHE_TTL,
+                http_cache: Optional[HttpCache] = None):
         """
         Inicializa o scraper da Abicom.
         
@@ -35,13 +43,27 @@ class AbicomScraper(BaseScraper):
             page_pattern: Padrão para formação de URLs de páginas
             http_client: Cliente HTTP opcional
             image_service: Serviço de imagens opcional
+            concurrency: Número de posts buscados em paralelo por página (1 = sequencial)
+            incremental: Se True, para na primeira página cujos posts já são todos conhecidos
+            post_cache_ttl: Validade (segundos) da resolução post → imagem em cache (None = sem expiração)
+            http_cache: Cache de revalidação (ETag/Last-Modified) para o cliente HTTP criado
+                        pelo scraper; ignorado quando http_client é informado
         """
-        super().__init__(base_url, http_client, image_service)
+        self.concurrency = max(1, concurrency)
+        
+        # O ritmo das requisições é definido pelo token bucket compartilhado do HttpClient
+        if http_client is None:
+            http_client = HttpClient(pool_size=max(10, self.concurrency), cache=http_cache)
+            
+        super().__init__(base_url, http_client, image_service, incremental)
         self.page_pattern = page_pattern
         self.visited_posts: Set[str] = set()  # Para rastrear posts já visitados
-        self.post_info_cache: Dict[str, Dict] = {}  # Cache de informações de posts
+        self.known_only_pages: Set[str] = set()  # Páginas de listagem sem nenhum post novo
+        # Cache persistente post → primeira imagem (carregado do manifesto)
+        self.post_cache_ttl = post_cache_ttl
+        self.post_info_cache: Dict[str, Dict] = self.image_service.manifest.load_post_cache()
         
-        # Pré-indexar as imagens existentes para otimizar a verificação
+        # Pré-indexar as imagens existentes (idempotente: usa o manifesto já carregado)
         self.image_service.pre_check_monthly_images()
         
     def build_page_url(self, page_num: int) -> str:
@@ -138,8 +160,32 @@ class AbicomScraper(BaseScraper):
             logger.error(f"Falha ao obter a página de listagem: {page_url}")
             return []
             
+        # Página não modificada desde a última execução: reaproveita os links já extraídos
+        manifest = self.image_service.manifest
+        if getattr(response, 'not_modified', False):
+            cached_links = manifest.get_listing_links(page_url)
+            if cached_links is not None:
+                logger.info(f"Página de listagem não modificada (304): {page_url}. Usando {len(cached_links)} links em cache.")
+                return cached_links
+                
+        post_links = self.parse_post_links(response.content, page_url)
+        if self.http_client.cache is not None:
+            manifest.record_listing_links(page_url, post_links)
+        return post_links
+        
+    def parse_post_links(self, html: bytes, page_url: str) -> List[str]:
+        """
+        Analisa o HTML de uma página de listagem e extrai os links dos posts.
+        
+        Args:
+            html: Conteúdo HTML da página de listagem
+            page_url: URL da página de listagem
+            
+        Returns:
+            List[str]: Lista de URLs de posts individuais
+        """
         # Analisa o HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser')
         
         # Abordagem simplificada e direta para encontrar links da página
         post_links = []
@@ -200,31 +246,110 @@ class AbicomScraper(BaseScraper):
         Returns:
             List[Image]: Lista contendo apenas a primeira imagem encontrada, ou lista vazia se nenhuma for encontrada
         """
+        if not self._claim_post(post_url):
+            return []
+            
+        # Usa a resolução em cache, se houver, e vai direto ao download da imagem
+        cached_images = self._get_cached_post_images(post_url)
+        if cached_images is not None:
+            return cached_images
+            
+        logger.info(f"Acessando post: {post_url}")
+        
+        # Obtém o conteúdo do post
+        response = self.http_client.get(post_url)
+        
+        if not response:
+            logger.error(f"Falha ao obter o post: {post_url}")
+            return []
+            
+        return self._cache_post_images(post_url, self.parse_first_image(response.content, post_url))
+        
+    def _get_cached_post_images(self, post_url: str) -> Optional[List[Image]]:
+        """
+        Consulta o cache post → imagem.
+        
+        Args:
+            post_url: URL do post
+            
+        Returns:
+            Optional[List[Image]]: Imagem do post (lista com um item) ou None se não houver
+                                   resolução válida em cache
+        """
+        info = self.post_info_cache.get(post_url)
+        if not info:
+            return None
+            
+        if self.post_cache_ttl is not None:
+            try:
+                age = (datetime.now() - datetime.fromisoformat(info["resolved_at"])).total_seconds()
+            except (KeyError, ValueError):
+                age = None
+            if age is None or age > self.post_cache_ttl:
+                logger.debug(f"Resolução em cache expirada para o post {post_url}")
+                return None
+                
+        logger.info(f"Imagem do post {post_url} obtida do cache: {info['image_url']}")
+        return [Image(url=info["image_url"], source_url=post_url, file_extension=info["file_extension"])]
+        
+    def _cache_post_images(self, post_url: str, images: List[Image]) -> List[Image]:
+        """
+        Guarda a primeira imagem de um post no cache persistente.
+        
+        Args:
+            post_url: URL do post
+            images: Imagens extraídas do post
+            
+        Returns:
+            List[Image]: As mesmas imagens recebidas
+        """
+        if images:
+            image = images[0]
+            resolved_at = self.image_service.manifest.record_post_resolution(
+                post_url, image.url, image.file_extension)
+            self.post_info_cache[post_url] = {"image_url": image.url,
+                                              "file_extension": image.file_extension,
+                                              "resolved_at": resolved_at}
+        return images
+        
+    def _claim_post(self, post_url: str) -> bool:
+        """
+        Verifica se um post deve ser acessado e, em caso positivo, marca-o como visitado.
+        
+        Args:
+            post_url: URL do post
+            
+        Returns:
+            bool: True se o post deve ser acessado, False caso contrário
+        """
         # Verifica se o post já foi visitado
         if post_url in self.visited_posts:
             logger.debug(f"Post já visitado: {post_url}")
-            return []
+            return False
             
         # Verifica se a URL parece ser de uma página de listagem e não de um post individual
         ignore_patterns = ['/categoria/', '/category/', '/tag/', '/author/', '/page/']
         if any(pattern in post_url for pattern in ignore_patterns) and post_url != self.base_url:
             logger.debug(f"Ignorando URL que parece ser uma página de listagem: {post_url}")
-            return []
+            return False
             
         # Marca o post como visitado
         self.visited_posts.add(post_url)
+        return True
         
-        logger.info(f"Acessando post: {post_url}")
-        
-        # Obtém o conteúdo do post
-        response = self.http_client.get(post_url)
+    def parse_first_image(self, html: bytes, post_url: str) -> List[Image]:
+        """
+        Analisa o HTML de um post e extrai a primeira imagem válida.
         
-        if not response:
-            logger.error(f"Falha ao obter o post: {post_url}")
-            return []
+        Args:
+            html: Conteúdo HTML do post
+            post_url: URL do post
             
+        Returns:
+            List[Image]: Lista contendo apenas a primeira imagem encontrada, ou lista vazia
+        """
         # Analisa o HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(html, 'html.parser')
         
         # Encontra o conteúdo principal do post
         content_selectors = [
@@ -297,18 +422,99 @@ class AbicomScraper(BaseScraper):
         Returns:
             List[Image]: Lista de objetos Image encontrados (apenas a primeira imagem de cada post)
         """
-        all_images = []
-        
         # 1. Extrai links para posts da página de listagem
         post_links = self.extract_post_links(page_url)
         
+        # 2. Filtra apenas os posts que precisam ser processados
+        posts_to_process = self._select_posts_to_process(post_links, page_url)
+        if not posts_to_process:
+            return []
+        
+        # 3. Para cada post não processado, extrai a primeira imagem
+        if self.concurrency > 1 and len(posts_to_process) > 1:
+            results = self._fetch_posts_concurrently(posts_to_process)
+        else:
+            results = self._fetch_posts_sequentially(posts_to_process)
+            
+        return self._collect_images(posts_to_process, results, page_url)
+        
+    async def extract_images_from_page_async(self, page_url: str, http_client: AsyncHttpClient) -> List[Image]:
+        """
+        Versão assíncrona de extract_images_from_page: busca todos os posts da página
+        ao mesmo tempo, limitados apenas pelo pool do AsyncHttpClient.
+        
+        Args:
+            page_url: URL da página de listagem
+            http_client: Cliente HTTP assíncrono
+            
+        Returns:
+            List[Image]: Lista de objetos Image encontrados, na ordem da listagem
+        """
+        response = await http_client.get(page_url)
+        if not response:
+            logger.error(f"Falha ao obter a página de listagem: {page_url}")
+            return []
+            
+        post_links = self.parse_post_links(response.content, page_url)
+        posts_to_process = self._select_posts_to_process(post_links, page_url)
+        if not posts_to_process:
+            return []
+            
+        results = await asyncio.gather(
+            *(self.extract_images_from_post_async(post_url, http_client) for post_url in posts_to_process),
+            return_exceptions=True
+        )
+        for post_url, result in zip(posts_to_process, results):
+            if isinstance(result, Exception):
+                logger.error(f"Erro ao processar o post {post_url}: {result}")
+        results = [result if isinstance(result, list) else [] for result in results]
+        
+        return self._collect_images(posts_to_process, results, page_url)
+        
+    async def extract_images_from_post_async(self, post_url: str, http_client: AsyncHttpClient) -> List[Image]:
+        """
+        Versão assíncrona de extract_images_from_post.
+        
+        Args:
+            post_url: URL do post
+            http_client: Cliente HTTP assíncrono
+            
+        Returns:
+            List[Image]: Lista contendo apenas a primeira imagem encontrada, ou lista vazia
+        """
+        if not self._claim_post(post_url):
+            return []
+            
+        cached_images = self._get_cached_post_images(post_url)
+        if cached_images is not None:
+            return cached_images
+            
+        logger.info(f"Acessando post: {post_url}")
+        response = await http_client.get(post_url)
+        
+        if not response:
+            logger.error(f"Falha ao obter o post: {post_url}")
+            return []
+            
+        return self._cache_post_images(post_url, self.parse_first_image(response.content, post_url))
+        
+    def _select_posts_to_process(self, post_links: List[str], page_url: str) -> List[str]:
+        """
+        Filtra os links de uma página de listagem, mantendo apenas os posts ainda não baixados.
+        
+        Args:
+            post_links: Links de posts encontrados na página
+            page_url: URL da página de listagem
+            
+        Returns:
+            List[str]: Posts que precisam ser processados, na ordem da listagem
+        """
         if not post_links:
             logger.warning(f"Nenhum link de post encontrado na página {page_url}")
             return []
             
         logger.info(f"Encontrados {len(post_links)} posts na página {page_url}")
         
-        # 2. Filtra apenas os posts que precisam ser processados
         posts_to_process = []
         for post_url in post_links:
             if self.should_download_post(post_url):
@@ -317,27 +523,87 @@ class AbicomScraper(BaseScraper):
                 logger.debug(f"Post já processado anteriormente: {post_url}")
                 
         logger.info(f"De {len(post_links)} posts, {len(posts_to_process)} precisam ser processados")
+        if not posts_to_process:
+            self.known_only_pages.add(page_url)
+        return posts_to_process
         
-        # 3. Para cada post não processado, extrai a primeira imagem
-        for i, post_url in enumerate(posts_to_process):
-            # Extrai imagens do post (apenas a primeira)
-            post_images = self.extract_images_from_post(post_url)
+    def page_fully_known(self, page_url: str) -> bool:
+        """
+        Indica se todos os posts da página de listagem já eram conhecidos.
+        
+        Args:
+            page_url: URL da página de listagem
+            
+        Returns:
+            bool: True se a página não tinha nenhum post a processar
+        """
+        return page_url in self.known_only_pages
+        
+    def _collect_images(self, post_urls: List[str], results: List[List[Image]], page_url: str) -> List[Image]:
+        """
+        Junta as imagens extraídas de cada post, preservando a ordem da listagem.
+        
+        Args:
+            post_urls: URLs dos posts processados
+            results: Imagens de cada post, na mesma ordem de post_urls
+            page_url: URL da página de listagem
             
+        Returns:
+            List[Image]: Lista de objetos Image encontrados
+        """
+        all_images = []
+        for i, (post_url, post_images) in enumerate(zip(post_urls, results)):
             if post_images:
                 all_images.extend(post_images)
-                logger.debug(f"Adicionada imagem do post {i+1}/{len(posts_to_process)}: {post_url}")
+                logger.debug(f"Adicionada imagem do post {i+1}/{len(post_urls)}: {post_url}")
             else:
-                logger.debug(f"Nenhuma imagem encontrada no post {i+1}/{len(posts_to_process)}: {post_url}")
-            
-            # Pausa entre requisições
-            if SLEEP_BETWEEN_REQUESTS > 0:
-                time.sleep(SLEEP_BETWEEN_REQUESTS)
+                logger.debug(f"Nenhuma imagem encontrada no post {i+1}/{len(post_urls)}: {post_url}")
                 
         # Agora o log será mais preciso - inclui apenas a primeira imagem de cada post
         total_imagens = len(all_images)
         if total_imagens > 0:
-            logger.info(f"Coletadas {total_imagens} imagens dos {len(posts_to_process)} posts processados da página {page_url}")
+            logger.info(f"Coletadas {total_imagens} imagens dos {len(post_urls)} posts processados da página {page_url}")
         else:
-            logger.warning(f"Nenhuma imagem coletada dos {len(posts_to_process)} posts processados da página {page_url}")
+            logger.warning(f"Nenhuma imagem coletada dos {len(post_urls)} posts processados da página {page_url}")
+            
+        return all_images
+
+    def _fetch_posts_sequentially(self, post_urls: List[str]) -> List[List[Image]]:
+        """
+        Extrai a primeira imagem de cada post, um de cada vez.
+        
+        Args:
+            post_urls: URLs dos posts a processar
             
-        return all_images
\ No newline at end of file
+        Returns:
+            List[List[Image]]: Imagens de cada post, na mesma ordem de post_urls
+        """
+        # Extrai imagens de cada post (apenas a primeira)
+        return [self.extract_images_from_post(post_url) for post_url in post_urls]
+        
+    def _fetch_posts_concurrently(self, post_urls: List[str]) -> List[List[Image]]:
+        """
+        Extrai a primeira imagem de cada post em paralelo, usando a sessão compartilhada
+        do HttpClient. O ritmo é controlado pelo limitador de taxa do cliente.
+        
+        Args:
+            post_urls: URLs dos posts a processar
+            
+        Returns:
+            List[List[Image]]: Imagens de cada post, na mesma ordem de post_urls
+        """
+        workers = min(self.concurrency, len(post_urls))
+        logger.debug(f"Buscando {len(post_urls)} posts com {workers} workers")
+        
+        results: List[List[Image]] = [[] for _ in post_urls]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(self.extract_images_from_post, post_url): index
+                       for index, post_url in enumerate(post_urls)}
+            for future in concurrent.futures.as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"Erro ao processar o post {post_urls[index]}: {e}", exc_info=True)
+                    
+        return results
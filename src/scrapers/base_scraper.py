@@ -3,12 +3,16 @@ Classe base para scrapers.
 """
 import abc
 import time
+import asyncio
 import logging
-from typing import List, Optional, Set, Generator
+from typing import List, Optional, Set, Dict, Generator
 from src.models.image import Image
 from src.services.http_client import HttpClient
+from src.services.async_http_client import AsyncHttpClient
 from src.services.image_service import ImageService
-from src.config import SLEEP_BETWEEN_REQUESTS, SLEEP_BETWEEN_PAGES
+from src.utils.async_utils import run_in_thread
+from src.utils.rate_limiter import shared_concurrency_limiters
+from src.utils.url_utils import extract_domain
 
 logger = logging.getLogger(__name__)
 
@@ -18,7 +22,8 @@ class BaseScraper(abc.ABC):
     """
     
     def __init__(self, base_url: str, http_client: Optional[HttpClient] = None, 
-                image_service: Optional[ImageService] = None):
+                image_service: Optional[ImageService] = None,
+                incremental: bool = False):
         """
         Inicializa o scraper base.
         
@@ -26,8 +31,11 @@ class BaseScraper(abc.ABC):
             base_url: URL base para o scraping
             http_client: Cliente HTTP opcional
             image_service: Serviço de imagens opcional
+            incremental: Se True, interrompe a paginação na primeira página de listagem
+                         cujos posts já são todos conhecidos
         """
         self.base_url = base_url
+        self.incremental = incremental
         
         # Usa os serviços fornecidos ou cria novos
         self.http_client = http_client if http_client else HttpClient()
@@ -36,6 +44,9 @@ class BaseScraper(abc.ABC):
         # Conjunto para controlar URLs já visitadas
         self.visited_urls: Set[str] = set()
         
+        # Estatísticas da execução (exibidas no relatório final)
+        self.run_stats: Dict[str, int] = {"pages_scraped": 0, "pages_skipped": 0}
+        
     @abc.abstractmethod
     def build_page_url(self, page_num: int) -> str:
         """
@@ -62,6 +73,57 @@ class BaseScraper(abc.ABC):
         """
         pass
         
+    async def extract_images_from_page_async(self, page_url: str, http_client: AsyncHttpClient) -> List[Image]:
+        """
+        Versão assíncrona de extract_images_from_page. Por padrão executa a versão
+        síncrona em uma thread (sem bloquear o event loop); scrapers com suporte nativo
+        ao modo assíncrono sobrescrevem este método para usar o http_client.
+        
+        Args:
+            page_url: URL da página
+            http_client: Cliente HTTP assíncrono
+            
+        Returns:
+            List[Image]: Lista de objetos Image encontrados
+        """
+        return await run_in_thread(self.extract_images_from_page, page_url)
+        
+    def page_fully_known(self, page_url: str) -> bool:
+        """
+        Indica se todos os posts de uma página de listagem já eram conhecidos quando
+        ela foi processada. Usado pelo modo incremental para encerrar a paginação.
+        Scrapers que não sabem responder retornam False (nunca interrompe).
+        
+        Args:
+            page_url: URL da página
+            
+        Returns:
+            bool: True se a página só continha posts já baixados
+        """
+        return False
+        
+    def _stop_incremental(self, page_url: str, page_num: int, last_page: int) -> bool:
+        """
+        Decide se o modo incremental deve parar após a página informada e contabiliza
+        as páginas que deixarão de ser visitadas.
+        
+        Args:
+            page_url: URL da página recém-processada
+            page_num: Número da página recém-processada
+            last_page: Número da última página que seria visitada
+            
+        Returns:
+            bool: True se a paginação deve ser interrompida
+        """
+        if not self.incremental or not self.page_fully_known(page_url):
+            return False
+            
+        skipped = last_page - page_num
+        self.run_stats["pages_skipped"] += skipped
+        logger.info(f"Modo incremental: página {page_num} só contém posts conhecidos. "
+                    f"Encerrando paginação ({skipped} páginas puladas).")
+        return True
+        
     def scrape_page(self, page_url: str) -> List[Image]:
         """
         Realiza o scraping de uma página.
@@ -81,13 +143,7 @@ class BaseScraper(abc.ABC):
         self.visited_urls.add(page_url)
         
         # Extrai imagens da página e seus posts vinculados
-        images = self.extract_images_from_page(page_url)
-        
-        # Pausa entre requisições
-        if SLEEP_BETWEEN_REQUESTS > 0:
-            time.sleep(SLEEP_BETWEEN_REQUESTS)
-            
-        return images
+        return self.extract_images_from_page(page_url)
         
     def scrape_pages(self, start_page: int = 1, max_pages: int = 10) -> Generator[List[Image], None, None]:
         """
@@ -100,6 +156,7 @@ class BaseScraper(abc.ABC):
         Yields:
             List[Image]: Lista de objetos Image encontrados em cada página
         """
+        last_page = start_page + max_pages - 1
         for page_num in range(start_page, start_page + max_pages):
             # Constrói a URL da página
             page_url = self.build_page_url(page_num)
@@ -107,17 +164,18 @@ class BaseScraper(abc.ABC):
             # Realiza o scraping da página
             logger.info(f"Realizando scraping da página {page_num}: {page_url}")
             images = self.scrape_page(page_url)
+            self.run_stats["pages_scraped"] += 1
             
             # Verifica se alguma imagem foi encontrada
             if images:
                 logger.info(f"Encontradas {len(images)} imagens na página {page_num}")
                 yield images
-            else:
+            elif not self.page_fully_known(page_url):
                 logger.warning(f"Nenhuma imagem encontrada na página {page_num}")
                 
-            # Pausa entre páginas
-            if SLEEP_BETWEEN_PAGES > 0 and page_num < start_page + max_pages - 1:
-                time.sleep(SLEEP_BETWEEN_PAGES)
+            # Modo incremental: para na primeira página sem posts novos
+            if self._stop_incremental(page_url, page_num, last_page):
+                break
                 
     def run(self, start_page: int = 1, max_pages: int = 10) -> int:
         """
@@ -140,12 +198,107 @@ class BaseScraper(abc.ABC):
                 total_downloads += downloads
                 
             logger.info(f"Total de {total_downloads} imagens baixadas")
+            self.log_run_report()
             return total_downloads
             
         finally:
             # Fecha os recursos
             self.close()
             
+    async def run_async(self, start_page: int = 1, max_pages: int = 10,
+                        http_client: Optional[AsyncHttpClient] = None) -> int:
+        """
+        Executa o scraper no modo assíncrono: as páginas de listagem, os posts e as
+        imagens são requisitados concorrentemente por um AsyncHttpClient.
+        
+        Args:
+            start_page: Página inicial
+            max_pages: Número máximo de páginas
+            http_client: Cliente HTTP assíncrono opcional
+            
+        Returns:
+            int: Número total de imagens baixadas
+        """
+        # O cliente criado aqui compartilha o cache HTTP do cliente síncrono (mesmo modo)
+        async_client = http_client if http_client else AsyncHttpClient(cache=self.http_client.cache)
+        total_downloads = 0
+        
+        try:
+            async with async_client:
+                page_urls = []
+                for page_num in range(start_page, start_page + max_pages):
+                    page_url = self.build_page_url(page_num)
+                    if page_url in self.visited_urls:
+                        logger.debug(f"Página já visitada: {page_url}")
+                        continue
+                    self.visited_urls.add(page_url)
+                    page_urls.append((page_num, page_url))
+                    
+                if self.incremental:
+                    # Páginas em sequência (posts de cada página em paralelo) para poder parar cedo
+                    pages = []
+                    for page_num, page_url in page_urls:
+                        logger.info(f"Realizando scraping da página {page_num}: {page_url}")
+                        try:
+                            pages.append(await self.extract_images_from_page_async(page_url, async_client))
+                        except Exception as e:
+                            pages.append(e)
+                        if self._stop_incremental(page_url, page_num, start_page + max_pages - 1):
+                            break
+                    page_urls = page_urls[:len(pages)]
+                else:
+                    logger.info(f"Realizando scraping assíncrono de {len(page_urls)} páginas")
+                    pages = await asyncio.gather(
+                        *(self.extract_images_from_page_async(page_url, async_client) for _, page_url in page_urls),
+                        return_exceptions=True
+                    )
+                self.run_stats["pages_scraped"] += len(pages)
+                
+                images = []
+                for (page_num, page_url), page_images in zip(page_urls, pages):
+                    if isinstance(page_images, Exception):
+                        logger.error(f"Erro no scraping da página {page_url}: {page_images}")
+                    elif page_images:
+                        logger.info(f"Encontradas {len(page_images)} imagens na página {page_num}")
+                        images.extend(page_images)
+                    elif not self.page_fully_known(page_url):
+                        logger.warning(f"Nenhuma imagem encontrada na página {page_num}")
+                        
+                total_downloads = await self.image_service.process_images_async(images, async_client)
+                
+            logger.info(f"Total de {total_downloads} imagens baixadas")
+            self.log_run_report()
+            return total_downloads
+            
+        finally:
+            # Fecha os recursos síncronos
+            self.close()
+            
+    def log_run_report(self):
+        """
+        Registra no log o relatório de páginas visitadas/puladas da execução.
+        """
+        logger.info(f"Relatório: {self.run_stats['pages_scraped']} páginas visitadas, "
+                    f"{self.run_stats['pages_skipped']} páginas puladas (incremental)")
+        
+        # Concorrência adaptativa (limitadores por host, compartilhados pelo scraper e pelos
+        # downloads): limite final e cada ajuste com o seu motivo
+        limiters = shared_concurrency_limiters()
+        if self.http_client.concurrency_limiter is not None:
+            limiters["(cliente do scraper)"] = self.http_client.concurrency_limiter
+        self.run_stats["concurrency_changes"] = 0
+        for host, limiter in sorted(limiters.items()):
+            metrics = limiter.metrics()
+            if host == extract_domain(self.base_url).lower() or "concurrency_limit" not in self.run_stats:
+                self.run_stats["concurrency_limit"] = metrics["limit"]
+            self.run_stats["concurrency_changes"] += len(metrics["changes"])
+            p95 = f"{metrics['p95_latency']:.2f}s" if metrics["p95_latency"] is not None else "n/d"
+            logger.info(f"Concorrência ({host}): limite atual {metrics['limit']}, p95 {p95}, "
+                        f"{len(metrics['changes'])} ajustes")
+            for timestamp, old_limit, new_limit, reason in metrics["changes"]:
+                logger.info(f"  {time.strftime('%H:%M:%S', time.localtime(timestamp))} "
+                            f"{old_limit} -> {new_limit}: {reason}")
+            
     def close(self):
         """
         Fecha recursos utilizados pelo scraper.
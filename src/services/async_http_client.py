@@ -0,0 +1,396 @@
+"""
+Cliente HTTP assíncrono (asyncio/aiohttp) com tratamento de erros e retentativas.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from src.utils.file_utils import (get_partial_path, get_partial_size, parse_content_range,
+                                  expected_download_size, finalize_partial_file, update_hash_from_file,
+                                  get_partial_validator, save_partial_validator, remove_partial_files)
+from src.utils.async_utils import run_in_thread
+from src.utils.rate_limiter import (HostRateLimiter, THROTTLE_STATUS_CODES, get_shared_rate_limiter,
+                                    parse_retry_after)
+from src.services.http_cache import HttpCache, CacheEntry
+from src.config import REQUEST_TIMEOUT, RETRY_COUNT, RETRY_DELAY, USER_AGENT, ASYNC_MAX_CONCURRENCY
+
+try:
+    import aiohttp
+except ImportError:  # Dependência opcional: só é necessária no modo assíncrono
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AsyncResponse:
+    """
+    Resposta já lida de uma requisição assíncrona (espelha os atributos usados de requests.Response).
+    """
+    url: str
+    status_code: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+    not_modified: bool = False
+    from_cache: bool = False
+
+    @property
+    def text(self) -> str:
+        """Conteúdo decodificado como texto."""
+        return self.content.decode("utf-8", errors="replace")
+
+class AsyncHttpClient:
+    """
+    Cliente HTTP assíncrono com pool de conexões, limite de requisições simultâneas
+    e retentativas com espera não bloqueante.
+    """
+
+    def __init__(self,
+                timeout: int = REQUEST_TIMEOUT,
+                retry_count: int = RETRY_COUNT,
+                retry_delay: int = RETRY_DELAY,
+                max_concurrency: int = ASYNC_MAX_CONCURRENCY,
+                rate_limiter: Optional[HostRateLimiter] = None,
+                cache: Optional[HttpCache] = None):
+        """
+        Inicializa o cliente HTTP assíncrono.
+
+        Args:
+            timeout: Tempo limite para requisições em segundos
+            retry_count: Número de tentativas em caso de falha
+            retry_delay: Tempo de espera entre tentativas em segundos
+            max_concurrency: Número máximo de requisições simultâneas
+            rate_limiter: Limitador de taxa por host (padrão: o limitador compartilhado do processo)
+            cache: Cache de respostas e downloads, com os mesmos modos do HttpClient. O cache
+                   pertence a quem o criou e não é fechado por este cliente
+        """
+        if aiohttp is None:
+            raise ImportError("AsyncHttpClient requer o pacote 'aiohttp' (pip install aiohttp)")
+
+        self.timeout = timeout
+        self.retry_count = retry_count
+        self.retry_delay = retry_delay
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate_limiter = rate_limiter if rate_limiter else get_shared_rate_limiter()
+        self.cache = cache
+
+        # Headers padrão para requisições (os mesmos do HttpClient)
+        self.default_headers = {
+            "User-Agent": USER_AGENT,
+            "Accept-Language": "pt-BR,pt;q=0.9,en-US;q=0.8,en;q=0.7",
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+            "Upgrade-Insecure-Requests": "1",
+        }
+        # Enviados por requisição (e não fixos na sessão) para que o get os remova nas revalidações
+        # condicionais, como o HttpClient: com eles, o servidor responde 200 em vez de 304
+        self.no_cache_headers = {
+            "Pragma": "no-cache",
+            "Cache-Control": "no-cache",
+        }
+
+        # A sessão e as primitivas de sincronização são criadas dentro do event loop
+        self.session: Optional["aiohttp.ClientSession"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def _ensure_session(self) -> "aiohttp.ClientSession":
+        """
+        Cria a sessão (e o pool de conexões) na primeira utilização.
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                headers=self.default_headers,
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self.session
+
+    async def _wait_for_rate_limit(self, url: str) -> None:
+        """
+        Reserva uma ficha no token bucket do host e aguarda a sua vez sem bloquear o event loop.
+        """
+        delay = self.rate_limiter.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def get(self, url: str,
+                 headers: Optional[Dict[str, str]] = None,
+                 params: Optional[Dict[str, str]] = None) -> Optional[AsyncResponse]:
+        """
+        Realiza uma requisição GET com tratamento de erros e retentativas.
+
+        Args:
+            url: URL para a requisição
+            headers: Headers adicionais para a requisição
+            params: Parâmetros para a URL
+
+        Returns:
+            AsyncResponse: Resposta com o conteúdo já lido ou None em caso de falha. Com cache,
+                           'not_modified' indica que o corpo é o mesmo já armazenado
+        """
+        # Cache (mesma política do HttpClient): offline nunca acessa a rede; entradas
+        # frescas são servidas direto e as demais são revalidadas
+        use_cache = self.cache is not None and not params
+        cached_entry = None
+        if self.cache is not None and self.cache.offline:
+            cached_entry = await run_in_thread(self.cache.get, url) if use_cache else None
+            if cached_entry is None:
+                logger.warning(f"Cache offline: resposta não disponível para {url}")
+                return None
+            return self._response_from_cache(cached_entry)
+        request_headers = {**self.no_cache_headers, **(headers or {})}
+        if use_cache and not self.cache.refresh:
+            cached_entry = await run_in_thread(self.cache.get, url)
+            if cached_entry is not None and cached_entry.is_fresh:
+                logger.debug(f"Resposta fresca servida do cache: {url}")
+                return self._response_from_cache(cached_entry)
+            if cached_entry is not None:
+                request_headers.pop("Pragma", None)
+                request_headers.pop("Cache-Control", None)
+                if cached_entry.etag:
+                    request_headers["If-None-Match"] = cached_entry.etag
+                if cached_entry.last_modified:
+                    request_headers["If-Modified-Since"] = cached_entry.last_modified
+
+        session = await self._ensure_session()
+
+        for attempt in range(1, self.retry_count + 1):
+            try:
+                logger.debug(f"GET (async) {url} (tentativa {attempt}/{self.retry_count})")
+                await self._wait_for_rate_limit(url)
+
+                async with self._semaphore:
+                    async with session.get(url, headers=request_headers, params=params) as response:
+                        response.raise_for_status()
+                        content = await response.read()
+                        result = AsyncResponse(url=str(response.url), status_code=response.status,
+                                               headers=dict(response.headers), content=content)
+                if use_cache:
+                    await run_in_thread(self._apply_cache, url, result, cached_entry)
+                return result
+
+            except asyncio.TimeoutError as e:
+                logger.warning(f"Timeout ao acessar {url}: {e}")
+            except aiohttp.ClientResponseError as e:
+                logger.warning(f"Erro HTTP {e.status} ao acessar {url}")
+                self._honor_retry_after(url, e)
+            except aiohttp.ClientError as e:
+                logger.warning(f"Erro ao acessar {url}: {e}")
+
+            # Se não for a última tentativa, aguarda (sem bloquear as demais requisições)
+            if attempt < self.retry_count:
+                delay = self.retry_delay * attempt  # Aumento gradual do tempo de espera
+                logger.debug(f"Aguardando {delay}s antes da próxima tentativa")
+                await asyncio.sleep(delay)
+
+        logger.error(f"Falha após {self.retry_count} tentativas: {url}")
+        return None
+
+    async def download_file(self, url: str,
+                           output_path: str,
+                           chunk_size: int = 8192,
+                           headers: Optional[Dict[str, str]] = None,
+                           metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Baixa um arquivo de uma URL para um caminho local, com a mesma gravação atômica
+        e retomada por Range/If-Range (e o mesmo hash em streaming) do HttpClient.download_file.
+        
+        Args:
+            url: URL do arquivo
+            output_path: Caminho local onde o arquivo será salvo
+            chunk_size: Tamanho dos chunks para download
+            headers: Headers adicionais para a requisição
+            metadata: Dicionário opcional preenchido com 'size', 'sha256', 'etag' e 'last_modified'
+            
+        Returns:
+            bool: True se o download for bem-sucedido, False caso contrário
+        """
+        part_path = get_partial_path(output_path)
+        
+        # Cache: offline só grava a partir do cache; no modo padrão, entradas frescas dispensam a rede
+        if self.cache is not None and not self.cache.refresh:
+            try:
+                cached = await run_in_thread(self.cache.restore_file, url, output_path,
+                                                 not self.cache.offline)
+            except OSError as e:
+                logger.error(f"Erro ao gravar arquivo {output_path} a partir do cache: {e}")
+                return False
+            if cached is not None:
+                if metadata is not None:
+                    metadata.update(cached)
+                logger.info(f"Arquivo gravado a partir do cache HTTP: {output_path}")
+                return True
+            if self.cache.offline:
+                logger.warning(f"Cache offline: arquivo não disponível para {url}")
+                return False
+        
+        session = await self._ensure_session()
+        
+        for attempt in range(1, self.retry_count + 1):
+            offset = get_partial_size(output_path)
+            validator = get_partial_validator(output_path) if offset else None
+            if offset and not validator:
+                # Sem validador não há como garantir que o parcial é do mesmo arquivo
+                logger.info(f"Arquivo parcial sem validador, recomeçando do zero: {part_path}")
+                remove_partial_files(output_path)
+                offset = 0
+            request_headers = {**self.no_cache_headers, **(headers or {})}
+            if offset:
+                logger.info(f"Retomando download de {url} a partir do byte {offset}")
+                request_headers["Range"] = f"bytes={offset}-"
+                request_headers["If-Range"] = validator
+                
+            try:
+                logger.debug(f"GET (async) {url} (tentativa {attempt}/{self.retry_count})")
+                await self._wait_for_rate_limit(url)
+                
+                async with self._semaphore:
+                    async with session.get(url, headers=request_headers) as response:
+                        response.raise_for_status()
+                        # 206 que não começa no offset pedido: descarta o parcial e recomeça
+                        resumed = response.status == 206
+                        if resumed and (not offset or
+                                        parse_content_range(response.headers.get("Content-Range"))[0] != offset):
+                            logger.warning(f"Retomada recusada para {url} (Content-Range "
+                                           f"{response.headers.get('Content-Range')}). Recomeçando do zero.")
+                            remove_partial_files(output_path)
+                            continue
+                        # 206: tamanho total do Content-Range; 200 (arquivo inteiro): Content-Length
+                        expected_size = expected_download_size(response.status, response.headers)
+                        # E/S de disco em threads auxiliares: o event loop segue atendendo as
+                        # demais requisições durante a gravação e o fsync
+                        digest = hashlib.sha256()
+                        if resumed:
+                            await run_in_thread(update_hash_from_file, digest, part_path)
+                        f = await run_in_thread(open, part_path, 'ab' if resumed else 'wb')
+                        try:
+                            if not resumed:  # Parcial truncado: o validador passa a ser o desta resposta
+                                await run_in_thread(save_partial_validator, output_path, response.headers)
+                            async for chunk in response.content.iter_chunked(chunk_size):
+                                digest.update(chunk)
+                                await run_in_thread(f.write, chunk)
+                            await run_in_thread(self._sync_file, f)
+                        finally:
+                            await run_in_thread(f.close)
+                        response_headers = response.headers
+                        
+                if await run_in_thread(finalize_partial_file, output_path, expected_size):
+                    if metadata is not None:
+                        metadata.update({
+                            "size": await run_in_thread(os.path.getsize, output_path),
+                            "sha256": digest.hexdigest(),
+                            "etag": response_headers.get("ETag"),
+                            "last_modified": response_headers.get("Last-Modified"),
+                        })
+                    if self.cache is not None:
+                        await run_in_thread(self._store_download, url, output_path, response_headers)
+                    logger.info(f"Arquivo baixado com sucesso: {output_path}")
+                    return True
+                continue  # Incompleto: retoma a partir do arquivo parcial
+                
+            except asyncio.TimeoutError as e:
+                logger.warning(f"Timeout ao acessar {url}: {e}")
+            except aiohttp.ClientResponseError as e:
+                logger.warning(f"Erro HTTP {e.status} ao acessar {url}")
+                self._honor_retry_after(url, e)
+                if e.status == 416:
+                    # Intervalo recusado: descarta o arquivo parcial e recomeça do zero
+                    remove_partial_files(output_path)
+                    continue
+            except aiohttp.ClientError as e:
+                logger.warning(f"Erro ao acessar {url}: {e}")
+            except IOError as e:
+                logger.error(f"Erro ao salvar arquivo {output_path}: {e}")
+                remove_partial_files(output_path)
+                return False
+                
+            # O arquivo parcial é mantido para ser retomado na próxima tentativa
+            if attempt < self.retry_count:
+                delay = self.retry_delay * attempt
+                logger.debug(f"Aguardando {delay}s antes da próxima tentativa")
+                await asyncio.sleep(delay)
+                
+        logger.error(f"Falha após {self.retry_count} tentativas: {url}")
+        return False
+        
+    def _apply_cache(self, url: str, response: AsyncResponse, cached_entry: Optional[CacheEntry]) -> None:
+        """
+        Trata a resposta de uma requisição com cache: em 304 devolve o corpo armazenado;
+        em 200 guarda os novos validadores e corpo.
+        """
+        if response.status_code == 304 and cached_entry is not None:
+            logger.debug(f"Não modificado (304), usando corpo em cache: {url}")
+            response.content = cached_entry.body
+            response.not_modified = True
+            self.cache.touch(url, cache_control=response.headers.get("Cache-Control"))
+            return
+        self.cache.store(url, response.content,
+                         etag=response.headers.get("ETag"),
+                         last_modified=response.headers.get("Last-Modified"),
+                         content_type=response.headers.get("Content-Type"),
+                         cache_control=response.headers.get("Cache-Control"))
+
+    @staticmethod
+    def _response_from_cache(entry: CacheEntry) -> AsyncResponse:
+        """
+        Monta uma AsyncResponse (status 200) a partir de uma entrada do cache.
+        """
+        headers = {"Content-Type": entry.content_type or "text/html"}
+        if entry.etag:
+            headers["ETag"] = entry.etag
+        if entry.last_modified:
+            headers["Last-Modified"] = entry.last_modified
+        return AsyncResponse(url=entry.url, status_code=200, headers=headers, content=entry.body,
+                             not_modified=True, from_cache=True)
+
+    def _store_download(self, url: str, output_path: str, response_headers) -> None:
+        """
+        Guarda no cache o corpo de um download concluído (falhas só são registradas no log).
+        """
+        try:
+            self.cache.store_file(url, output_path,
+                                  etag=response_headers.get("ETag"),
+                                  last_modified=response_headers.get("Last-Modified"),
+                                  content_type=response_headers.get("Content-Type"),
+                                  cache_control=response_headers.get("Cache-Control"))
+        except OSError as e:
+            logger.warning(f"Não foi possível guardar {url} no cache HTTP: {e}")
+
+    @staticmethod
+    def _sync_file(f) -> None:
+        """
+        Descarrega o buffer e sincroniza o arquivo em disco (executado fora do event loop).
+        """
+        f.flush()
+        os.fsync(f.fileno())
+
+    def _honor_retry_after(self, url: str, error: "aiohttp.ClientResponseError") -> None:
+        """
+        Em respostas 429/503 com Retry-After, suspende o host no limitador compartilhado.
+        """
+        if error.status in THROTTLE_STATUS_CODES and error.headers:
+            retry_after = parse_retry_after(error.headers.get("Retry-After"))
+            if retry_after:
+                self.rate_limiter.pause(url, retry_after)
+
+    async def close(self):
+        """
+        Fecha a sessão HTTP e o pool de conexões.
+        """
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    async def __aenter__(self):
+        """
+        Suporte para uso com 'async with'.
+        """
+        await self._ensure_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """
+        Fecha a sessão ao sair do bloco 'async with'.
+        """
+        await self.close()
@@ -0,0 +1,312 @@
+"""
+Cache de respostas HTTP em disco: corpos comprimidos, revalidação condicional
+(ETag / Last-Modified), limite de tamanho com remoção LRU e modos de operação.
+"""
+import os
+import re
+import gzip
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from src.utils.url_utils import normalize_cache_key
+from src.utils.file_utils import get_partial_path, finalize_partial_file
+from src.config import HTTP_CACHE_DIR, HTTP_CACHE_MAX_BYTES, HTTP_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Modos de operação do cache
+CACHE_MODE_DEFAULT = "default"  # Serve do cache enquanto fresco; depois revalida
+CACHE_MODE_OFFLINE = "offline"  # Serve apenas do cache, nunca acessa a rede
+CACHE_MODE_REFRESH = "refresh"  # Sempre busca na rede e atualiza o cache
+CACHE_MODES = (CACHE_MODE_DEFAULT, CACHE_MODE_OFFLINE, CACHE_MODE_REFRESH)
+
+_MAX_AGE_PATTERN = re.compile(r"max-age\s*=\s*(\d+)", re.IGNORECASE)
+
+@dataclass
+class CacheEntry:
+    """
+    Resposta armazenada em cache, com seus validadores.
+    """
+    url: str
+    body: bytes
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_type: Optional[str] = None
+    stored_at: float = 0.0
+    expires_at: float = 0.0
+
+    @property
+    def is_fresh(self) -> bool:
+        """Indica se a entrada ainda está dentro do prazo de validade."""
+        return time.time() < self.expires_at
+
+class HttpCache:
+    """
+    Cache de conteúdo sob o HttpClient, indexado pela URL normalizada.
+
+    Os corpos ficam comprimidos (gzip) em arquivos dentro de cache_dir e os metadados
+    (validadores, tamanho, validade e último acesso) em um índice SQLite. Quando o
+    total ultrapassa max_bytes, as entradas acessadas há mais tempo são removidas.
+    """
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR,
+                 mode: str = CACHE_MODE_DEFAULT,
+                 max_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 default_ttl: float = HTTP_CACHE_TTL):
+        """
+        Abre (ou cria) o cache.
+
+        Args:
+            cache_dir: Diretório dos arquivos e do índice do cache
+            mode: Modo de operação (default, offline ou refresh)
+            max_bytes: Tamanho máximo (comprimido) do cache em bytes
+            default_ttl: Validade em segundos das respostas sem Cache-Control: max-age
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Modo de cache inválido: {mode} (use um de {CACHE_MODES})")
+
+        self.cache_dir = cache_dir
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+
+    @property
+    def offline(self) -> bool:
+        """Indica se o cache está em modo offline (sem acesso à rede)."""
+        return self.mode == CACHE_MODE_OFFLINE
+
+    @property
+    def refresh(self) -> bool:
+        """Indica se o cache está em modo refresh (sempre busca na rede)."""
+        return self.mode == CACHE_MODE_REFRESH
+
+    def total_size(self) -> int:
+        """Tamanho total (comprimido) das entradas em bytes."""
+        with self._lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        """
+        Obtém a resposta em cache para uma URL e atualiza seu último acesso.
+
+        Args:
+            url: URL da requisição
+
+        Returns:
+            Optional[CacheEntry]: Entrada em cache ou None se não houver
+        """
+        key = normalize_cache_key(url)
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT filename, etag, last_modified, content_type, stored_at, expires_at "
+                "FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+
+        filename, etag, last_modified, content_type, stored_at, expires_at = row
+        try:
+            with gzip.open(os.path.join(self.cache_dir, filename), 'rb') as f:
+                body = f.read()
+        except (OSError, EOFError) as e:
+            logger.warning(f"Entrada de cache ilegível para {url}: {e}")
+            self._delete(key)
+            return None
+
+        return CacheEntry(url=url, body=body, etag=etag, last_modified=last_modified,
+                          content_type=content_type, stored_at=stored_at, expires_at=expires_at)
+
+    def store(self, url: str, body: bytes, etag: Optional[str] = None,
+              last_modified: Optional[str] = None, content_type: Optional[str] = None,
+              cache_control: Optional[str] = None) -> None:
+        """
+        Armazena (ou substitui) a resposta de uma URL e aplica o limite de tamanho.
+
+        Args:
+            url: URL da requisição
+            body: Corpo da resposta
+            etag: Header ETag da resposta
+            last_modified: Header Last-Modified da resposta
+            content_type: Header Content-Type da resposta
+            cache_control: Header Cache-Control da resposta (define a validade)
+        """
+        if cache_control and "no-store" in cache_control.lower():
+            return
+
+        key = normalize_cache_key(url)
+        filename = hashlib.sha1(key.encode("utf-8")).hexdigest() + ".gz"
+        file_path = os.path.join(self.cache_dir, filename)
+        compressed = gzip.compress(body)
+
+        # Escrita atômica do corpo comprimido
+        temp_path = f"{file_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(temp_path, file_path)
+
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO entries (key, url, filename, size, etag, last_modified, content_type,
+                                     stored_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (key) DO UPDATE SET
+                    url = excluded.url,
+                    filename = excluded.filename,
+                    size = excluded.size,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    content_type = excluded.content_type,
+                    stored_at = excluded.stored_at,
+                    expires_at = excluded.expires_at,
+                    last_access = excluded.last_access
+            """, (key, url, filename, len(compressed), etag, last_modified, content_type,
+                  now, now + self._freshness_lifetime(cache_control), now))
+
+        self._evict()
+
+    def store_file(self, url: str, file_path: str, etag: Optional[str] = None,
+                   last_modified: Optional[str] = None, content_type: Optional[str] = None,
+                   cache_control: Optional[str] = None) -> None:
+        """
+        Armazena o conteúdo de um arquivo baixado como resposta de uma URL, para que o
+        download possa ser repetido sem rede (modo offline).
+
+        Args:
+            url: URL do arquivo
+            file_path: Caminho do arquivo já baixado
+            etag: Header ETag da resposta
+            last_modified: Header Last-Modified da resposta
+            content_type: Header Content-Type da resposta
+            cache_control: Header Cache-Control da resposta (define a validade)
+        """
+        with open(file_path, 'rb') as f:
+            body = f.read()
+        self.store(url, body, etag=etag, last_modified=last_modified,
+                   content_type=content_type, cache_control=cache_control)
+
+    def restore_file(self, url: str, output_path: str, fresh_only: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Grava em output_path o corpo em cache de uma URL (arquivo parcial + fsync + rename
+        atômico, como um download).
+
+        Args:
+            url: URL do arquivo
+            output_path: Caminho local onde o arquivo será salvo
+            fresh_only: Se True, só usa entradas ainda dentro da validade
+
+        Returns:
+            Optional[Dict[str, Any]]: 'size', 'sha256', 'etag' e 'last_modified' do arquivo
+                                      gravado, ou None se não houver entrada utilizável
+        """
+        entry = self.get(url)
+        if entry is None or (fresh_only and not entry.is_fresh):
+            return None
+
+        with open(get_partial_path(output_path), 'wb') as f:
+            f.write(entry.body)
+            f.flush()
+            os.fsync(f.fileno())
+        finalize_partial_file(output_path, len(entry.body))
+        return {
+            "size": len(entry.body),
+            "sha256": hashlib.sha256(entry.body).hexdigest(),
+            "etag": entry.etag,
+            "last_modified": entry.last_modified,
+        }
+
+    def touch(self, url: str, cache_control: Optional[str] = None) -> None:
+        """
+        Renova a validade de uma entrada após uma revalidação bem-sucedida (HTTP 304).
+
+        Args:
+            url: URL da requisição
+            cache_control: Header Cache-Control da resposta 304
+        """
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE entries SET expires_at = ?, last_access = ? WHERE key = ?",
+                              (now + self._freshness_lifetime(cache_control), now, normalize_cache_key(url)))
+
+    def _freshness_lifetime(self, cache_control: Optional[str]) -> float:
+        """
+        Calcula a validade de uma resposta: max-age do Cache-Control ou o TTL padrão.
+        """
+        if cache_control:
+            if "no-cache" in cache_control.lower():
+                return 0.0
+            match = _MAX_AGE_PATTERN.search(cache_control)
+            if match:
+                return float(match.group(1))
+        return float(self.default_ttl)
+
+    def _evict(self) -> None:
+        """
+        Remove as entradas menos usadas recentemente até respeitar max_bytes.
+        """
+        if self.max_bytes is None or self.max_bytes <= 0:
+            return
+
+        with self._lock:
+            total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            rows = self.conn.execute("SELECT key, filename, size FROM entries ORDER BY last_access").fetchall()
+
+        evicted = 0
+        for key, filename, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._delete(key, filename)
+            total -= size
+            evicted += 1
+        logger.debug(f"Cache HTTP: {evicted} entradas removidas (LRU), total {total} bytes")
+
+    def _delete(self, key: str, filename: Optional[str] = None) -> None:
+        """
+        Remove uma entrada do índice e seu arquivo.
+        """
+        with self._lock, self.conn:
+            if filename is None:
+                row = self.conn.execute("SELECT filename FROM entries WHERE key = ?", (key,)).fetchone()
+                filename = row[0] if row else None
+            self.conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+        if filename:
+            try:
+                os.remove(os.path.join(self.cache_dir, filename))
+            except OSError:
+                pass
+
+    def close(self):
+        """
+        Fecha a conexão com o índice.
+        """
+        with self._lock:
+            self.conn.close()
@@ -3,10 +3,20 @@ Cliente HTTP com tratamento de erros e retentativas.
 """
 import os
 import time
+import hashlib
 import logging
-from typing import Dict, Optional, Union, Any
+from contextlib import nullcontext
+from typing import Dict, Optional, Tuple, Union, Any
 import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
 from requests.exceptions import RequestException, Timeout, ConnectionError
+from src.services.http_cache import HttpCache, CacheEntry
+from src.utils.file_utils import (get_partial_path, get_partial_size, parse_content_range,
+                                  expected_download_size, finalize_partial_file, update_hash_from_file,
+                                  get_partial_validator, save_partial_validator, remove_partial_files)
+from src.utils.rate_limiter import (HostRateLimiter, AdaptiveConcurrencyLimiter, THROTTLE_STATUS_CODES,
+                                    OVERLOAD_STATUS_CODES, get_shared_rate_limiter, get_shared_concurrency_limiter, parse_retry_after)
 from src.config import REQUEST_TIMEOUT, RETRY_COUNT, RETRY_DELAY, USER_AGENT
 
 logger = logging.getLogger(__name__)
@@ -19,7 +29,11 @@ class HttpClient:
     def __init__(self, 
                 timeout: int = REQUEST_TIMEOUT, 
                 retry_count: int = RETRY_COUNT, 
-                retry_delay: int = RETRY_DELAY):
+                retry_delay: int = RETRY_DELAY,
+                rate_limiter: Optional[HostRateLimiter] = None,
+                pool_size: int = 10,
+                cache: Optional[HttpCache] = None,
+                concurrency_limiter: Optional[AdaptiveConcurrencyLimiter] = None):
         """
         Inicializa o cliente HTTP.
         
@@ -27,10 +41,26 @@ class HttpClient:
             timeout: Tempo limite para requisições em segundos
             retry_count: Número de tentativas em caso de falha
             retry_delay: Tempo de espera entre tentativas em segundos
+            rate_limiter: Limitador de taxa por host (padrão: o limitador compartilhado do processo)
+            pool_size: Número máximo de conexões mantidas por host na sessão
+            cache: Cache de respostas opcional para requisições GET sem stream e para os
+                   downloads de arquivos. Conforme o modo do cache, serve respostas frescas sem
+                   acessar a rede, revalida com If-None-Match/If-Modified-Since ou opera
+                   totalmente offline
+            concurrency_limiter: Limite adaptativo (AIMD) de requisições simultâneas para todos os
+                                 hosts (padrão: o limitador compartilhado do host de cada requisição)
         """
         self.timeout = timeout
         self.retry_count = retry_count
         self.retry_delay = retry_delay
+        self.cache = cache
+        
+        # Token bucket por host, compartilhado por todos os clientes (scraper e downloads)
+        self.rate_limiter = rate_limiter if rate_limiter else get_shared_rate_limiter()
+        
+        # Requisições simultâneas ajustadas pela latência e pelos sinais de sobrecarga do servidor
+        # (por padrão, um limitador por host compartilhado por todos os clientes)
+        self.concurrency_limiter = concurrency_limiter
         
         # Headers padrão para requisições
         self.default_headers = {
@@ -43,13 +73,17 @@ class HttpClient:
             "Cache-Control": "no-cache",
         }
         
-        # Sessão para reutilização de conexões
+        # Sessão para reutilização de conexões (pool dimensionado para uso concorrente)
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
         
     def get(self, url: str, 
            headers: Optional[Dict[str, str]] = None, 
            params: Optional[Dict[str, str]] = None,
-           stream: bool = False) -> Optional[requests.Response]:
+           stream: bool = False,
+           accept_status: Tuple[int, ...] = ()) -> Optional[requests.Response]:
         """
         Realiza uma requisição GET com tratamento de erros e retentativas.
         
@@ -57,37 +91,88 @@ class HttpClient:
             url: URL para a requisição
             headers: Headers adicionais para a requisição
             params: Parâmetros para a URL
-            stream: Se True, o conteúdo será baixado sob demanda
+            stream: Se True, o conteúdo será baixado sob demanda. A vaga do limite de concorrência
+                    e a latência ficam a cargo do chamador, que lê o corpo (ver download_file)
+            accept_status: Códigos de erro devolvidos ao chamador sem retentativa (ex.: 416)
             
         Returns:
-            Response: Objeto de resposta ou None em caso de falha
+            Response: Objeto de resposta ou None em caso de falha. Com cache habilitado,
+                      o atributo 'not_modified' indica que o corpo é o mesmo já armazenado
+                      (servido do cache ou confirmado por HTTP 304)
         """
         # Combina os headers padrão com os headers adicionais
         request_headers = {**self.default_headers}
         if headers:
             request_headers.update(headers)
             
+        # Modo offline: nenhuma requisição chega à rede
+        if self.cache is not None and self.cache.offline:
+            cached_entry = self.cache.get(url) if not stream and not params else None
+            if cached_entry is None:
+                logger.warning(f"Cache offline: resposta não disponível para {url}")
+                return None
+            return self._response_from_cache(cached_entry)
+            
+        # Cache: serve respostas frescas; senão envia os validadores da última resposta
+        cached_entry = None
+        use_cache = self.cache is not None and not stream and not params
+        if use_cache and not self.cache.refresh:
+            cached_entry = self.cache.get(url)
+            if cached_entry is not None and cached_entry.is_fresh:
+                logger.debug(f"Resposta fresca servida do cache: {url}")
+                return self._response_from_cache(cached_entry)
+            if cached_entry is not None:
+                request_headers.pop("Pragma", None)
+                request_headers.pop("Cache-Control", None)
+                if cached_entry.etag:
+                    request_headers["If-None-Match"] = cached_entry.etag
+                if cached_entry.last_modified:
+                    request_headers["If-Modified-Since"] = cached_entry.last_modified
+            
+        concurrency_limiter = self.concurrency_limiter or get_shared_concurrency_limiter(url)
         for attempt in range(1, self.retry_count + 1):
+            retry_after = None
             try:
                 logger.debug(f"GET {url} (tentativa {attempt}/{self.retry_count})")
+                self.rate_limiter.acquire(url)
+                
+                with concurrency_limiter.slot() if not stream else nullcontext():
+                    started = time.monotonic()
+                    response = self.session.get(
+                        url,
+                        headers=request_headers,
+                        params=params,
+                        timeout=self.timeout,
+                        stream=stream
+                    )
+                    latency = time.monotonic() - started
                 
-                response = self.session.get(
-                    url,
-                    headers=request_headers,
-                    params=params,
-                    timeout=self.timeout,
-                    stream=stream
-                )
+                # Sinais de sobrecarga reduzem a concorrência; Retry-After suspende o host.
+                # Só respostas 2xx/3xx contam como saudáveis (aumento aditivo)
+                if response.status_code in THROTTLE_STATUS_CODES + OVERLOAD_STATUS_CODES:
+                    concurrency_limiter.record_throttle(f"HTTP {response.status_code}")
+                    retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                    if retry_after:
+                        self.rate_limiter.pause(url, retry_after)
+                elif response.status_code < 400 and not stream:
+                    concurrency_limiter.record_success(latency)
                 
                 # Verifica se a resposta foi bem-sucedida
+                if response.status_code in accept_status:
+                    return response
                 response.raise_for_status()
                 
+                if use_cache:
+                    self._apply_cache(url, response, cached_entry)
+                
                 return response
                 
             except Timeout as e:
                 logger.warning(f"Timeout ao acessar {url}: {e}")
+                concurrency_limiter.record_throttle("timeout")
             except ConnectionError as e:
                 logger.warning(f"Erro de conexão ao acessar {url}: {e}")
+                concurrency_limiter.record_throttle("erro de conexão")
             except RequestException as e:
                 # Captura códigos de status HTTP de erro
                 if hasattr(e, 'response') and e.response is not None:
@@ -97,7 +182,8 @@ class HttpClient:
                     logger.warning(f"Erro ao acessar {url}: {e}")
             
             # Se não for a última tentativa, aguarda antes de tentar novamente
-            if attempt < self.retry_count:
+            # (com Retry-After, a espera já é imposta pelo limitador do host)
+            if attempt < self.retry_count and not retry_after:
                 delay = self.retry_delay * attempt  # Aumento gradual do tempo de espera
                 logger.debug(f"Aguardando {delay}s antes da próxima tentativa")
                 time.sleep(delay)
@@ -105,49 +191,213 @@ class HttpClient:
         logger.error(f"Falha após {self.retry_count} tentativas: {url}")
         return None
         
+    def _apply_cache(self, url: str, response: requests.Response, cached_entry) -> None:
+        """
+        Trata a resposta de uma requisição com cache: em 304 devolve o corpo armazenado;
+        em 200 guarda os novos validadores e corpo.
+        
+        Args:
+            url: URL da requisição
+            response: Resposta recebida
+            cached_entry: Entrada em cache usada na requisição (ou None)
+        """
+        if response.status_code == 304 and cached_entry is not None:
+            logger.debug(f"Não modificado (304), usando corpo em cache: {url}")
+            response._content = cached_entry.body
+            response.not_modified = True
+            self.cache.touch(url, cache_control=response.headers.get("Cache-Control"))
+            return
+            
+        response.not_modified = False
+        self.cache.store(url, response.content,
+                         etag=response.headers.get("ETag"),
+                         last_modified=response.headers.get("Last-Modified"),
+                         content_type=response.headers.get("Content-Type"),
+                         cache_control=response.headers.get("Cache-Control"))
+        
+    @staticmethod
+    def _response_from_cache(entry: CacheEntry) -> requests.Response:
+        """
+        Monta um requests.Response a partir de uma entrada do cache.
+        
+        Args:
+            entry: Entrada do cache
+            
+        Returns:
+            Response: Resposta com status 200 e o corpo armazenado
+        """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = entry.url
+        response._content = entry.body
+        response.headers = CaseInsensitiveDict({"Content-Type": entry.content_type or "text/html"})
+        if entry.etag:
+            response.headers["ETag"] = entry.etag
+        if entry.last_modified:
+            response.headers["Last-Modified"] = entry.last_modified
+        response.not_modified = True
+        response.from_cache = True
+        return response
+        
     def download_file(self, url: str, 
                      output_path: str,
                      chunk_size: int = 8192,
-                     headers: Optional[Dict[str, str]] = None) -> bool:
+                     headers: Optional[Dict[str, str]] = None,
+                     metadata: Optional[Dict[str, Any]] = None) -> bool:
         """
         Baixa um arquivo de uma URL para um caminho local.
         
+        O conteúdo é gravado em '<output_path>.part' e só é renomeado (atomicamente) para
+        o caminho final depois do fsync e da conferência do tamanho com o Content-Length.
+        Um arquivo parcial existente é retomado com uma requisição Range condicionada (If-Range)
+        ao validador gravado ao lado dele: se o arquivo mudou no servidor, a resposta é o arquivo
+        novo inteiro, nunca um trecho dele emendado aos bytes antigos. O SHA-256 do conteúdo é
+        calculado durante o streaming (sem releitura do arquivo final). A vaga do limite adaptativo
+        de concorrência fica ocupada até o corpo ser lido, e a latência registrada é a da transferência.
+        
+        Com cache, o corpo baixado também é armazenado: no modo offline o arquivo é
+        gravado a partir do cache (sem rede) e no modo padrão uma entrada fresca evita o download.
+        
         Args:
             url: URL do arquivo
             output_path: Caminho local onde o arquivo será salvo
             chunk_size: Tamanho dos chunks para download
             headers: Headers adicionais para a requisição
+            metadata: Dicionário opcional preenchido com 'size', 'sha256', 'etag' e 'last_modified'
             
         Returns:
             bool: True se o download for bem-sucedido, False caso contrário
         """
-        response = self.get(url, headers=headers, stream=True)
+        part_path = get_partial_path(output_path)
+        
+        # Cache: offline só grava a partir do cache; no modo padrão, entradas frescas dispensam a rede
+        if self.cache is not None and not self.cache.refresh:
+            try:
+                cached = self.cache.restore_file(url, output_path, fresh_only=not self.cache.offline)
+            except OSError as e:
+                logger.error(f"Erro ao gravar arquivo {output_path} a partir do cache: {e}")
+                return False
+            if cached is not None:
+                if metadata is not None:
+                    metadata.update(cached)
+                logger.info(f"Arquivo gravado a partir do cache HTTP: {output_path}")
+                return True
+            if self.cache.offline:
+                logger.warning(f"Cache offline: arquivo não disponível para {url}")
+                return False
         
-        if response is None:
-            return False
+        concurrency_limiter = self.concurrency_limiter or get_shared_concurrency_limiter(url)
+        for attempt in range(1, self.retry_count + 1):
+            offset = get_partial_size(output_path)
+            validator = get_partial_validator(output_path) if offset else None
+            if offset and not validator:
+                # Sem validador não há como garantir que o parcial é do mesmo arquivo
+                logger.info(f"Arquivo parcial sem validador, recomeçando do zero: {part_path}")
+                remove_partial_files(output_path)
+                offset = 0
+            request_headers = dict(headers or {})
+            if offset:
+                logger.info(f"Retomando download de {url} a partir do byte {offset}")
+                request_headers["Range"] = f"bytes={offset}-"
+                request_headers["If-Range"] = validator
+                
+            # A vaga do limite de concorrência cobre a requisição e a leitura do corpo, e a latência
+            # registrada é a da transferência inteira
+            with concurrency_limiter.slot():
+                started = time.monotonic()
+                # O get já fez as suas retentativas: falha de rede encerra o download (o parcial
+                # é mantido para a próxima execução)
+                response = self.get(url, headers=request_headers, stream=True, accept_status=(416,))
+                if response is None:
+                    return False
+                
+                # Intervalo recusado (416) ou 206 que não começa no offset pedido: descarta o parcial
+                resumed = response.status_code == 206
+                if response.status_code == 416 or (resumed and (
+                        not offset or parse_content_range(response.headers.get("Content-Range"))[0] != offset)):
+                    logger.warning(f"Retomada recusada para {url} (HTTP {response.status_code}, "
+                                   f"Content-Range {response.headers.get('Content-Range')}). Recomeçando do zero.")
+                    response.close()
+                    remove_partial_files(output_path)
+                    continue
+                
+                # 206: tamanho total do Content-Range; 200 (arquivo inteiro, inclusive quando o
+                # If-Range não confere): Content-Length
+                expected_size = expected_download_size(response.status_code, response.headers)
             
-        try:
-            with open(output_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:  # Filtra keep-alive chunks
-                        f.write(chunk)
+                try:
+                    # Na retomada, o hash começa pelos bytes já gravados
+                    digest = hashlib.sha256()
+                    if resumed:
+                        update_hash_from_file(digest, part_path)
+                    with open(part_path, 'ab' if resumed else 'wb') as f:
+                        if not resumed:  # Parcial truncado: o validador passa a ser o desta resposta
+                            save_partial_validator(output_path, response.headers)
+                        for chunk in response.iter_content(chunk_size=chunk_size):
+                            if chunk:  # Filtra keep-alive chunks
+                                f.write(chunk)
+                                digest.update(chunk)
+                        f.flush()
+                        os.fsync(f.fileno())
+                except RequestException as e:
+                    # Conexão interrompida: o arquivo parcial é mantido e retomado na próxima tentativa
+                    logger.warning(f"Download interrompido ({url}): {e}")
+                    concurrency_limiter.record_throttle("download interrompido")
+                    continue
+                except IOError as e:
+                    logger.error(f"Erro ao salvar arquivo {output_path}: {e}")
+                    # Remove o arquivo parcialmente baixado
+                    remove_partial_files(output_path)
+                    return False
+                finally:
+                    response.close()
+                concurrency_limiter.record_success(time.monotonic() - started)
+                
+            try:
+                if not finalize_partial_file(output_path, expected_size):
+                    continue
+            except OSError as e:
+                logger.error(f"Erro ao concluir arquivo {output_path}: {e}")
+                return False
+            
+            if metadata is not None:
+                metadata.update({
+                    "size": os.path.getsize(output_path),
+                    "sha256": digest.hexdigest(),
+                    "etag": response.headers.get("ETag"),
+                    "last_modified": response.headers.get("Last-Modified"),
+                })
+            if self.cache is not None:
+                self._store_download(url, output_path, response.headers)
             
             logger.info(f"Arquivo baixado com sucesso: {output_path}")
             return True
             
-        except IOError as e:
-            logger.error(f"Erro ao salvar arquivo {output_path}: {e}")
-            # Tenta remover o arquivo parcialmente baixado
-            try:
-                if os.path.exists(output_path):
-                    os.remove(output_path)
-            except IOError:
-                pass
-            return False
+        logger.error(f"Download não concluído após {self.retry_count} tentativas: {url}")
+        return False
+        
+    def _store_download(self, url: str, output_path: str, response_headers) -> None:
+        """
+        Guarda no cache o corpo de um download concluído (falhas só são registradas no log).
+        
+        Args:
+            url: URL do arquivo
+            output_path: Caminho do arquivo baixado
+            response_headers: Headers da resposta do download
+        """
+        try:
+            self.cache.store_file(url, output_path,
+                                  etag=response_headers.get("ETag"),
+                                  last_modified=response_headers.get("Last-Modified"),
+                                  content_type=response_headers.get("Content-Type"),
+                                  cache_control=response_headers.get("Cache-Control"))
+        except OSError as e:
+            logger.warning(f"Não foi possível guardar {url} no cache HTTP: {e}")
             
     def close(self):
         """
-        Fecha a sessão HTTP.
+        Fecha a sessão HTTP. O cache informado no construtor pertence a quem o criou (pode
+        estar compartilhado com outros clientes) e não é fechado aqui.
         """
         self.session.close()
         
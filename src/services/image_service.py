@@ -2,40 +2,65 @@
 Serviço para manipulação de imagens.
 """
 import os
+import re
+import asyncio
 import logging
-from typing import Set, List, Optional, Dict
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Set, List, Optional, Dict
 from datetime import datetime
 from src.models.image import Image
 from src.services.http_client import HttpClient
-from src.utils.file_utils import file_exists, ensure_directory_exists
+from src.services.async_http_client import AsyncHttpClient
+from src.services.manifest import DownloadManifest, BASE_FOLDER_KEY
+from src.utils.file_utils import file_exists, ensure_directory_exists, compute_file_hash
+from src.utils.async_utils import run_in_thread
 from src.utils.url_utils import get_url_extension
-from src.config import DATE_FORMAT_FOLDER, IMAGE_EXTENSIONS, OUTPUT_DIR, ORGANIZE_BY_MONTH
+from src.config import DATE_FORMAT_FOLDER, IMAGE_EXTENSIONS, OUTPUT_DIR, ORGANIZE_BY_MONTH, DOWNLOAD_WORKERS
 
 logger = logging.getLogger(__name__)
 
+# Padrão "ppi-DD-MM-YYYY" usado nos slugs dos posts
+PPI_DATE_PATTERN = re.compile(r"ppi-(\d{2})-(\d{2})-(\d{4})")
+
 class ImageService:
     """
     Serviço para gerenciar o download e armazenamento de imagens.
     """
     
-    def __init__(self, output_dir: str = OUTPUT_DIR):
+    def __init__(self, output_dir: str = OUTPUT_DIR, manifest: Optional[DownloadManifest] = None,
+                 http_client: Optional[HttpClient] = None, download_workers: int = DOWNLOAD_WORKERS,
+                 on_image_saved: Optional[Callable[[Image], None]] = None):
         """
         Inicializa o serviço de imagens.
         
         Args:
             output_dir: Diretório onde as imagens serão salvas
+            manifest: Manifesto de downloads opcional (padrão: MANIFEST_FILE)
+            http_client: Cliente HTTP opcional para os downloads
+            download_workers: Número de imagens baixadas em paralelo (1 = sequencial)
+            on_image_saved: Chamado (na thread do download) para cada imagem nova salva; pode
+                bloquear para aplicar contrapressão (ex.: fila limitada do pipeline de OCR)
         """
         self.output_dir = output_dir
+        self.on_image_saved = on_image_saved
         ensure_directory_exists(output_dir)
+        self.download_workers = max(1, download_workers)
         self.downloaded_urls: Set[str] = set()
-        self.http_client = HttpClient()
+        self.http_client = http_client if http_client else HttpClient(pool_size=max(10, self.download_workers))
+        
+        # URLs e caminhos com download em andamento (evita baixar duas vezes o mesmo
+        # arquivo quando duas threads recebem imagens equivalentes)
+        self._claim_lock = threading.Lock()
+        self._in_progress: Set[str] = set()
         
         # Dicionário para mapear URLs de posts com as datas extraídas
         self.post_dates: Dict[str, str] = {}
         
-        # Conjunto para rastrear imagens já verificadas em cada pasta mensal
-        self.checked_monthly_folders: Set[str] = set()
-        self.existing_images_by_month: Dict[str, Set[str]] = {}
+        # Manifesto persistente das imagens já baixadas (substitui a varredura das pastas)
+        self._owns_manifest = manifest is None
+        self.manifest = manifest if manifest else DownloadManifest()
+        self._index_ready = False
 
 
     def extract_date_from_url(self, url: str) -> Optional[tuple]:
@@ -49,15 +74,30 @@ class ImageService:
             Optional[tuple]: Tupla (dia, mês, ano) ou None se não encontrar
         """
         # Procura pelo padrão "ppi-DD-MM-YYYY" na URL
-        import re
-        pattern = r"ppi-(\d{2})-(\d{2})-(\d{4})"
-        match = re.search(pattern, url)
+        match = PPI_DATE_PATTERN.search(url)
         
         if match:
             day, month, year = match.groups()
             return (day, month, year)
             
         return None
+        
+    def get_date_parts(self, url: str) -> Optional[tuple]:
+        """
+        Obtém a data de uma URL de post, extraindo-a apenas na primeira consulta.
+        
+        Args:
+            url: URL do post
+            
+        Returns:
+            Optional[tuple]: Tupla (dia, mês, ano) ou None se não encontrar
+        """
+        if url in self.post_dates:
+            return self.post_dates[url]
+        date_parts = self.extract_date_from_url(url)
+        if date_parts:
+            self.post_dates[url] = date_parts
+        return date_parts
 
     def get_image_path(self, image: Image) -> str:
         """
@@ -75,17 +115,12 @@ class ImageService:
         filename = None
         monthly_path = None
         
-        # Tenta encontrar o padrão "ppi-DD-MM-YYYY" na URL
-        import re
-        pattern = r"ppi-(\d{2})-(\d{2})-(\d{4})"
-        match = re.search(pattern, source_url)
+        # Tenta encontrar o padrão "ppi-DD-MM-YYYY" na URL (guardado para referência futura)
+        date_parts = self.get_date_parts(source_url)
         
-        if match:
+        if date_parts:
             # Se encontrou o padrão, usa-o para o nome do arquivo e pasta mensal
-            day, month, year = match.groups()
-            
-            # Guarda a data para referência futura
-            self.post_dates[source_url] = (day, month, year)
+            day, month, year = date_parts
             
             # Define a pasta mensal (MM-YYYY) se a organização por mês estiver ativada
             if ORGANIZE_BY_MONTH:
@@ -148,61 +183,31 @@ class ImageService:
     
     def pre_check_monthly_images(self) -> None:
         """
-        Pré-verifica todas as imagens existentes em pastas mensais ou no diretório base,
-        dependendo da configuração.
-        Esta função indexa as imagens existentes para acelerar as verificações futuras.
+        Prepara o índice de imagens existentes a partir do manifesto persistente.
+        Só percorre o disco quando o manifesto ainda está vazio (primeira execução);
+        chamadas seguintes não fazem nada.
         """
-        if ORGANIZE_BY_MONTH:
-            logger.info("Indexando imagens existentes por mês...")
+        if self._index_ready:
+            return
             
-            # Lista todas as subpastas no diretório de saída
-            try:
-                monthly_folders = [f for f in os.listdir(self.output_dir) 
-                                if os.path.isdir(os.path.join(self.output_dir, f))]
-            except Exception as e:
-                logger.error(f"Erro ao listar pastas mensais: {e}")
-                return
-                
-            # Para cada pasta, indexa os arquivos
-            for folder in monthly_folders:
-                folder_path = os.path.join(self.output_dir, folder)
-                
-                # Registra a pasta como verificada
-                self.checked_monthly_folders.add(folder)
-                
-                # Inicializa o conjunto para esta pasta
-                self.existing_images_by_month[folder] = set()
-                
-                try:
-                    # Lista todas as imagens na pasta
-                    files = [f for f in os.listdir(folder_path) 
-                          if os.path.isfile(os.path.join(folder_path, f))]
-                    
-                    # Adiciona ao conjunto para esta pasta
-                    for file in files:
-                        self.existing_images_by_month[folder].add(file)
-                        
-                    logger.debug(f"Indexados {len(files)} arquivos na pasta {folder}")
-                except Exception as e:
-                    logger.error(f"Erro ao indexar arquivos na pasta {folder}: {e}")
-                    
-            logger.info(f"Indexação concluída. {len(monthly_folders)} pastas mensais verificadas.")
+        if len(self.manifest) == 0:
+            logger.info("Manifesto vazio. Indexando imagens existentes no disco (apenas uma vez)...")
+            self.manifest.rebuild_from_disk(self.output_dir, ORGANIZE_BY_MONTH)
         else:
-            # Se não estiver organizando por mês, indexa os arquivos no diretório base
-            logger.info("Indexando imagens existentes no diretório base...")
+            logger.info(f"Manifesto carregado: {len(self.manifest)} imagens registradas.")
             
-            try:
-                # Lista todos os arquivos no diretório base
-                files = [f for f in os.listdir(self.output_dir) 
-                      if os.path.isfile(os.path.join(self.output_dir, f))]
-                
-                # Cria um registro especial para o diretório base
-                self.existing_images_by_month["base"] = set(files)
-                
-                logger.info(f"Indexação concluída. {len(files)} arquivos indexados no diretório base.")
-            except Exception as e:
-                logger.error(f"Erro ao indexar arquivos no diretório base: {e}")
-                return
+        self._index_ready = True
+        
+    def rebuild_manifest(self) -> int:
+        """
+        Regenera o manifesto a partir dos arquivos em disco.
+        
+        Returns:
+            int: Número de imagens registradas
+        """
+        count = self.manifest.rebuild_from_disk(self.output_dir, ORGANIZE_BY_MONTH)
+        self._index_ready = True
+        return count
 
     def get_monthly_folder(self, url: str) -> str:
         """
@@ -218,22 +223,16 @@ class ImageService:
         if not ORGANIZE_BY_MONTH:
             return self.output_dir
             
-        # Verifica se já extraímos a data desta URL antes
-        if url in self.post_dates:
-            day, month, year = self.post_dates[url]
+        # Extrai a data da URL (ou reutiliza a já extraída)
+        date_parts = self.get_date_parts(url)
+        
+        if date_parts:
+            day, month, year = date_parts
             monthly_folder = f"{month}-{year}"
         else:
-            # Tenta extrair a data da URL
-            date_parts = self.extract_date_from_url(url)
-            
-            if date_parts:
-                day, month, year = date_parts
-                self.post_dates[url] = (day, month, year)
-                monthly_folder = f"{month}-{year}"
-            else:
-                # Se não conseguir extrair a data, usa o mês atual
-                today = datetime.now()
-                monthly_folder = today.strftime(DATE_FORMAT_FOLDER)
+            # Se não conseguir extrair a data, usa o mês atual
+            today = datetime.now()
+            monthly_folder = today.strftime(DATE_FORMAT_FOLDER)
         
         # Caminho completo da pasta mensal
         monthly_path = os.path.join(self.output_dir, monthly_folder)
@@ -243,7 +242,7 @@ class ImageService:
     
     def is_already_downloaded(self, image: Image) -> bool:
         """
-        Verifica se uma imagem já foi baixada, consultando as pastas mensais.
+        Verifica se uma imagem já foi baixada, consultando o manifesto (sem acessar o disco).
         
         Args:
             image: Objeto de imagem
@@ -255,142 +254,266 @@ class ImageService:
         if image.url in self.downloaded_urls:
             return True
             
+        self.pre_check_monthly_images()
+        
+        # Post com imagem já registrada
+        if image.source_url and self.manifest.has_post(image.source_url):
+            return True
+            
         # Extrai a data da URL da origem
-        date_parts = self.extract_date_from_url(image.source_url)
+        date_parts = self.get_date_parts(image.source_url)
         
         if date_parts:
             day, month, year = date_parts
+            folder = f"{month}-{year}" if ORGANIZE_BY_MONTH else BASE_FOLDER_KEY
             
-            if ORGANIZE_BY_MONTH:
-                monthly_folder = f"{month}-{year}"
-                
-                # Verifica se já indexamos esta pasta
-                if monthly_folder not in self.checked_monthly_folders:
-                    self.check_monthly_folder(monthly_folder)
-                    
-                # Gera o nome do arquivo esperado
-                expected_filename = f"ppi-{day}-{month}-{year}{image.file_extension}"
-                
-                # Verifica se o arquivo existe no índice
-                return expected_filename in self.existing_images_by_month.get(monthly_folder, set())
-            else:
-                # Se não estiver usando organização mensal, verifica diretamente no diretório base
-                expected_filename = f"ppi-{day}-{month}-{year}{image.file_extension}"
-                expected_path = os.path.join(self.output_dir, expected_filename)
-                return file_exists(expected_path)
+            # Gera o nome do arquivo esperado e consulta o manifesto
+            expected_filename = f"ppi-{day}-{month}-{year}{image.file_extension}"
+            return self.manifest.contains(folder, expected_filename)
         
         # Se não conseguiu extrair a data, assume que não foi baixada
         return False
-    
-    def check_monthly_folder(self, month_year: str) -> None:
+
+    def download_image(self, image: Image) -> bool:
         """
-        Verifica os arquivos em uma pasta mensal específica.
+        Baixa uma imagem para o disco na pasta mensal apropriada ou no diretório base.
         
         Args:
-            month_year: Pasta mensal no formato "MM-YYYY"
+            image: Objeto de imagem
+            
+        Returns:
+            bool: True se o download for bem-sucedido, False caso contrário
         """
-        # Se já verificamos esta pasta, não precisa verificar novamente
-        if month_year in self.checked_monthly_folders:
-            return
+        output_path = self._prepare_download(image)
+        if output_path is None:
+            return False
             
-        # Marca a pasta como verificada
-        self.checked_monthly_folders.add(month_year)
+        # Realiza o download
+        try:
+            metadata: Dict[str, Any] = {}
+            download_success = self.http_client.download_file(image.url, output_path, metadata=metadata)
+            return self._finish_download(image, output_path, download_success, metadata)
+        finally:
+            self._release(image, output_path)
         
-        # Se a organização por mês estiver desativada, verifica o diretório base
-        if not ORGANIZE_BY_MONTH:
-            folder_path = self.output_dir
-        else:
-            # Caminho da pasta mensal
-            folder_path = os.path.join(self.output_dir, month_year)
+    async def download_image_async(self, image: Image, http_client: AsyncHttpClient) -> bool:
+        """
+        Versão assíncrona de download_image, usando um AsyncHttpClient.
         
-        # Verifica se a pasta existe
-        if not os.path.exists(folder_path):
-            # Se não existe e estamos organizando por mês, cria a pasta
-            if ORGANIZE_BY_MONTH:
-                ensure_directory_exists(folder_path)
-            self.existing_images_by_month[month_year] = set()
-            return
+        Args:
+            image: Objeto de imagem
+            http_client: Cliente HTTP assíncrono
             
-        # Inicializa o conjunto para esta pasta
-        self.existing_images_by_month[month_year] = set()
-        
-        try:
-            # Lista todas as imagens na pasta
-            files = [f for f in os.listdir(folder_path) 
-                   if os.path.isfile(os.path.join(folder_path, f))]
+        Returns:
+            bool: True se o download for bem-sucedido, False caso contrário
+        """
+        output_path = self._prepare_download(image)
+        if output_path is None:
+            return False
             
-            # Adiciona ao conjunto para esta pasta
-            for file in files:
-                self.existing_images_by_month[month_year].add(file)
-                
-            logger.debug(f"Indexados {len(files)} arquivos na pasta/diretório {month_year}")
-        except Exception as e:
-            logger.error(f"Erro ao indexar arquivos na pasta/diretório {month_year}: {e}")
-
-    def download_image(self, image: Image) -> bool:
+        try:
+            metadata: Dict[str, Any] = {}
+            download_success = await http_client.download_file(image.url, output_path, metadata=metadata)
+            # Hash, manifesto e on_image_saved (que pode bloquear na fila do pipeline) fora do event loop
+            return await run_in_thread(self._finish_download, image, output_path, download_success, metadata)
+        finally:
+            self._release(image, output_path)
+        
+    def _prepare_download(self, image: Image) -> Optional[str]:
         """
-        Baixa uma imagem para o disco na pasta mensal apropriada ou no diretório base.
+        Verifica se uma imagem deve ser baixada e gera o caminho de destino.
         
         Args:
             image: Objeto de imagem
             
         Returns:
-            bool: True se o download for bem-sucedido, False caso contrário
+            Optional[str]: Caminho de destino ou None se a imagem deve ser ignorada
         """
         # Verifica se a imagem já foi baixada
         if self.is_already_downloaded(image):
             logger.info(f"Imagem já baixada: {image.url}")
-            return False
+            return None
             
         # Verifica se a URL da fonte é uma página de listagem
         ignore_patterns = ['/categoria/', '/category/', '/tag/', '/author/', '/page/']
         if any(pattern in image.source_url for pattern in ignore_patterns) and 'abicom.com.br/categoria/ppi' in image.source_url:
             logger.info(f"Ignorando imagem de página de listagem: {image.url} de {image.source_url}")
-            return False
+            return None
             
         # Gera o caminho de destino (já organizado por pasta mensal se configurado)
         output_path = self.get_image_path(image)
         
+        # Reserva a URL e o caminho: outra thread pode estar baixando a mesma imagem
+        with self._claim_lock:
+            if image.url in self._in_progress or output_path in self._in_progress:
+                logger.info(f"Imagem já em download: {image.url}")
+                return None
+            if image.url in self.downloaded_urls:
+                logger.info(f"Imagem já baixada: {image.url}")
+                return None
+            self._in_progress.update((image.url, output_path))
+        return output_path
+        
+    def _release(self, image: Image, output_path: str) -> None:
+        """
+        Libera a reserva feita por _prepare_download.
+        """
+        with self._claim_lock:
+            self._in_progress.discard(image.url)
+            self._in_progress.discard(output_path)
+        
+    def _finish_download(self, image: Image, output_path: str, download_success: bool,
+                         metadata: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Registra o resultado de um download no manifesto.
+        
+        Args:
+            image: Objeto de imagem
+            output_path: Caminho onde a imagem foi salva
+            download_success: Resultado do download
+            metadata: Metadados do download (tamanho, SHA-256, ETag, Last-Modified)
+            
+        Returns:
+            bool: O próprio resultado do download
+        """
+        if not download_success:
+            logger.error(f"Falha ao baixar imagem: {image.url}")
+            return False
+            
         # Extrai a pasta e o nome do arquivo
         if ORGANIZE_BY_MONTH:
             # Extrai a pasta mensal do caminho
             monthly_folder = os.path.basename(os.path.dirname(output_path))
         else:
             # Use "base" como identificador para o diretório base
-            monthly_folder = "base"
+            monthly_folder = BASE_FOLDER_KEY
             
         # Extrai o nome do arquivo
         filename = os.path.basename(output_path)
         
-        # Realiza o download
-        download_success = self.http_client.download_file(image.url, output_path)
+        # Atualiza o caminho salvo na imagem
+        image.saved_path = output_path
         
-        if download_success:
-            # Atualiza o caminho salvo na imagem
-            image.saved_path = output_path
-            
-            # Adiciona à lista de URLs baixadas
-            self.downloaded_urls.add(image.url)
-            
-            # Adiciona ao índice de imagens existentes
-            if monthly_folder in self.existing_images_by_month:
-                self.existing_images_by_month[monthly_folder].add(filename)
-            else:
-                self.existing_images_by_month[monthly_folder] = {filename}
+        # Adiciona à lista de URLs baixadas
+        self.downloaded_urls.add(image.url)
+        
+        # Hash calculado durante o download (o arquivo só é relido se o cliente não o informar)
+        metadata = metadata or {}
+        sha256 = metadata.get("sha256")
+        if sha256 is None:
+            try:
+                sha256 = compute_file_hash(output_path)
+            except OSError as e:
+                logger.warning(f"Não foi possível calcular o hash de {output_path}: {e}")
                 
-            logger.info(f"Imagem baixada: {image.url} -> {output_path}")
-            return True
+        # Registra no manifesto (post → imagem → arquivo); conteúdo repetido vira link
+        # para o arquivo original e fica marcado como duplicata
+        with self._claim_lock:
+            original = self.manifest.find_by_hash(sha256) if sha256 else None
+            if original == output_path or (original and not os.path.isfile(original)):
+                original = None
+            if original:
+                self._link_duplicate(original, output_path)
+            self.manifest.record(monthly_folder, filename, output_path,
+                                 post_url=image.source_url, image_url=image.url,
+                                 size=metadata.get("size"), sha256=sha256,
+                                 etag=metadata.get("etag"), last_modified=metadata.get("last_modified"),
+                                 duplicate_of=original)
+            
+        if original:
+            logger.info(f"Imagem baixada (conteúdo duplicado de {original}): {image.url} -> {output_path}")
         else:
-            logger.error(f"Falha ao baixar imagem: {image.url}")
-            return False
+            logger.info(f"Imagem baixada: {image.url} -> {output_path}")
+            # Conteúdo novo: entrega ao consumidor (duplicatas reaproveitam a análise do original)
+            if self.on_image_saved is not None:
+                try:
+                    self.on_image_saved(image)
+                except Exception as e:
+                    logger.error(f"Erro ao entregar imagem salva {output_path}: {e}")
+        return True
+        
+    @staticmethod
+    def _link_duplicate(original: str, output_path: str) -> None:
+        """
+        Substitui um arquivo por um hardlink para o original de mesmo conteúdo, de modo
+        que os bytes fiquem armazenados uma única vez. Se o sistema de arquivos não
+        suportar hardlinks, a cópia é mantida (a duplicata continua registrada no manifesto).
+        
+        Args:
+            original: Caminho do arquivo original
+            output_path: Caminho do arquivo duplicado
+        """
+        temp_path = f"{output_path}.link"
+        try:
+            os.link(original, temp_path)
+            os.replace(temp_path, output_path)
+        except OSError as e:
+            logger.debug(f"Hardlink indisponível para {output_path} ({e}); mantendo cópia.")
+            try:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            except OSError:
+                pass
             
     def process_images(self, images: List[Image]) -> int:
         """
-        Processa uma lista de imagens, baixando aquelas que ainda não foram baixadas.
+        Processa uma lista de imagens, baixando aquelas que ainda não foram baixadas
+        (em paralelo, com até download_workers threads).
         
         Args:
             images: Lista de objetos Image
             
+        Returns:
+            int: Número de imagens baixadas com sucesso
+        """
+        workers = min(self.download_workers, len(images))
+        if workers <= 1:
+            results = [self.download_image(image) for image in images]
+            return self._summarize_downloads(images, results)
+            
+        # Downloads em paralelo; a ordem dos resultados acompanha a lista de imagens
+        logger.info(f"Baixando {len(images)} imagens com {workers} workers...")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="download") as executor:
+            futures = [executor.submit(self.download_image, image) for image in images]
+            results = []
+            for image, future in zip(images, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    logger.error(f"Erro ao baixar imagem {image.url}: {e}")
+                    results.append(False)
+        return self._summarize_downloads(images, results)
+        
+    async def process_images_async(self, images: List[Image], http_client: AsyncHttpClient) -> int:
+        """
+        Versão assíncrona de process_images: todos os downloads ficam em andamento ao
+        mesmo tempo, limitados pelo pool do AsyncHttpClient.
+        
+        Args:
+            images: Lista de objetos Image
+            http_client: Cliente HTTP assíncrono
+            
+        Returns:
+            int: Número de imagens baixadas com sucesso
+        """
+        results = await asyncio.gather(
+            *(self.download_image_async(image, http_client) for image in images),
+            return_exceptions=True
+        )
+        for image, result in zip(images, results):
+            if isinstance(result, Exception):
+                logger.error(f"Erro ao baixar imagem {image.url}: {result}")
+        results = [result is True for result in results]
+        return self._summarize_downloads(images, results)
+        
+    def _summarize_downloads(self, images: List[Image], results: List[bool]) -> int:
+        """
+        Conta os downloads bem-sucedidos e registra o resumo por mês.
+        
+        Args:
+            images: Lista de objetos Image
+            results: Resultado do download de cada imagem
+            
         Returns:
             int: Número de imagens baixadas com sucesso
         """
@@ -399,9 +522,12 @@ class ImageService:
         # Agrupa as imagens por mês/ano para relatório
         downloads_by_month = {}
         
-        for image in images:
-            # Extrai o mês/ano do post
-            date_parts = self.extract_date_from_url(image.source_url)
+        for image, downloaded in zip(images, results):
+            if not downloaded:
+                continue
+                
+            # Extrai o mês/ano do post (já extraído durante o download)
+            date_parts = self.get_date_parts(image.source_url)
             
             if date_parts:
                 day, month, year = date_parts
@@ -411,15 +537,13 @@ class ImageService:
                 today = datetime.now()
                 month_year = today.strftime(DATE_FORMAT_FOLDER)
             
-            # Baixa a imagem
-            if self.download_image(image):
-                download_count += 1
-                
-                # Registra o download por mês
-                if month_year in downloads_by_month:
-                    downloads_by_month[month_year] += 1
-                else:
-                    downloads_by_month[month_year] = 1
+            download_count += 1
+            
+            # Registra o download por mês
+            if month_year in downloads_by_month:
+                downloads_by_month[month_year] += 1
+            else:
+                downloads_by_month[month_year] = 1
         
         # Log com resumo por mês
         if download_count > 0:
@@ -434,6 +558,8 @@ class ImageService:
         Fecha recursos utilizados pelo serviço.
         """
         self.http_client.close()
+        if self._owns_manifest:
+            self.manifest.close()
         
     def __enter__(self):
         """
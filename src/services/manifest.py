@@ -0,0 +1,440 @@
+"""
+Manifesto persistente (SQLite) das imagens baixadas.
+"""
+import os
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from src.utils.file_utils import compute_file_hash
+from src.config import MANIFEST_FILE, IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# Chave usada para imagens salvas diretamente no diretório base (sem pastas mensais)
+BASE_FOLDER_KEY = "base"
+
+class DownloadManifest:
+    """
+    Registro persistente das imagens baixadas: post → imagem → arquivo salvo, com
+    tamanho, hash do conteúdo, validadores HTTP (ETag/Last-Modified) e datas.
+
+    As chaves (pasta, arquivo), as URLs de posts e o índice hash → arquivo ficam em
+    memória, de modo que as consultas de existência e de conteúdo duplicado são O(1) e
+    não acessam o sistema de arquivos. Imagens com o mesmo conteúdo de outra já salva
+    são registradas com 'duplicate_of' apontando para o arquivo original.
+    """
+
+    def __init__(self, db_path: str = MANIFEST_FILE):
+        """
+        Abre (ou cria) o manifesto.
+
+        Args:
+            db_path: Caminho do arquivo SQLite
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self._create_schema()
+
+        self._keys: Set[Tuple[str, str]] = set()
+        self._post_urls: Set[str] = set()
+        self._hash_index: Dict[str, str] = {}
+        self._load_index()
+
+    def _create_schema(self) -> None:
+        """
+        Cria as tabelas do manifesto, se ainda não existirem.
+        """
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS images (
+                    folder TEXT NOT NULL,
+                    filename TEXT NOT NULL,
+                    saved_path TEXT NOT NULL,
+                    post_url TEXT,
+                    image_url TEXT,
+                    size INTEGER,
+                    sha256 TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    downloaded_at TEXT,
+                    updated_at TEXT,
+                    duplicate_of TEXT,
+                    PRIMARY KEY (folder, filename)
+                )
+            """)
+            # Manifestos anteriores à deduplicação não têm a coluna duplicate_of
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(images)")}
+            if "duplicate_of" not in columns:
+                self.conn.execute("ALTER TABLE images ADD COLUMN duplicate_of TEXT")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_images_post_url ON images (post_url)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images (sha256)")
+            # Resolução post → primeira imagem (evita baixar o HTML do post novamente)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS post_cache (
+                    post_url TEXT PRIMARY KEY,
+                    image_url TEXT NOT NULL,
+                    file_extension TEXT NOT NULL,
+                    resolved_at TEXT NOT NULL
+                )
+            """)
+            # Estado da análise OCR de cada imagem (permite pular imagens já processadas)
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_state (
+                    image_path TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    extractor_version TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    output_path TEXT NOT NULL,
+                    analyzed_at TEXT NOT NULL
+                )
+            """)
+            # Links de posts da última versão analisada de cada página de listagem
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS listing_cache (
+                    page_url TEXT PRIMARY KEY,
+                    post_links TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+
+    def _load_index(self) -> None:
+        """
+        Carrega em memória as chaves e URLs de posts registradas.
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT folder, filename, post_url, saved_path, sha256, duplicate_of FROM images").fetchall()
+        self._keys = {(row[0], row[1]) for row in rows}
+        self._post_urls = {row[2] for row in rows if row[2]}
+        self._hash_index = {sha256: saved_path for _, _, _, saved_path, sha256, duplicate_of in rows
+                            if sha256 and not duplicate_of}
+        logger.debug(f"Manifesto carregado: {len(self._keys)} imagens registradas")
+
+    def __len__(self) -> int:
+        """Número de imagens registradas."""
+        return len(self._keys)
+
+    def contains(self, folder: str, filename: str) -> bool:
+        """
+        Verifica se um arquivo está registrado no manifesto.
+
+        Args:
+            folder: Pasta mensal (MM-YYYY) ou BASE_FOLDER_KEY
+            filename: Nome do arquivo
+
+        Returns:
+            bool: True se o arquivo está registrado
+        """
+        return (folder, filename) in self._keys
+
+    def has_post(self, post_url: str) -> bool:
+        """
+        Verifica se já existe imagem registrada para um post.
+
+        Args:
+            post_url: URL do post
+
+        Returns:
+            bool: True se o post já tem imagem registrada
+        """
+        return post_url in self._post_urls
+
+    def find_by_hash(self, sha256: str) -> Optional[str]:
+        """
+        Procura um arquivo original já registrado com o mesmo conteúdo.
+        
+        Args:
+            sha256: Hash SHA-256 do conteúdo
+            
+        Returns:
+            Optional[str]: Caminho do arquivo original ou None se o conteúdo é inédito
+        """
+        return self._hash_index.get(sha256)
+        
+    def duplicate_paths(self) -> Set[str]:
+        """
+        Obtém os caminhos das imagens registradas como duplicatas de outra.
+        
+        Returns:
+            Set[str]: Caminhos absolutos dos arquivos duplicados
+        """
+        with self._lock:
+            rows = self.conn.execute("SELECT saved_path FROM images WHERE duplicate_of IS NOT NULL").fetchall()
+        return {os.path.abspath(saved_path) for saved_path, in rows}
+        
+    def filenames_by_folder(self) -> Dict[str, Set[str]]:
+        """
+        Agrupa os arquivos registrados por pasta.
+
+        Returns:
+            Dict[str, Set[str]]: Mapeamento pasta → nomes de arquivo
+        """
+        by_folder: Dict[str, Set[str]] = {}
+        for folder, filename in self._keys:
+            by_folder.setdefault(folder, set()).add(filename)
+        return by_folder
+
+    def record(self, folder: str, filename: str, saved_path: str,
+               post_url: Optional[str] = None, image_url: Optional[str] = None,
+               size: Optional[int] = None, sha256: Optional[str] = None,
+               etag: Optional[str] = None, last_modified: Optional[str] = None,
+               duplicate_of: Optional[str] = None) -> None:
+        """
+        Registra (ou atualiza) uma imagem no manifesto. Campos None não sobrescrevem
+        valores já registrados (exceto duplicate_of, sempre atualizado).
+
+        Args:
+            folder: Pasta mensal (MM-YYYY) ou BASE_FOLDER_KEY
+            filename: Nome do arquivo
+            saved_path: Caminho completo do arquivo salvo
+            post_url: URL do post de origem
+            image_url: URL da imagem
+            size: Tamanho em bytes
+            sha256: Hash SHA-256 do conteúdo
+            etag: Header ETag da resposta HTTP
+            last_modified: Header Last-Modified da resposta HTTP
+            duplicate_of: Caminho do arquivo original, se o conteúdo é duplicado
+        """
+        now = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO images (folder, filename, saved_path, post_url, image_url, size,
+                                    sha256, etag, last_modified, downloaded_at, updated_at, duplicate_of)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (folder, filename) DO UPDATE SET
+                    saved_path = excluded.saved_path,
+                    post_url = COALESCE(excluded.post_url, images.post_url),
+                    image_url = COALESCE(excluded.image_url, images.image_url),
+                    size = COALESCE(excluded.size, images.size),
+                    sha256 = COALESCE(excluded.sha256, images.sha256),
+                    etag = COALESCE(excluded.etag, images.etag),
+                    last_modified = COALESCE(excluded.last_modified, images.last_modified),
+                    updated_at = excluded.updated_at,
+                    duplicate_of = excluded.duplicate_of
+            """, (folder, filename, saved_path, post_url, image_url, size,
+                  sha256, etag, last_modified, now, now, duplicate_of))
+            self._keys.add((folder, filename))
+            if post_url:
+                self._post_urls.add(post_url)
+            if sha256 and not duplicate_of:
+                self._hash_index.setdefault(sha256, saved_path)
+
+    def get(self, folder: str, filename: str) -> Optional[Dict[str, object]]:
+        """
+        Obtém o registro completo de uma imagem.
+
+        Args:
+            folder: Pasta mensal (MM-YYYY) ou BASE_FOLDER_KEY
+            filename: Nome do arquivo
+
+        Returns:
+            Optional[Dict[str, object]]: Registro da imagem ou None se não existir
+        """
+        with self._lock:
+            cursor = self.conn.execute("SELECT * FROM images WHERE folder = ? AND filename = ?",
+                                       (folder, filename))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            columns = [description[0] for description in cursor.description]
+        return dict(zip(columns, row))
+
+    def load_post_cache(self) -> Dict[str, Dict[str, str]]:
+        """
+        Carrega todas as resoluções post → imagem registradas.
+
+        Returns:
+            Dict[str, Dict[str, str]]: Mapeamento URL do post → {'image_url', 'file_extension', 'resolved_at'}
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT post_url, image_url, file_extension, resolved_at FROM post_cache").fetchall()
+        return {post_url: {"image_url": image_url, "file_extension": file_extension, "resolved_at": resolved_at}
+                for post_url, image_url, file_extension, resolved_at in rows}
+
+    def record_post_resolution(self, post_url: str, image_url: str, file_extension: str) -> str:
+        """
+        Registra a primeira imagem encontrada em um post.
+
+        Args:
+            post_url: URL do post
+            image_url: URL da primeira imagem válida do post
+            file_extension: Extensão da imagem
+
+        Returns:
+            str: Data/hora (ISO) registrada para a resolução
+        """
+        resolved_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO post_cache (post_url, image_url, file_extension, resolved_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (post_url) DO UPDATE SET
+                    image_url = excluded.image_url,
+                    file_extension = excluded.file_extension,
+                    resolved_at = excluded.resolved_at
+            """, (post_url, image_url, file_extension, resolved_at))
+        return resolved_at
+
+    def get_listing_links(self, page_url: str) -> Optional[List[str]]:
+        """
+        Obtém os links de posts registrados para uma página de listagem.
+
+        Args:
+            page_url: URL da página de listagem
+
+        Returns:
+            Optional[List[str]]: Links de posts ou None se a página nunca foi analisada
+        """
+        with self._lock:
+            row = self.conn.execute("SELECT post_links FROM listing_cache WHERE page_url = ?",
+                                    (page_url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def record_listing_links(self, page_url: str, post_links: List[str]) -> None:
+        """
+        Registra os links de posts extraídos de uma página de listagem.
+
+        Args:
+            page_url: URL da página de listagem
+            post_links: Links de posts, na ordem da listagem
+        """
+        updated_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO listing_cache (page_url, post_links, updated_at) VALUES (?, ?, ?)
+                ON CONFLICT (page_url) DO UPDATE SET
+                    post_links = excluded.post_links,
+                    updated_at = excluded.updated_at
+            """, (page_url, json.dumps(post_links), updated_at))
+
+    def load_analysis_state(self) -> Dict[str, Dict[str, object]]:
+        """
+        Carrega o estado da última análise de cada imagem.
+        
+        Returns:
+            Dict[str, Dict[str, object]]: Caminho absoluto da imagem → {'sha256', 'extractor_version',
+                                          'size', 'mtime', 'output_path', 'analyzed_at'}
+        """
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT image_path, sha256, extractor_version, size, mtime, output_path, analyzed_at "
+                "FROM analysis_state").fetchall()
+        return {image_path: {"sha256": sha256, "extractor_version": extractor_version, "size": size,
+                             "mtime": mtime, "output_path": output_path, "analyzed_at": analyzed_at}
+                for image_path, sha256, extractor_version, size, mtime, output_path, analyzed_at in rows}
+        
+    def get_analysis_state(self, image_path: str) -> Optional[Dict[str, object]]:
+        """
+        Obtém o estado da última análise de uma imagem.
+
+        Args:
+            image_path: Caminho absoluto da imagem
+
+        Returns:
+            Optional[Dict[str, object]]: {'sha256', 'extractor_version', 'size', 'mtime', 'output_path',
+                                          'analyzed_at'} ou None se a imagem nunca foi analisada
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT sha256, extractor_version, size, mtime, output_path, analyzed_at "
+                "FROM analysis_state WHERE image_path = ?", (image_path,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("sha256", "extractor_version", "size", "mtime", "output_path", "analyzed_at"), row))
+
+    def record_analysis(self, image_path: str, sha256: str, extractor_version: str,
+                        size: int, mtime: float, output_path: str) -> None:
+        """
+        Registra a análise bem-sucedida de uma imagem.
+        
+        Args:
+            image_path: Caminho absoluto da imagem
+            sha256: Hash SHA-256 do conteúdo analisado
+            extractor_version: Versão do extrator que gerou a saída
+            size: Tamanho da imagem em bytes
+            mtime: Data de modificação da imagem (os.stat)
+            output_path: Caminho do CSV gerado
+        """
+        analyzed_at = datetime.now().isoformat(timespec="seconds")
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO analysis_state (image_path, sha256, extractor_version, size, mtime,
+                                            output_path, analyzed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (image_path) DO UPDATE SET
+                    sha256 = excluded.sha256,
+                    extractor_version = excluded.extractor_version,
+                    size = excluded.size,
+                    mtime = excluded.mtime,
+                    output_path = excluded.output_path,
+                    analyzed_at = excluded.analyzed_at
+            """, (image_path, sha256, extractor_version, size, mtime, output_path, analyzed_at))
+
+    def rebuild_from_disk(self, output_dir: str, organize_by_month: bool) -> int:
+        """
+        Regenera o manifesto a partir dos arquivos em disco. Associações post/imagem
+        já conhecidas são preservadas; registros de arquivos ausentes são removidos.
+
+        Args:
+            output_dir: Diretório base das imagens
+            organize_by_month: Se as imagens estão organizadas em pastas MM-YYYY
+
+        Returns:
+            int: Número de imagens registradas após a reconstrução
+        """
+        logger.info(f"Reconstruindo manifesto a partir de {output_dir}...")
+        found: List[Tuple[str, str, str]] = []
+
+        if organize_by_month:
+            try:
+                folders = [f for f in os.listdir(output_dir) if os.path.isdir(os.path.join(output_dir, f))]
+            except OSError as e:
+                logger.error(f"Erro ao listar pastas mensais: {e}")
+                return len(self)
+            locations = [(folder, os.path.join(output_dir, folder)) for folder in folders]
+        else:
+            locations = [(BASE_FOLDER_KEY, output_dir)]
+
+        for folder, folder_path in locations:
+            try:
+                for filename in os.listdir(folder_path):
+                    file_path = os.path.join(folder_path, filename)
+                    if os.path.isfile(file_path) and os.path.splitext(filename)[1].lower() in IMAGE_EXTENSIONS:
+                        found.append((folder, filename, file_path))
+            except OSError as e:
+                logger.error(f"Erro ao indexar arquivos na pasta {folder}: {e}")
+
+        found_keys = {(folder, filename) for folder, filename, _ in found}
+        stale_keys = self._keys - found_keys
+        with self._lock, self.conn:
+            self.conn.executemany("DELETE FROM images WHERE folder = ? AND filename = ?", list(stale_keys))
+        self._hash_index = {}
+
+        for folder, filename, file_path in found:
+            try:
+                size = os.path.getsize(file_path)
+                sha256 = compute_file_hash(file_path)
+            except OSError as e:
+                logger.error(f"Erro ao ler arquivo {file_path}: {e}")
+                continue
+            original = self.find_by_hash(sha256)
+            self.record(folder, filename, file_path, size=size, sha256=sha256,
+                        duplicate_of=original if original != file_path else None)
+
+        self._load_index()
+        logger.info(f"Manifesto reconstruído: {len(self)} imagens ({len(stale_keys)} registros removidos).")
+        return len(self)
+
+    def close(self):
+        """
+        Fecha a conexão com o banco.
+        """
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,25 @@
+"""
+Utilitários para código assíncrono.
+"""
+import asyncio
+import functools
+from typing import Any, Callable, TypeVar
+
+T = TypeVar("T")
+
+async def run_in_thread(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """
+    Executa uma função bloqueante (E/S de arquivo, SQLite, parsing) no executor padrão do
+    event loop, sem bloqueá-lo. Equivalente a asyncio.to_thread, que só existe a partir do
+    Python 3.9.
+    
+    Args:
+        func: Função a executar
+        *args: Argumentos posicionais da função
+        **kwargs: Argumentos nomeados da função
+        
+    Returns:
+        T: Valor retornado pela função
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
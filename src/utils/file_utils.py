@@ -2,8 +2,9 @@
 Utilitários para manipulação de arquivos.
 """
 import os
+import re
 import hashlib
-from typing import List, Optional
+from typing import List, Mapping, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,7 +18,7 @@ def ensure_directory_exists(directory_path: str) -> None:
     """
     if not os.path.exists(directory_path):
         try:
-            os.makedirs(directory_path)
+            os.makedirs(directory_path, exist_ok=True)  # Tolera criação simultânea por outra thread
             logger.info(f"Diretório criado: {directory_path}")
         except OSError as e:
             logger.error(f"Erro ao criar diretório {directory_path}: {e}")
@@ -121,4 +122,179 @@ def get_file_size(file_path: str) -> int:
         return os.path.getsize(file_path)
     except OSError as e:
         logger.error(f"Erro ao obter tamanho do arquivo {file_path}: {e}")
-        return 0
\ No newline at end of file
+        return 0
+
+def compute_file_hash(file_path: str, algorithm: str = "sha256", chunk_size: int = 65536) -> str:
+    """
+    Calcula o hash do conteúdo de um arquivo, lendo-o em blocos.
+    
+    Args:
+        file_path: Caminho do arquivo
+        algorithm: Algoritmo de hash (qualquer nome aceito por hashlib.new)
+        chunk_size: Tamanho dos blocos de leitura
+        
+    Returns:
+        str: Hash hexadecimal do conteúdo
+    """
+    digest = hashlib.new(algorithm)
+    update_hash_from_file(digest, file_path, chunk_size)
+    return digest.hexdigest()
+
+def update_hash_from_file(digest: "hashlib._Hash", file_path: str, chunk_size: int = 65536) -> None:
+    """
+    Alimenta um objeto de hash com o conteúdo de um arquivo, lendo-o em blocos.
+    
+    Args:
+        digest: Objeto de hash (hashlib) a ser atualizado
+        file_path: Caminho do arquivo
+        chunk_size: Tamanho dos blocos de leitura
+    """
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+
+# Sufixo dos arquivos em download (renomeados para o nome final só quando completos)
+PARTIAL_SUFFIX = ".part"
+# Sufixo do arquivo com o validador (ETag forte ou Last-Modified) da resposta que gerou o parcial
+PARTIAL_VALIDATOR_SUFFIX = ".part.validator"
+
+def get_partial_path(output_path: str) -> str:
+    """
+    Obtém o caminho do arquivo temporário de um download em andamento.
+    
+    Args:
+        output_path: Caminho final do arquivo
+        
+    Returns:
+        str: Caminho do arquivo parcial
+    """
+    return output_path + PARTIAL_SUFFIX
+
+def get_partial_size(output_path: str) -> int:
+    """
+    Obtém o número de bytes já baixados de um download interrompido.
+    
+    Args:
+        output_path: Caminho final do arquivo
+        
+    Returns:
+        int: Tamanho do arquivo parcial em bytes (0 se não existir)
+    """
+    try:
+        return os.path.getsize(get_partial_path(output_path))
+    except OSError:
+        return 0
+
+def get_partial_validator(output_path: str) -> Optional[str]:
+    """
+    Obtém o validador (para o header If-Range) da resposta que originou o arquivo parcial.
+    
+    Args:
+        output_path: Caminho final do arquivo
+        
+    Returns:
+        Optional[str]: ETag forte ou Last-Modified, ou None se não houver validador gravado
+    """
+    try:
+        with open(output_path + PARTIAL_VALIDATOR_SUFFIX, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def save_partial_validator(output_path: str, headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Grava ao lado do arquivo parcial o validador da resposta que o está gerando. ETags fracas
+    (W/...) não valem para If-Range; nesse caso usa o Last-Modified.
+    
+    Args:
+        output_path: Caminho final do arquivo
+        headers: Headers da resposta (200) cujo corpo é gravado no arquivo parcial
+        
+    Returns:
+        Optional[str]: Validador gravado ou None se a resposta não tiver nenhum utilizável
+    """
+    etag = headers.get("ETag")
+    validator = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+    validator_path = output_path + PARTIAL_VALIDATOR_SUFFIX
+    if not validator:
+        remove_partial_files(output_path, keep_partial=True)
+        return None
+    with open(validator_path, 'w', encoding='utf-8') as f:
+        f.write(validator)
+    return validator
+
+def remove_partial_files(output_path: str, keep_partial: bool = False) -> None:
+    """
+    Remove o arquivo parcial de um download e o seu validador, se existirem.
+    
+    Args:
+        output_path: Caminho final do arquivo
+        keep_partial: Se True, remove apenas o validador
+    """
+    paths = [output_path + PARTIAL_VALIDATOR_SUFFIX] + ([] if keep_partial else [get_partial_path(output_path)])
+    for path in paths:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Interpreta o header Content-Range de uma resposta 206 ("bytes início-fim/total").
+    
+    Args:
+        value: Valor do header
+        
+    Returns:
+        Tuple[Optional[int], Optional[int]]: (byte inicial, tamanho total), None quando ausente
+    """
+    match = re.match(r"bytes\s+(\d+)-\d+/(\d+|\*)", value or "")
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return int(start), (int(total) if total != "*" else None)
+
+def expected_download_size(status_code: int, headers: Mapping[str, str]) -> Optional[int]:
+    """
+    Calcula o tamanho final esperado de um arquivo a partir dos headers da resposta.
+    
+    Args:
+        status_code: Status HTTP (200 ou 206)
+        headers: Headers da resposta
+        
+    Returns:
+        Optional[int]: Tamanho total em bytes ou None se não puder ser verificado
+    """
+    # Corpo comprimido em trânsito: o Content-Length não corresponde aos bytes gravados
+    if headers.get("Content-Encoding", "identity").lower() != "identity":
+        return None
+    if status_code == 206:
+        return parse_content_range(headers.get("Content-Range"))[1]
+    length = headers.get("Content-Length")
+    return int(length) if length and length.isdigit() else None
+
+def finalize_partial_file(output_path: str, expected_size: Optional[int] = None) -> bool:
+    """
+    Conclui um download: confere o tamanho do arquivo parcial e o renomeia atomicamente
+    para o caminho final. Um arquivo menor que o esperado é mantido para ser retomado;
+    um arquivo maior é descartado.
+    
+    Args:
+        output_path: Caminho final do arquivo
+        expected_size: Tamanho esperado em bytes (None = não verifica)
+        
+    Returns:
+        bool: True se o arquivo foi concluído, False caso contrário
+    """
+    part_path = get_partial_path(output_path)
+    size = os.path.getsize(part_path)
+    if expected_size is not None and size != expected_size:
+        if size > expected_size:
+            logger.warning(f"Arquivo maior que o esperado ({size} > {expected_size} bytes), descartando: {part_path}")
+            remove_partial_files(output_path)
+        else:
+            logger.warning(f"Download incompleto ({size}/{expected_size} bytes): {part_path}")
+        return False
+    os.replace(part_path, output_path)
+    remove_partial_files(output_path, keep_partial=True)
+    return True
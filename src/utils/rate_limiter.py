@@ -0,0 +1,366 @@
+"""
+Limitador de taxa (token bucket) por host, compartilhado por todos os clientes HTTP.
+"""
+import time
+import threading
+import logging
+from email.utils import parsedate_to_datetime
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from src.utils.url_utils import extract_domain
+from src.config import (MAX_REQUESTS_PER_SECOND, REQUEST_BURST, ADAPTIVE_INITIAL_CONCURRENCY,
+                        ADAPTIVE_MIN_CONCURRENCY,
+                        ADAPTIVE_MAX_CONCURRENCY, ADAPTIVE_LATENCY_WINDOW, ADAPTIVE_SPIKE_FACTOR)
+
+logger = logging.getLogger(__name__)
+
+# Códigos HTTP que indicam sobrecarga/limitação por parte do servidor
+THROTTLE_STATUS_CODES = (429, 503)
+# Erros de gateway: o servidor de origem não deu conta (reduzem a concorrência, sem Retry-After)
+OVERLOAD_STATUS_CODES = (502, 504)
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Interpreta o header Retry-After (segundos ou data HTTP).
+
+    Args:
+        value: Valor do header
+
+    Returns:
+        Optional[float]: Segundos de espera ou None se o header estiver ausente/inválido
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: libera até 'burst' requisições imediatas e, depois,
+    'rate' requisições por segundo.
+
+    Cada reserva consome uma ficha; quando não há fichas, o saldo fica negativo e a
+    reserva recebe o tempo de espera até a sua vez, de modo que as requisições
+    concorrentes são espaçadas exatamente na taxa configurada.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Inicializa o bucket cheio.
+
+        Args:
+            rate: Fichas repostas por segundo (requisições por segundo)
+            burst: Capacidade máxima do bucket
+        """
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        Reserva uma ficha.
+
+        Returns:
+            float: Segundos que o chamador deve aguardar antes de fazer a requisição
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+            return max(delay, self._blocked_until - now)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Bloqueia novas requisições por um período (ex.: header Retry-After).
+
+        Args:
+            seconds: Duração do bloqueio em segundos
+        """
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def acquire(self) -> None:
+        """
+        Reserva uma ficha e aguarda (bloqueando a thread) até poder usá-la.
+        """
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+class HostRateLimiter:
+    """
+    Conjunto de token buckets, um por host, com a mesma taxa e rajada.
+    """
+
+    def __init__(self, rate: Optional[float] = MAX_REQUESTS_PER_SECOND, burst: int = REQUEST_BURST):
+        """
+        Inicializa o limitador.
+
+        Args:
+            rate: Requisições por segundo por host (None ou 0 = sem limite)
+            burst: Requisições liberadas de imediato antes de aplicar a taxa
+        """
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket_for(self, url: str) -> Optional[TokenBucket]:
+        """
+        Obtém (ou cria) o bucket do host de uma URL.
+        """
+        if not self.rate:
+            return None
+        host = extract_domain(url).lower()
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[host] = bucket
+        return bucket
+
+    def reserve(self, url: str) -> float:
+        """
+        Reserva uma requisição para o host da URL.
+
+        Args:
+            url: URL da requisição
+
+        Returns:
+            float: Segundos de espera antes de fazer a requisição
+        """
+        bucket = self._bucket_for(url)
+        return bucket.reserve() if bucket else 0.0
+
+    def pause(self, url: str, seconds: float) -> None:
+        """
+        Suspende as requisições ao host da URL por um período (ex.: header Retry-After).
+
+        Args:
+            url: URL cujo host será suspenso
+            seconds: Duração da suspensão em segundos
+        """
+        bucket = self._bucket_for(url)
+        if bucket:
+            logger.info(f"Host {extract_domain(url)} suspenso por {seconds:.1f}s (Retry-After)")
+            bucket.pause(seconds)
+
+    def acquire(self, url: str) -> None:
+        """
+        Reserva uma requisição para o host da URL e aguarda a sua vez.
+
+        Args:
+            url: URL da requisição
+        """
+        delay = self.reserve(url)
+        if delay > 0:
+            logger.debug(f"Limite de taxa: aguardando {delay:.2f}s para {url}")
+            time.sleep(delay)
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limite adaptativo de requisições simultâneas no estilo AIMD (aumento aditivo,
+    redução multiplicativa).
+
+    A cada 'limite' respostas bem-sucedidas com p95 de latência estável, o limite sobe
+    em uma unidade. Respostas 429/502/503/504, timeouts, erros de conexão ou um pico de
+    latência (p95 acima de spike_factor vezes a linha de base) reduzem o limite pela metade. Cada mudança é
+    registrada com o motivo, para o relatório da execução.
+    """
+
+    def __init__(self, initial: int = ADAPTIVE_INITIAL_CONCURRENCY,
+                 min_limit: int = ADAPTIVE_MIN_CONCURRENCY,
+                 max_limit: int = ADAPTIVE_MAX_CONCURRENCY,
+                 window: int = ADAPTIVE_LATENCY_WINDOW,
+                 spike_factor: float = ADAPTIVE_SPIKE_FACTOR,
+                 decrease_factor: float = 0.5):
+        """
+        Inicializa o limitador.
+
+        Args:
+            initial: Limite inicial de requisições simultâneas
+            min_limit: Limite mínimo
+            max_limit: Limite máximo
+            window: Número de latências recentes usadas no cálculo do p95
+            spike_factor: Fator sobre a linha de base que caracteriza pico de latência
+            decrease_factor: Fator aplicado ao limite em cada redução
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = min(self.max_limit, max(self.min_limit, initial))
+        self.window = max(5, window)
+        self.spike_factor = spike_factor
+        self.decrease_factor = decrease_factor
+
+        self.in_flight = 0
+        self.events: List[Tuple[float, int, int, str]] = []  # (timestamp, de, para, motivo)
+        self._latencies: List[float] = []
+        self._baseline_p95: Optional[float] = None
+        self._successes = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Ocupa uma vaga de requisição simultânea durante o bloco 'with'.
+        """
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify()
+
+    def p95(self) -> Optional[float]:
+        """
+        p95 das latências recentes (None se ainda não há amostras suficientes).
+        """
+        if len(self._latencies) < 5:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+
+    def record_success(self, latency: float) -> None:
+        """
+        Registra uma resposta bem-sucedida e sua latência.
+
+        Args:
+            latency: Latência da requisição em segundos
+        """
+        with self._condition:
+            self._latencies.append(latency)
+            if len(self._latencies) > self.window:
+                self._latencies.pop(0)
+
+            p95 = self.p95()
+            if p95 is None:
+                return
+            if len(self._latencies) >= self.window and (self._baseline_p95 is None or p95 < self._baseline_p95):
+                self._baseline_p95 = p95
+
+            if self._baseline_p95 is not None and p95 > self._baseline_p95 * self.spike_factor:
+                if self.limit <= self.min_limit:
+                    # Já no mínimo: o servidor ficou mais lento, adota a nova linha de base
+                    self._baseline_p95 = p95
+                    return
+                self._decrease(f"pico de latência (p95 {p95:.2f}s > {self.spike_factor:g}x {self._baseline_p95:.2f}s)")
+                return
+
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.max_limit:
+                self._set_limit(self.limit + 1, f"p95 estável ({p95:.2f}s)")
+                self._successes = 0
+
+    def record_throttle(self, reason: str) -> None:
+        """
+        Registra um sinal de sobrecarga do servidor (429/503, timeout).
+
+        Args:
+            reason: Descrição do sinal recebido
+        """
+        with self._condition:
+            self._decrease(reason)
+
+    def _decrease(self, reason: str) -> None:
+        """
+        Reduz o limite multiplicativamente (no máximo uma vez por janela de latência).
+        Deve ser chamado com o lock adquirido.
+        """
+        now = time.monotonic()
+        p95 = self.p95() or 0.0
+        if now - self._last_decrease < max(1.0, p95):
+            return
+        self._last_decrease = now
+        self._successes = 0
+        self._latencies.clear()
+        self._set_limit(max(self.min_limit, int(self.limit * self.decrease_factor)), reason)
+
+    def _set_limit(self, new_limit: int, reason: str) -> None:
+        """
+        Altera o limite e registra o evento. Deve ser chamado com o lock adquirido.
+        """
+        if new_limit == self.limit:
+            return
+        self.events.append((time.time(), self.limit, new_limit, reason))
+        logger.info(f"Concorrência adaptativa: {self.limit} -> {new_limit} ({reason})")
+        self.limit = new_limit
+        self._condition.notify_all()
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Métricas atuais do limitador.
+
+        Returns:
+            Dict[str, Any]: Limite atual, requisições em andamento, p95 e histórico de mudanças
+        """
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self.in_flight,
+                "p95_latency": self.p95(),
+                "baseline_p95": self._baseline_p95,
+                "changes": list(self.events),
+            }
+
+# Instâncias compartilhadas pelo processo (scraper, downloads e cliente assíncrono)
+_shared_limiter: Optional[HostRateLimiter] = None
+_shared_concurrency: Dict[str, AdaptiveConcurrencyLimiter] = {}
+_shared_lock = threading.Lock()
+
+def get_shared_rate_limiter() -> HostRateLimiter:
+    """
+    Obtém o limitador por host compartilhado por todos os clientes HTTP do processo.
+
+    Returns:
+        HostRateLimiter: Limitador configurado com MAX_REQUESTS_PER_SECOND e REQUEST_BURST
+    """
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = HostRateLimiter(MAX_REQUESTS_PER_SECOND, REQUEST_BURST)
+        return _shared_limiter
+
+def get_shared_concurrency_limiter(url: str) -> AdaptiveConcurrencyLimiter:
+    """
+    Obtém o limite adaptativo de concorrência do host de uma URL, compartilhado por todos os
+    clientes HTTP síncronos do processo: um 429 visto pelos downloads também reduz o scraper.
+
+    Args:
+        url: URL da requisição
+
+    Returns:
+        AdaptiveConcurrencyLimiter: Limitador do host (criado com as configurações ADAPTIVE_*)
+    """
+    host = extract_domain(url).lower()
+    with _shared_lock:
+        limiter = _shared_concurrency.get(host)
+        if limiter is None:
+            limiter = AdaptiveConcurrencyLimiter()
+            _shared_concurrency[host] = limiter
+        return limiter
+
+def shared_concurrency_limiters() -> Dict[str, AdaptiveConcurrencyLimiter]:
+    """
+    Limitadores adaptativos compartilhados criados até o momento, por host (para relatórios).
+
+    Returns:
+        Dict[str, AdaptiveConcurrencyLimiter]: Host → limitador
+    """
+    with _shared_lock:
+        return dict(_shared_concurrency)
@@ -152,4 +152,23 @@ def get_url_without_query(url: str) -> str:
         parsed.params, 
         '', 
         parsed.fragment
-    ))
\ No newline at end of file
+    ))
+
+def normalize_cache_key(url: str) -> str:
+    """
+    Normaliza uma URL para uso como chave de cache: esquema e host em minúsculas,
+    porta padrão removida, fragmento descartado e parâmetros de consulta ordenados.
+    
+    Args:
+        url: URL completa
+        
+    Returns:
+        str: URL normalizada
+    """
+    parsed = urllib.parse.urlparse(url.strip())
+    scheme = parsed.scheme.lower()
+    netloc = parsed.netloc.lower()
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parsed.query, keep_blank_values=True)))
+    return urllib.parse.urlunparse((scheme, netloc, parsed.path or "/", parsed.params, query, ''))
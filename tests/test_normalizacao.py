@@ -0,0 +1,127 @@
+# tests/test_normalizacao.py
+
+"""
+Testes da normalização (src/normalizacao.py) a partir das células reais da tabela de 12/03/2025,
+extraída por OCR (data/tabelas_por_mes/03-2025/ppi-12-03-2025_tabela.csv).
+"""
+
+import os
+import pytest
+
+pd = pytest.importorskip("pandas")
+np = pytest.importorskip("numpy")
+
+from src.normalizacao import celulas_da_grade, converter_valores, conferir_consistencia, normalizar_tabela
+
+CSV_12_03_2025 = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "data", "tabelas_por_mes", "03-2025", "ppi-12-03-2025_tabela.csv")
+
+@pytest.fixture
+def grade():
+    """ Grade como gravada pelo --analyze (texto das células preservado, ex.: "0954"). """
+    return pd.read_csv(CSV_12_03_2025, dtype=str, encoding="utf-8-sig")
+
+@pytest.fixture
+def tabela(grade):
+    return normalizar_tabela(grade, "2025-03-12").set_index(["empresa", "refinaria", "combustivel"])
+
+def _celula(texto, metrica, combustivel="gasolina"):
+    return pd.DataFrame({"texto": [texto], "metrica": [metrica], "combustivel": [combustivel]})
+
+# --- Grade → Formato Longo ---
+def test_celulas_da_grade_so_le_o_primeiro_bloco_de_cada_combustivel(grade):
+    celulas = celulas_da_grade(grade)
+    assert len(celulas) == 2 * 4 * 6 # (diesel, gasolina) x métricas x refinarias; os quadros de médias ficam de fora
+    assert set(celulas["refinaria"]) == {"Itaqui", "Suape", "Paulínia", "Araucária", "Itacoatiara", "Aratu"}
+    assert celulas.loc[celulas["refinaria"].eq("Aratu"), "empresa"].unique().tolist() == ["ACELEN"]
+
+# --- Conversão ---
+@pytest.mark.parametrize("texto, metrica, combustivel, valor, flag", [
+    ("3,6160", "preco_petrobras", "diesel", 3.6160, "ok"),
+    ("0954", "defasagem_rs_l", "diesel", 0.0954, "virgula_inserida"),
+    ("27893", "ppi", "gasolina", 2.7893, "virgula_inserida"),
+    ("4%", "defasagem_pct", "diesel", 4.0, "ok"),
+    ("49", "defasagem_pct", "gasolina", 49.0, "ok"), # A escolha entre 49 e 4 fica para conferir_consistencia
+])
+def test_converter_valores(texto, metrica, combustivel, valor, flag):
+    convertida = converter_valores(_celula(texto, metrica, combustivel)).iloc[0]
+    assert convertida["valor"] == pytest.approx(valor)
+    assert convertida["flag"] == flag
+
+@pytest.mark.parametrize("texto, valor_alt", [("49", 4.0), ("-49", -4.0), ("19", 1.0), ("4%", np.nan), ("49%", np.nan), ("9", np.nan), ("48", np.nan)])
+def test_valor_alt_so_para_percentual_terminado_em_9_sem_sinal(texto, valor_alt):
+    convertida = converter_valores(_celula(texto, "defasagem_pct")).iloc[0]
+    assert convertida["valor_alt"] == pytest.approx(valor_alt, nan_ok=True)
+
+@pytest.mark.parametrize("texto, metrica, combustivel", [
+    ("9909", "preco_petrobras", "gasolina"), # 0,9909: o "3," do preço perdido pelo OCR
+    ("1,8000", "preco_petrobras", "diesel"), # Dentro de LIMITES_PADRAO, abaixo do mínimo do diesel em LIMITES
+    ("6,2000", "ppi", "gasolina"), # Dentro de LIMITES_PADRAO, acima do máximo da gasolina em LIMITES
+    ("2,5000", "defasagem_rs_l", "diesel"),
+    ("-51%", "defasagem_pct", "gasolina"),
+])
+def test_fora_dos_limites_vira_nan(texto, metrica, combustivel):
+    convertida = converter_valores(_celula(texto, metrica, combustivel)).iloc[0]
+    assert np.isnan(convertida["valor"])
+    assert convertida["flag"] == "fora_limites"
+
+def test_celulas_vazias_e_invalidas():
+    convertidas = converter_valores(pd.concat([_celula(None, "defasagem_pct"), _celula("3,6x", "ppi")], ignore_index=True))
+    assert convertidas["flag"].tolist() == ["vazio", "invalido"]
+    assert convertidas["valor"].isna().all()
+
+# --- Tabela Normalizada ---
+def test_normalizar_tabela_12_03_2025(tabela):
+    itaqui = tabela.loc[("PETROBRAS", "Itaqui", "diesel")]
+    assert (itaqui["preco_petrobras"], itaqui["ppi"], itaqui["defasagem_rs_l"], itaqui["defasagem_pct"]) == pytest.approx((3.6160, 3.4782, 0.1378, 4.0))
+    paulinia = tabela.loc[("PETROBRAS", "Paulínia", "diesel")]
+    assert paulinia["defasagem_rs_l"] == pytest.approx(0.0954) and paulinia["flag_defasagem_rs_l"] == "virgula_inserida"
+    suape = tabela.loc[("PETROBRAS", "Suape", "gasolina")]
+    assert suape["ppi"] == pytest.approx(2.7893) and suape["flag_ppi"] == "virgula_inserida"
+    assert tabela.loc[("ACELEN", "Aratu", "gasolina"), "ppi"] == pytest.approx(2.8740)
+
+@pytest.mark.parametrize("refinaria", ["Itaqui", "Suape"])
+def test_percentual_49_vira_4(tabela, refinaria):
+    gasolina = tabela.loc[("PETROBRAS", refinaria, "gasolina")] # Defasagem / PPI ≈ 4%
+    assert gasolina["defasagem_pct"] == 4.0
+    assert gasolina["flag_defasagem_pct"] == "percentual_reparado"
+
+def test_preco_9909_fora_dos_limites(tabela):
+    for refinaria, defasagem in (("Araucária", 0.0640), ("Itacoatiara", 0.1898)): # Preços "9909" e "9958"
+        gasolina = tabela.loc[("PETROBRAS", refinaria, "gasolina")]
+        assert np.isnan(gasolina["preco_petrobras"]) and gasolina["flag_preco_petrobras"] == "fora_limites"
+        # Sem o preço não há o que conferir: a defasagem lida é mantida
+        assert gasolina["defasagem_rs_l"] == pytest.approx(defasagem) and gasolina["flag_defasagem_rs_l"] != "inconsistente"
+
+def test_percentual_vazio_e_calculado(tabela):
+    paulinia = tabela.loc[("PETROBRAS", "Paulínia", "gasolina")]
+    assert paulinia["defasagem_pct"] == pytest.approx(round(0.0625 / 2.9683 * 100, 2))
+    assert paulinia["flag_defasagem_pct"] == "calculado"
+
+def test_sinal_perdido_e_corrigido(grade):
+    grade.iloc[9, 2] = "-4%" # Gasolina/Itaqui: percentual com o sinal trocado
+    grade.iloc[4, 3] = "-0,1107" # Diesel/Suape: defasagem com o sinal trocado
+    tabela = normalizar_tabela(grade).set_index(["empresa", "refinaria", "combustivel"])
+    itaqui = tabela.loc[("PETROBRAS", "Itaqui", "gasolina")]
+    assert itaqui["defasagem_pct"] == 4.0 and itaqui["flag_defasagem_pct"] == "sinal_corrigido"
+    suape = tabela.loc[("PETROBRAS", "Suape", "diesel")]
+    assert suape["defasagem_rs_l"] == pytest.approx(0.1107) and suape["flag_defasagem_rs_l"] == "sinal_corrigido"
+
+# --- Conferência ---
+def _largas(**colunas):
+    valores = pd.DataFrame({m: [colunas.get(m, np.nan)] for m in ("preco_petrobras", "ppi", "defasagem_rs_l", "defasagem_pct", "defasagem_pct_alt")})
+    for metrica in ("preco_petrobras", "ppi", "defasagem_rs_l", "defasagem_pct"): valores[f"flag_{metrica}"] = "ok"
+    return valores
+
+def test_percentual_terminado_em_9_mantido_quando_os_precos_confirmam():
+    # PPI da gasolina em Itaqui (2,7893) com defasagem de 0,53: 19% é a leitura certa, não 1%
+    valores = conferir_consistencia(_largas(preco_petrobras=3.3193, ppi=2.7893, defasagem_rs_l=0.53, defasagem_pct=19.0, defasagem_pct_alt=1.0)).iloc[0]
+    assert valores["defasagem_pct"] == 19.0 and valores["flag_defasagem_pct"] == "ok"
+
+def test_sem_referencia_vale_a_leitura_reparada():
+    valores = conferir_consistencia(_largas(defasagem_pct=49.0, defasagem_pct_alt=4.0)).iloc[0]
+    assert valores["defasagem_pct"] == 4.0 and valores["flag_defasagem_pct"] == "percentual_reparado"
+
+def test_defasagem_divergente_e_marcada():
+    valores = conferir_consistencia(_largas(preco_petrobras=3.6160, ppi=3.4782, defasagem_rs_l=0.3378, defasagem_pct=4.0)).iloc[0]
+    assert valores["defasagem_rs_l"] == pytest.approx(0.3378) and valores["flag_defasagem_rs_l"] == "inconsistente"